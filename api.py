@@ -0,0 +1,226 @@
+"""API HTTP do ProV.ia para consumidores sem interface (portal da intranet, bot do Slack)
+
+Expõe as mesmas operações da página do Streamlit, compartilhando uploads, metadados, caches de
+parsing, índices e o armazenamento de conversas. As respostas chegam por server-sent events.
+
+A API não autentica ninguém: o usuário vem do cabeçalho X-Usuario, que identifica as sessões e
+o histórico. Ela deve ficar atrás de um proxy que autentique o usuário, descarte qualquer
+X-Usuario enviado pelo cliente e preencha o cabeçalho com a identidade autenticada; requisições
+sem o cabeçalho são recusadas.
+
+Execução:
+    uvicorn api:api --host 127.0.0.1 --port 8000   # exposta apenas ao proxy
+"""
+import os
+import json
+import uuid
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Header, Depends
+from fastapi.responses import StreamingResponse
+from langchain_core.messages import HumanMessage, AIMessage
+from pydantic import BaseModel
+
+import app as provia
+from prompts import montar_system_message, montar_template
+from roteador import criar_modelo_roteado, config_roteamento, medir_latencia_astream
+from tokens import acompanhar_uso_astream
+from conversas import registrar_mensagem, carregar_mensagens
+
+# Sessões mantidas em memória; as mais antigas são descartadas (o histórico continua no armazenamento)
+MAX_SESSOES = int(os.getenv('PROVIA_API_MAX_SESSOES', '1000'))
+
+# Mensagens do histórico mantidas em memória por sessão (o orçamento de tokens corta o excedente)
+MAX_HISTORICO = 100
+
+api = FastAPI(title='ProV.ia API')
+
+_sessoes = OrderedDict()
+_lock_sessoes = threading.Lock()
+
+_modelo = None
+
+class DocumentoSalvo(BaseModel):
+    nome_arquivo: str
+
+class Mensagem(BaseModel):
+    mensagem: str
+
+class ArquivoRecebido:
+    """Adapta o upload recebido à interface do UploadedFile usada por salvar_arquivo_uploaded"""
+
+    def __init__(self, nome, dados):
+        self.name = nome
+        self._dados = dados
+
+    def getbuffer(self):
+        return memoryview(self._dados)
+
+def nome_arquivo_seguro(nome):
+    """Só o nome do arquivo enviado pelo cliente, sem diretórios (nem '..\\' do Windows)"""
+    nome = os.path.basename((nome or '').replace('\\', '/')).strip()
+    if nome in ('', '.', '..'):
+        raise HTTPException(400, 'Nome de arquivo inválido')
+    return nome
+
+def usuario_autenticado(x_usuario: Optional[str] = Header(None)):
+    """Usuário informado pelo proxy de autenticação no cabeçalho X-Usuario"""
+    if not x_usuario or not x_usuario.strip():
+        raise HTTPException(401, 'Cabeçalho X-Usuario ausente: a API deve ser acessada pelo proxy de autenticação')
+    return x_usuario.strip()
+
+def obter_modelo():
+    """Modelo roteado compartilhado por todas as sessões (um único pool de conexões)"""
+    global _modelo
+    if _modelo is None:
+        _modelo = criar_modelo_roteado(provia.OPENAI_API_KEY)
+    return _modelo
+
+def configurar_sessao(sessao, system_message, documento_atual=None):
+    """Troca o documento da sessão e refaz a chain"""
+    sessao['system_message'] = system_message
+    sessao['chain'] = montar_template(system_message) | obter_modelo()
+    sessao['documento_atual'] = documento_atual
+
+def obter_sessao(usuario, sessao_id):
+    """Sessão em memória; se não existir, é criada no modo padrão com o histórico já armazenado"""
+    chave = (usuario, sessao_id)
+    with _lock_sessoes:
+        if chave in _sessoes:
+            _sessoes.move_to_end(chave)
+            return _sessoes[chave]
+        linhas = carregar_mensagens(usuario, sessao_id, provia.MENSAGENS_POR_PAGINA)
+        sessao = {'historico': provia.converter_mensagens(linhas)}
+        configurar_sessao(sessao, montar_system_message())
+        _sessoes[chave] = sessao
+        while len(_sessoes) > MAX_SESSOES:
+            _sessoes.popitem(last=False)
+        return sessao
+
+def resumo_documento(documento_atual):
+    if not documento_atual:
+        return None
+    return {'tipo': documento_atual['tipo'], 'nome': documento_atual.get('nome')}
+
+def evento(tipo, dados):
+    """Evento no formato server-sent events"""
+    return f'event: {tipo}\ndata: {json.dumps(dados, ensure_ascii=False)}\n\n'
+
+@api.get('/saude')
+async def saude():
+    return {'status': 'ok'}
+
+@api.get('/arquivos')
+async def listar_arquivos(termo: str = '', tipo: Optional[str] = None, pagina: int = 0,
+                          x_usuario: str = Depends(usuario_autenticado)):
+    """Arquivos armazenados (mesmo índice da sidebar)"""
+    arquivos, total = await asyncio.to_thread(provia.listar_arquivos_salvos, termo, tipo, None, None, pagina)
+    return {'arquivos': arquivos, 'total': total, 'pagina': pagina}
+
+@api.post('/sessoes')
+async def criar_sessao(x_usuario: str = Depends(usuario_autenticado)):
+    """Nova conversa no modo padrão"""
+    sessao_id = uuid.uuid4().hex
+    await asyncio.to_thread(obter_sessao, x_usuario, sessao_id)
+    return {'sessao': sessao_id}
+
+@api.get('/sessoes/{sessao_id}')
+async def detalhar_sessao(sessao_id: str, x_usuario: str = Depends(usuario_autenticado)):
+    sessao = await asyncio.to_thread(obter_sessao, x_usuario, sessao_id)
+    return {'sessao': sessao_id, 'documento': resumo_documento(sessao['documento_atual'])}
+
+@api.post('/sessoes/{sessao_id}/documento')
+async def enviar_documento(sessao_id: str, tipo: str = Form(...), arquivo: Optional[UploadFile] = File(None),
+                           url: Optional[str] = Form(None), x_usuario: str = Depends(usuario_autenticado)):
+    """Equivalente a inicializar_provia: envia um arquivo (Pdf, Csv, Txt) ou uma URL (Site, Youtube)"""
+    if tipo not in provia.TIPOS_ARQUIVOS_VALIDOS:
+        raise HTTPException(400, f'Tipo inválido: {tipo}')
+    if tipo in ('Site', 'Youtube'):
+        if not url:
+            raise HTTPException(400, 'Informe a URL do documento')
+        origem = url
+    else:
+        if arquivo is None:
+            raise HTTPException(400, 'Envie o arquivo do documento')
+        origem = ArquivoRecebido(nome_arquivo_seguro(arquivo.filename), await arquivo.read())
+
+    sessao = await asyncio.to_thread(obter_sessao, x_usuario, sessao_id)
+    try:
+        # O metadata compartilhado é protegido pelo lock de arquivo do app, só na leitura-alteração-gravação
+        system_message, documento_atual = await asyncio.to_thread(provia.preparar_documento, tipo, origem)
+    except Exception as e:
+        raise HTTPException(422, f'Erro ao processar documento: {e}')
+    configurar_sessao(sessao, system_message, documento_atual)
+    return {'sessao': sessao_id, 'documento': resumo_documento(documento_atual)}
+
+@api.post('/sessoes/{sessao_id}/documento-salvo')
+async def carregar_documento(sessao_id: str, corpo: DocumentoSalvo, x_usuario: str = Depends(usuario_autenticado)):
+    """Equivalente a carregar_documento_salvo"""
+    sessao = await asyncio.to_thread(obter_sessao, x_usuario, sessao_id)
+    try:
+        preparado = await asyncio.to_thread(provia.preparar_documento_salvo, corpo.nome_arquivo)
+    except Exception as e:
+        raise HTTPException(422, f'Erro ao carregar documento: {e}')
+    if preparado is None:
+        raise HTTPException(404, 'Documento não encontrado')
+    configurar_sessao(sessao, *preparado)
+    return {'sessao': sessao_id, 'documento': resumo_documento(preparado[1])}
+
+@api.delete('/sessoes/{sessao_id}/documento')
+async def voltar_modo_padrao(sessao_id: str, x_usuario: str = Depends(usuario_autenticado)):
+    sessao = await asyncio.to_thread(obter_sessao, x_usuario, sessao_id)
+    configurar_sessao(sessao, montar_system_message())
+    return {'sessao': sessao_id, 'documento': None}
+
+@api.get('/sessoes/{sessao_id}/mensagens')
+async def historico(sessao_id: str, limite: int = 20, antes_de: Optional[int] = None,
+                    x_usuario: str = Depends(usuario_autenticado)):
+    """Página do histórico armazenado, da mais antiga para a mais recente"""
+    linhas = await asyncio.to_thread(carregar_mensagens, x_usuario, sessao_id, limite, antes_de)
+    return {'mensagens': [{'id': id_, 'tipo': tipo, 'conteudo': conteudo} for id_, tipo, conteudo in linhas]}
+
+@api.post('/sessoes/{sessao_id}/mensagens')
+async def conversar(sessao_id: str, corpo: Mensagem, x_usuario: str = Depends(usuario_autenticado)):
+    """Turno do chat (o mesmo de pagina_chat), com a resposta em server-sent events
+
+    Eventos: 'token' para cada pedaço da resposta, 'fim' com modelo, fontes e uso de tokens,
+    ou 'erro' se a montagem do prompt ou o modelo falhar.
+    """
+    sessao = await asyncio.to_thread(obter_sessao, x_usuario, sessao_id)
+    pergunta = corpo.mensagem
+
+    async def eventos():
+        partes = []
+        try:
+            entrada, trechos, historico_turno, uso_tokens, decisao = await asyncio.to_thread(
+                provia.preparar_turno, pergunta, list(sessao['historico']), sessao['system_message'],
+                None, sessao['documento_atual'] is not None
+            )
+            stream = sessao['chain'].astream({
+                'input': entrada,
+                'chat_history': historico_turno
+            }, config=config_roteamento(decisao))
+            async for chunk in medir_latencia_astream(acompanhar_uso_astream(stream, uso_tokens), decisao):
+                if chunk.content:
+                    partes.append(chunk.content)
+                    yield evento('token', {'texto': chunk.content})
+        except Exception as e:
+            yield evento('erro', {'mensagem': str(e), 'status': getattr(e, 'status_code', 500)})
+            return
+
+        resposta = ''.join(partes)
+        sessao['historico'] = (sessao['historico'] + [HumanMessage(content=pergunta), AIMessage(content=resposta)])[-MAX_HISTORICO:]
+        registrar_mensagem(x_usuario, sessao_id, 'human', pergunta)
+        registrar_mensagem(x_usuario, sessao_id, 'ai', resposta)
+        yield evento('fim', {
+            'modelo': decisao['modelo'],
+            'motivo': decisao['motivo'],
+            'fontes': provia.descrever_fontes(trechos),
+            'uso': uso_tokens,
+        })
+
+    return StreamingResponse(eventos(), media_type='text/event-stream',
+                             headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
@@ -2,19 +2,35 @@ import tempfile
 import os
 import shutil
 from pathlib import Path
-import json
+import uuid
+from contextlib import contextmanager
 from datetime import datetime
 
 import streamlit as st
 from langchain.memory import ConversationBufferMemory
-from langchain_openai import ChatOpenAI
-from langchain.prompts import ChatPromptTemplate
+from langchain_core.messages import HumanMessage, AIMessage
 
 from loaders import *
+from tokens import limitar_documento, ajustar_ao_orcamento, acompanhar_uso_stream
+from compactacao import compactar_documento, descrever_compactacao
+from prompts import montar_system_message, montar_system_message_corpus, montar_template
+from roteador import (MODELO_PESADO, MODELO_RAPIDO, criar_modelo_roteado, escolher_modelo,
+                      config_roteamento, medir_latencia_stream)
+from rastreamento import span, rastrear
+from assets import construir_assets
+from indice import sincronizar_indice, garantir_indice, indexar_texto, buscar_arquivos
+from corpus import (obter_indice_arquivo, buscar_trechos, montar_entrada, ler_texto_cache, gravar_texto_cache,
+                    ler_relatorio_cache)
+from conversas import registrar_mensagem, carregar_mensagens
+from armazenamento import (aplicar_cota, registrar_acesso, descomprimir, caminho_armazenado,
+                           arquivo_disponivel, remover_derivados, bloquear_metadata, ler_metadata, gravar_metadata,
+                           MetadataIlegivel)
+from aquecimento import iniciar_aquecimento
+from modelo_simulado import MODELO_SIMULADO_ATIVO
 
 # Leitura segura da API Key da OpenAI via Secrets ou ambiente
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-if not OPENAI_API_KEY:
+if not OPENAI_API_KEY and not MODELO_SIMULADO_ATIVO:
     st.error("❌ A variável OPENAI_API_KEY não foi encontrada. Defina nos Secrets do Streamlit.")
     st.stop()
 
@@ -28,28 +44,38 @@ TIPOS_ARQUIVOS_VALIDOS = [
     'Site', 'Youtube', 'Pdf', 'Csv', 'Txt'
 ]
 
-# Configuração fixa para OpenAI GPT-4o
-MODELO_FIXO = 'gpt-4o'
+# Quantidade de mensagens exibidas por página do histórico
+MENSAGENS_POR_PAGINA = 20
 
-MEMORIA = ConversationBufferMemory()
-
-# Exemplo de uso correto da chave API no ChatOpenAI
-chat = ChatOpenAI(model=MODELO_FIXO, api_key=OPENAI_API_KEY)
+# Quantidade de arquivos exibidos por página na sidebar
+ARQUIVOS_POR_PAGINA = 10
 
+@rastrear('metadata.carregar')
 def carregar_metadata():
-    """Carrega metadados dos arquivos salvos"""
-    if os.path.exists(METADATA_FILE):
-        try:
-            with open(METADATA_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except:
-            return {}
-    return {}
+    """Carrega metadados dos arquivos salvos (MetadataIlegivel, vazio, se o arquivo estiver corrompido)"""
+    return ler_metadata(METADATA_FILE)
 
+@rastrear('metadata.salvar')
 def salvar_metadata(metadata):
-    """Salva metadados dos arquivos"""
-    with open(METADATA_FILE, 'w', encoding='utf-8') as f:
-        json.dump(metadata, f, ensure_ascii=False, indent=2)
+    """Salva metadados dos arquivos de forma atômica"""
+    with bloquear_metadata(METADATA_FILE):
+        gravar_metadata(METADATA_FILE, metadata)
+        sincronizar_indice(metadata, METADATA_FILE)
+
+@contextmanager
+def atualizar_metadata():
+    """Lê, deixa alterar e grava o metadata sob o lock compartilhado por app, API e lote
+
+    Nada é gravado se o bloco levantar uma exceção. Com o metadata ilegível, gravar alterações
+    levanta ValueError em vez de sobrescrever o arquivo.
+    """
+    with bloquear_metadata(METADATA_FILE):
+        metadata = carregar_metadata()
+        yield metadata
+        # Metadata ilegível sem alterações: nada a gravar (e o arquivo original é preservado)
+        if isinstance(metadata, MetadataIlegivel) and not metadata:
+            return
+        salvar_metadata(metadata)
 
 def salvar_arquivo_uploaded(arquivo, tipo_arquivo):
     """Salva o arquivo uploaded no diretório de uploads com metadados"""
@@ -64,15 +90,20 @@ def salvar_arquivo_uploaded(arquivo, tipo_arquivo):
             f.write(arquivo.getbuffer())
         
         # Salvar metadados
-        metadata = carregar_metadata()
-        metadata[nome_arquivo] = {
-            'nome_original': arquivo.name,
-            'tipo': tipo_arquivo,
-            'data_upload': datetime.now().isoformat(),
-            'tamanho': len(arquivo.getbuffer()),
-            'caminho': caminho_arquivo
-        }
-        salvar_metadata(metadata)
+        with atualizar_metadata() as metadata:
+            metadata[nome_arquivo] = {
+                'nome_original': arquivo.name,
+                'tipo': tipo_arquivo,
+                'data_upload': datetime.now().isoformat(),
+                'tamanho': len(arquivo.getbuffer()),
+                'caminho': caminho_arquivo
+            }
+            registrar_acesso(metadata[nome_arquivo])
+            
+            # Manter uploads e derivados dentro da cota de disco
+            metadata, relatorio = aplicar_cota(metadata, UPLOAD_DIR)
+            if relatorio.get('arquivos_removidos') or relatorio.get('orfaos_removidos') or relatorio.get('comprimidos'):
+                print(f"Armazenamento: {relatorio}")
         
         return caminho_arquivo
     return None
@@ -104,6 +135,12 @@ def carregar_arquivo_salvo(nome_arquivo):
         caminho = arquivo_info['caminho']
         tipo = arquivo_info['tipo']
         
+        # Restaurar arquivos comprimidos
+        if arquivo_info.get('comprimido'):
+            with atualizar_metadata() as metadata:
+                if nome_arquivo in metadata:
+                    descomprimir(metadata[nome_arquivo])
+        
         if os.path.exists(caminho):
             if tipo == 'Pdf':
                 return carrega_pdf(caminho)
@@ -113,571 +150,89 @@ def carregar_arquivo_salvo(nome_arquivo):
                 return carrega_txt(caminho)
     return None
 
-def inicializar_provia(tipo_arquivo, arquivo):
-    """Inicializa o ProV.ia com documento específico"""
-    
-    documento = carrega_arquivos(tipo_arquivo, arquivo)
+def extrair_texto_salvo(nome_arquivo):
+    """Texto compactado de um arquivo salvo, lido do cache de parsing quando disponível"""
+    metadata = carregar_metadata()
+    if nome_arquivo not in metadata:
+        return None
+    arquivo_info = metadata[nome_arquivo]
+    documento = ler_texto_cache(nome_arquivo, arquivo_info)
+    if documento is not None:
+        relatorio = ler_relatorio_cache(nome_arquivo, arquivo_info)
+        if relatorio:
+            print(f"Compactação de {nome_arquivo} (cache de parsing): {descrever_compactacao(relatorio)}")
+        return documento
+    
+    documento = carregar_arquivo_salvo(nome_arquivo)
+    if documento is None:
+        return None
+    documento, relatorio = compactar_documento(documento, arquivo_info['tipo'], MODELO_PESADO)
+    gravar_texto_cache(nome_arquivo, arquivo_info, documento, relatorio)
+    return documento
 
-    system_message = '''Você é um assistente amigável chamado ProV.ia.
-    Você é especialista em assuntos internos, dúvidas e questionamentos sobre a Provion.
+@rastrear('chain.construir')
+def construir_chain(system_message):
+    """Monta a chain do ProV.ia a partir da mensagem de sistema canônica"""
+    template = montar_template(system_message)
     
-    Você possui acesso às seguintes informações vindas de um documento {}: 
-
-    ####
-    {}
-    ####
+    # Modelo escolhido a cada turno pelo roteador
+    chat = criar_modelo_roteado(OPENAI_API_KEY)
+    chain = template | chat
 
-    Utilize as informações fornecidas para basear as suas respostas quando relevante.
-    Seja prestativo, profissional e cordial em suas respostas.
+    st.session_state['system_message'] = system_message
+    return chain
 
-    Sempre que houver $ na sua saída, substitua por S.
+def preparar_documento(tipo_arquivo, arquivo):
+    """Carrega e compacta um documento novo, retornando a mensagem de sistema e os dados do documento"""
+    documento = carrega_arquivos(tipo_arquivo, arquivo)
+    documento, relatorio = compactar_documento(documento, tipo_arquivo, MODELO_PESADO)
+    documento = limitar_documento(documento, MODELO_PESADO, montar_system_message('', tipo_arquivo))
 
-    Se a informação do documento for algo como "Just a moment...Enable JavaScript and cookies to continue" 
-    sugira ao usuário carregar novamente o documento!'''.format(tipo_arquivo, documento)
+    documento_atual = {
+        'tipo': tipo_arquivo,
+        'conteudo': documento,
+        'compactacao': relatorio
+    }
+    return montar_system_message(documento, tipo_arquivo), documento_atual
 
-    template = ChatPromptTemplate.from_messages([
-        ('system', system_message),
-        ('placeholder', '{chat_history}'),
-        ('user', '{input}')
-    ])
-    
-    # Usar sempre GPT-4o com API key fixa
-    chat = ChatOpenAI(model=MODELO_FIXO, api_key=OPENAI_API_KEY)
-    chain = template | chat
+def inicializar_provia(tipo_arquivo, arquivo):
+    """Inicializa o ProV.ia com documento específico"""
+    system_message, documento_atual = preparar_documento(tipo_arquivo, arquivo)
+    chain = construir_chain(system_message)
 
+    limpar_corpus()
     st.session_state['chain'] = chain
     st.session_state['provia_ativo'] = True
-    st.session_state['documento_atual'] = {'tipo': tipo_arquivo, 'conteudo': documento}
+    st.session_state['documento_atual'] = documento_atual
 
 def inicializar_provia_padrao():
     """Inicializa o ProV.ia com configuração padrão (sem documento específico)"""
-    
-    system_message = '''Você é um assistente amigável chamado ProV.ia.
-    Você é especialista em assuntos internos, dúvidas e questionamentos sobre a Provion.
-    
-    Seja prestativo, profissional e cordial em suas respostas.
-    Ajude com informações gerais, tire dúvidas e forneça suporte aos usuários.
-    
-    Sempre que houver $ na sua saída, substitua por S.'''
-
-    template = ChatPromptTemplate.from_messages([
-        ('system', system_message),
-        ('placeholder', '{chat_history}'),
-        ('user', '{input}')
-    ])
-    
-    # Usar sempre GPT-4o com API key fixa
-    chat = ChatOpenAI(model=MODELO_FIXO, api_key=OPENAI_API_KEY)
-    chain = template | chat
-
-    return chain
+    return construir_chain(montar_system_message())
 
 def adicionar_css_customizado():
     """CSS corrigido - Dropdown funcional, scroll corrigido e mensagens sem caixas pretas"""
-    st.markdown("""
-    <style>
-    /* FORÇA FUNDO PRETO EM TUDO */
-    *, *::before, *::after {
-        background-color: transparent !important;
-    }
-    
-    .stApp, 
-    .stApp > div,
-    .main,
-    .block-container,
-    [data-testid="stMain"],
-    [data-testid="stAppViewContainer"],
-    .css-18e3th9,
-    .css-1d391kg,
-    .css-k1vhr4,
-    .element-container,
-    .stMarkdown {
-        background-color: #000000 !important;
-        color: white !important;
-    }
-    
-    /* CORRIGIR SCROLL - PERMITIR ROLAGEM COMPLETA */
-    .main {
-        padding: 0 !important;
-        margin: 0 !important;
-        max-width: 100% !important;
-        width: 100% !important;
-        overflow-y: auto !important;
-        height: 100vh !important;
-        padding-bottom: 150px !important; /* Mais espaço para chat input */
-    }
-    
-    .block-container {
-        padding: 20px !important;
-        margin: 0 auto !important;
-        max-width: 700px !important;
-        width: 100% !important;
-        min-height: calc(100vh - 150px) !important;
-        padding-bottom: 180px !important; /* Espaço bem maior para permitir scroll total */
-        box-sizing: border-box !important;
-    }
-    
-    /* FORÇAR SCROLL ADICIONAL */
-    .main .element-container:last-of-type {
-        margin-bottom: 150px !important; /* Margem extra no último elemento */
-    }
-    
-    /* Ocultar header do Streamlit */
-    .stAppHeader,
-    header[data-testid="stHeader"],
-    .stDeployButton {
-        display: none !important;
-        height: 0 !important;
-        visibility: hidden !important;
-    }
-    
-    /* SIDEBAR - CINZA ESCURO E MENOR */
-    section[data-testid="stSidebar"],
-    [data-testid="stSidebar"] {
-        background-color: #2a2a2a !important;
-        border-right: 3px solid #8FD14F !important;
-        width: 280px !important;
-        min-width: 280px !important;
-        max-width: 280px !important;
-        overflow-y: auto !important;
-        height: 100vh !important;
-    }
-    
-    /* Sidebar elementos internos */
-    section[data-testid="stSidebar"] *,
-    [data-testid="stSidebar"] * {
-        color: white !important;
-        background-color: transparent !important;
-    }
-    
-    /* Sidebar inputs, botões e containers */
-    section[data-testid="stSidebar"] .stSelectbox,
-    section[data-testid="stSidebar"] .stTextInput,
-    section[data-testid="stSidebar"] .stFileUploader,
-    section[data-testid="stSidebar"] .stButton {
-        background-color: #404040 !important;
-        border-radius: 8px !important;
-        margin: 8px 0 !important;
-        border: 1px solid #666 !important;
-        padding: 8px !important;
-    }
-    
-    section[data-testid="stSidebar"] .stButton button {
-        background-color: #8FD14F !important;
-        color: #000000 !important;
-        border: none !important;
-        font-weight: bold !important;
-        border-radius: 8px !important;
-        padding: 10px 15px !important;
-        width: 100% !important;
-    }
-    
-    /* DROPDOWN SIDEBAR - CORRIGIDO COMPLETAMENTE */
-    section[data-testid="stSidebar"] .stSelectbox > div > div,
-    section[data-testid="stSidebar"] .stSelectbox > div > div > div,
-    section[data-testid="stSidebar"] .stSelectbox [data-baseweb="select"] {
-        background-color: #404040 !important;
-        border: 1px solid #8FD14F !important;
-        color: white !important;
-        border-radius: 8px !important;
-    }
-    
-    /* Dropdown texto selecionado */
-    section[data-testid="stSidebar"] .stSelectbox [data-baseweb="select"] > div {
-        background-color: #404040 !important;
-        color: white !important;
-        border: none !important;
-    }
-    
-    /* Menu dropdown quando aberto */
-    section[data-testid="stSidebar"] .stSelectbox ul,
-    section[data-testid="stSidebar"] .stSelectbox [role="listbox"],
-    div[data-baseweb="popover"] ul {
-        background-color: #404040 !important;
-        border: 1px solid #8FD14F !important;
-        color: white !important;
-        border-radius: 8px !important;
-    }
-    
-    /* Itens do dropdown */
-    section[data-testid="stSidebar"] .stSelectbox li,
-    section[data-testid="stSidebar"] .stSelectbox [role="option"],
-    div[data-baseweb="popover"] li {
-        background-color: #404040 !important;
-        color: white !important;
-        padding: 8px 12px !important;
-        border-radius: 4px !important;
-    }
-    
-    section[data-testid="stSidebar"] .stSelectbox li:hover,
-    section[data-testid="stSidebar"] .stSelectbox [role="option"]:hover,
-    div[data-baseweb="popover"] li:hover {
-        background-color: #8FD14F !important;
-        color: black !important;
-    }
-    
-    /* Seta do dropdown */
-    section[data-testid="stSidebar"] .stSelectbox svg {
-        fill: white !important;
-        color: white !important;
-    }
-    
-    /* Input de texto da sidebar */
-    section[data-testid="stSidebar"] input,
-    section[data-testid="stSidebar"] .stTextInput input {
-        background-color: #404040 !important;
-        border: 1px solid #8FD14F !important;
-        color: white !important;
-        border-radius: 8px !important;
-        padding: 8px 12px !important;
-    }
-    
-    section[data-testid="stSidebar"] input::placeholder {
-        color: #aaa !important;
-    }
-    
-    /* File uploader da sidebar */
-    section[data-testid="stSidebar"] .stFileUploader > div,
-    section[data-testid="stSidebar"] .stFileUploader label {
-        background-color: #404040 !important;
-        border: 1px solid #8FD14F !important;
-        color: white !important;
-        border-radius: 8px !important;
-        padding: 12px !important;
-    }
-    
-    /* TÍTULO - CENTRALIZADO */
-    .main h1 {
-        color: #8FD14F !important;
-        font-size: 2.5rem !important;
-        font-weight: bold !important;
-        text-align: center !important;
-        text-shadow: 0 0 20px #8FD14F !important;
-        margin: 20px 0 !important;
-        background-color: transparent !important;
-        width: 100% !important;
-    }
-    
-    /* CHAT MESSAGES - ALTURA MÍNIMA COMO CAIXAS VERMELHAS */
-    .stChatMessage {
-        background: rgba(30, 30, 30, 0.6) !important;
-        border: 1px solid rgba(143, 209, 79, 0.3) !important;
-        border-radius: 8px !important;
-        margin: 8px 0 8px 50px !important; /* Espaço para ícone externo */
-        padding: 8px 12px !important; /* Padding compacto */
-        color: white !important;
-        width: calc(100% - 60px) !important; /* Largura fixa padrão */
-        max-width: calc(100% - 60px) !important; /* Largura consistente */
-        height: auto !important; /* Altura baseada no conteúdo */
-        min-height: 20px !important; /* Altura mínima bem baixa */
-        max-height: fit-content !important; /* Máximo baseado no conteúdo */
-        box-sizing: border-box !important;
-        backdrop-filter: blur(10px) !important;
-        display: flex !important; /* Flex para controle preciso */
-        align-items: center !important; /* Centralizar verticalmente */
-        position: relative !important;
-        overflow: visible !important;
-    }
-    
-    /* Mensagem do usuário */
-    .stChatMessage[data-testid="chat-message-human"] {
-        background: rgba(143, 209, 79, 0.1) !important;
-        border: 1px solid rgba(143, 209, 79, 0.4) !important;
-        border-left: 4px solid #8FD14F !important;
-    }
-    
-    /* Mensagem da IA */
-    .stChatMessage[data-testid="chat-message-ai"] {
-        background: rgba(30, 30, 30, 0.4) !important;
-        border: 1px solid rgba(255, 255, 255, 0.1) !important;
-        border-left: 4px solid #888 !important;
-    }
-    
-    /* Avatar das mensagens */
-    .stChatMessage .stChatMessageAvatar {
-        background-color: transparent !important;
-    }
-    
-    /* Avatar das mensagens - TOTALMENTE FORA DA CAIXA */
-    .stChatMessage .stChatMessageAvatar {
-        background-color: #333 !important;
-        width: 28px !important;
-        height: 28px !important;
-        min-width: 28px !important;
-        min-height: 28px !important;
-        border-radius: 50% !important;
-        display: flex !important;
-        align-items: center !important;
-        justify-content: center !important;
-        position: absolute !important;
-        left: -45px !important; /* Bem fora, à esquerda da caixa */
-        top: 8px !important; /* Alinhado ao primeiro texto */
-        z-index: 10 !important;
-        border: 2px solid #555 !important;
-    }
-    
-    /* Avatar das mensagens - EXTERNO ALINHADO COM TEXTO COMPACTO */
-    .stChatMessage .stChatMessageAvatar {
-        background-color: #333 !important;
-        width: 28px !important;
-        height: 28px !important;
-        min-width: 28px !important;
-        min-height: 28px !important;
-        border-radius: 50% !important;
-        display: flex !important;
-        align-items: center !important;
-        justify-content: center !important;
-        position: absolute !important;
-        left: -45px !important; /* Bem fora da caixa */
-        top: 50% !important; /* Centralizado na altura da caixa */
-        transform: translateY(-50%) !important; /* Centralização perfeita */
-        z-index: 10 !important;
-        border: 2px solid #555 !important;
-    }
-    
-    /* Conteúdo das mensagens - COMPACTO E CENTRALIZADO */
-    .stChatMessage .stMarkdown,
-    .stChatMessage .stMarkdown p,
-    .stChatMessage p,
-    .stChatMessage div {
-        background-color: transparent !important;
-        color: white !important;
-        margin: 0 !important;
-        padding: 0 !important;
-        line-height: 1.3 !important; /* Line-height mais compacto */
-        font-size: 16px !important;
-        word-wrap: break-word !important;
-        width: 100% !important;
-        min-height: 0 !important;
-        height: auto !important;
-        display: inline !important; /* Inline para texto compacto */
-    }
-    
-    /* Container das mensagens - FLEX CENTRALIZADO */
-    .stChatMessage > div {
-        display: contents !important; /* Remove wrapper */
-    }
-    
-    .stChatMessage .stChatMessageContent {
-        width: 100% !important;
-        word-wrap: break-word !important;
-        margin: 0 !important;
-        padding: 0 !important;
-        min-height: 0 !important;
-        height: auto !important;
-        display: flex !important;
-        align-items: center !important; /* Centralizar o texto */
-        flex: 1 !important;
-    }
-    
-    /* FORÇAR ALTURA MÍNIMA PARA TEXTOS CURTOS */
-    .stChatMessage .stMarkdown {
-        min-height: 20px !important;
-        display: flex !important;
-        align-items: center !important;
-        width: 100% !important;
-    }
-    
-    /* REMOVER ESPAÇOS EXTRAS EM ELEMENTOS DE TEXTO */
-    .stChatMessage .stMarkdown > *:first-child {
-        margin-top: 0 !important;
-        padding-top: 0 !important;
-    }
-    
-    .stChatMessage .stMarkdown > *:last-child {
-        margin-bottom: 0 !important;
-        padding-bottom: 0 !important;
-    }
-    
-    /* ELEMENTOS VAZIOS NÃO OCUPAM ESPAÇO */
-    .stChatMessage *:empty {
-        display: none !important;
-        height: 0 !important;
-        margin: 0 !important;
-        padding: 0 !important;
-    }
-    
-    /* CHAT INPUT - FIXO NA PARTE INFERIOR */
-    [data-testid="stChatInput"] {
-        background-color: rgba(0, 0, 0, 0.95) !important;
-        border-top: 2px solid #333 !important;
-        position: fixed !important;
-        bottom: 0 !important;
-        left: 0 !important;
-        right: 0 !important;
-        padding: 15px !important;
-        z-index: 1000 !important;
-        display: flex !important;
-        justify-content: center !important;
-    }
-    
-    /* Ajustar input quando sidebar aberta */
-    .stApp:has(section[data-testid="stSidebar"][aria-expanded="true"]) [data-testid="stChatInput"] {
-        left: 280px !important;
-    }
-    
-    /* Container do input sempre centralizado */
-    [data-testid="stChatInput"] > div {
-        width: 100% !important;
-        max-width: 600px !important;
-        margin: 0 auto !important;
-    }
-    
-    .stChatInput > div > div > div > div > div {
-        background-color: rgba(30, 30, 30, 0.95) !important;
-        border: 2px solid #8FD14F !important;
-        border-radius: 25px !important;
-        padding: 5px 15px !important;
-    }
-    
-    .stChatInput input {
-        background-color: transparent !important;
-        color: white !important;
-        border: none !important;
-        font-size: 16px !important;
-        padding: 10px !important;
-    }
-    
-    .stChatInput input::placeholder {
-        color: #aaa !important;
-    }
-    
-    .stChatInput button {
-        background-color: #8FD14F !important;
-        color: #000 !important;
-        border: none !important;
-        border-radius: 20px !important;
-        padding: 8px 15px !important;
-        font-weight: bold !important;
-    }
-    
-    /* COLUNAS - LAYOUT FLEXÍVEL */
-    .main [data-testid="column"] {
-        background-color: transparent !important;
-        padding: 5px !important;
-        display: flex !important;
-        align-items: center !important;
-        justify-content: center !important;
-    }
-    
-    /* IMAGEM LOGO */
-    .main img {
-        max-width: 80px !important;
-        height: auto !important;
-        border-radius: 10px !important;
-    }
-    
-    /* EXPANDER DA SIDEBAR */
-    section[data-testid="stSidebar"] .streamlit-expanderHeader {
-        background-color: #404040 !important;
-        border: 1px solid #666 !important;
-        border-radius: 8px !important;
-        color: white !important;
-        padding: 10px !important;
-        margin: 5px 0 !important;
-    }
-    
-    section[data-testid="stSidebar"] .streamlit-expanderContent {
-        background-color: #333 !important;
-        border: 1px solid #666 !important;
-        border-radius: 8px !important;
-        padding: 10px !important;
-        margin: 5px 0 !important;
-    }
-    
-    /* SCROLLBAR CUSTOMIZADA */
-    ::-webkit-scrollbar {
-        width: 8px;
-        background-color: #000000;
-    }
-    
-    ::-webkit-scrollbar-track {
-        background-color: #333;
-    }
-    
-    ::-webkit-scrollbar-thumb {
-        background-color: #8FD14F;
-        border-radius: 4px;
-    }
-    
-    /* RESPONSIVIDADE */
-    @media (max-width: 768px) {
-        [data-testid="stChatInput"] {
-            left: 0 !important;
-        }
-        
-        .main h1 {
-            font-size: 2rem !important;
-        }
-        
-        .stChatMessage {
-            max-width: 95% !important;
-        }
-        
-        section[data-testid="stSidebar"] {
-            width: 250px !important;
-            min-width: 250px !important;
-            max-width: 250px !important;
-        }
-    }
-    
-    /* FORÇA FUNDO PRETO ÚLTIMO RECURSO */
-    body, html {
-        background-color: #000000 !important;
-    }
-    
-    .stApp::before {
-        content: '';
-        position: fixed;
-        top: 0;
-        left: 0;
-        width: 100%;
-        height: 100%;
-        background-color: #000000;
-        z-index: -999;
-    }
-    </style>
-    """, unsafe_allow_html=True)
+    st.markdown(construir_assets()['css'], unsafe_allow_html=True)
 
 def pagina_chat():
     # Adicionar CSS customizado
     adicionar_css_customizado()
     
+    assets = construir_assets()
+    
     # IMAGEM DO CÉREBRO - SEMPRE VISÍVEL E FIXA
     brain_loaded = False
-    try:
-        if os.path.exists("cerebro_ia.png"):
-            with open("cerebro_ia.png", "rb") as img_file:
-                import base64
-                img_data = img_file.read()
-                img_base64 = base64.b64encode(img_data).decode()
-                
-                # Inserir imagem do cérebro FIXA E PERMANENTE
-                st.markdown(f"""
-                <div id="brain-image" style="position: fixed; right: 30px; top: 50%; transform: translateY(-50%); 
-                           width: 300px; height: 350px; opacity: 0.8; z-index: 0; 
-                           pointer-events: none; background-size: contain; 
-                           background-repeat: no-repeat; background-position: center;
-                           background-image: url(data:image/png;base64,{img_base64});
-                           display: block !important; visibility: visible !important;">
-                </div>
-                <script>
-                // Garantir que a imagem permaneça visível
-                setTimeout(function() {{
-                    var brainImg = document.getElementById('brain-image');
-                    if (brainImg) {{
-                        brainImg.style.display = 'block';
-                        brainImg.style.visibility = 'visible';
-                        brainImg.style.opacity = '0.8';
-                    }}
-                }}, 100);
-                </script>
-                """, unsafe_allow_html=True)
-                brain_loaded = True
-        else:
-            print("❌ Arquivo cerebro_ia.png não encontrado")
-    except Exception as e:
-        print(f"❌ Erro ao carregar cerebro_ia.png: {e}")
+    if assets['cerebro']:
+        # Inserir imagem do cérebro FIXA E PERMANENTE (servida como arquivo estático)
+        st.markdown(f"""
+        <div id="brain-image" style="position: fixed; right: 30px; top: 50%; transform: translateY(-50%); 
+                   width: 300px; height: 350px; opacity: 0.8; z-index: 0; 
+                   pointer-events: none; background-size: contain; 
+                   background-repeat: no-repeat; background-position: center;
+                   background-image: url({assets['cerebro']});
+                   display: block !important; visibility: visible !important;">
+        </div>
+        """, unsafe_allow_html=True)
+        brain_loaded = True
     
     # Fallback SVG - TAMBÉM PERMANENTE
     if not brain_loaded:
@@ -754,16 +309,9 @@ def pagina_chat():
     col1, col2 = st.columns([1, 4])
     
     with col1:
-        try:
-            if os.path.exists("logo_provion.png"):
-                st.image("logo_provion.png", width=80)
-            else:
-                st.markdown("""
-                <div style="width: 80px; height: 60px; background: linear-gradient(45deg, #8FD14F, #00FF41); 
-                            border-radius: 10px; display: flex; align-items: center; justify-content: center; 
-                            font-size: 2rem; font-weight: bold; color: black;">P</div>
-                """, unsafe_allow_html=True)
-        except:
+        if assets['logo']:
+            st.markdown(f"<img src='{assets['logo']}' width='80'>", unsafe_allow_html=True)
+        else:
             st.markdown("""
             <div style="width: 80px; height: 60px; background: linear-gradient(45deg, #8FD14F, #00FF41); 
                         border-radius: 10px; display: flex; align-items: center; justify-content: center; 
@@ -783,21 +331,30 @@ def pagina_chat():
     </div>
     """, unsafe_allow_html=True)
 
+    # Área do chat roda como fragmento: enviar mensagem não reexecuta a página inteira
+    area_chat()
+
+@st.fragment
+def area_chat():
+    """Histórico e entrada do chat, reexecutados de forma independente do restante da página"""
     # Inicializar ProV.ia automaticamente
     if 'chain' not in st.session_state:
         st.session_state['chain'] = inicializar_provia_padrao()
 
     chain = st.session_state['chain']
-    memoria = st.session_state.get('memoria', MEMORIA)
+    memoria = carregar_memoria()
     
     # Container para mensagens com scroll adequado
     chat_container = st.container()
     
     with chat_container:
-        # Exibir histórico de conversas
-        for mensagem in memoria.buffer_as_messages:
-            with st.chat_message(mensagem.type):
-                st.markdown(mensagem.content)
+        # Exibir histórico de conversas (apenas a janela mais recente)
+        exibir_historico(memoria.buffer_as_messages)
+        
+        # Modelo do último turno; fica no fragmento do chat para acompanhar cada resposta
+        if 'ultimo_roteamento' in st.session_state:
+            decisao = st.session_state['ultimo_roteamento']
+            st.caption(f"Último turno: {decisao['modelo']} ({decisao['motivo']})")
     
     # Espaçamento extra para garantir scroll completo
     st.markdown("<div style='height: 150px;'></div>", unsafe_allow_html=True)
@@ -809,213 +366,465 @@ def pagina_chat():
         with st.chat_message('human'):
             st.markdown(input_usuario)
 
-        # Gerar e mostrar resposta da IA
-        with st.chat_message('ai'):
-            resposta = st.write_stream(chain.stream({
-                'input': input_usuario, 
-                'chat_history': memoria.buffer_as_messages
-                }))
+        with span('chat.turno') as turno:
+            # Ajustar histórico ao orçamento de tokens e escolher o modelo do turno
+            entrada, trechos, historico, uso_tokens, decisao = preparar_turno(
+                input_usuario,
+                memoria.buffer_as_messages,
+                st.session_state.get('system_message', ''),
+                st.session_state.get('indices_corpus'),
+                'documento_atual' in st.session_state
+            )
+            st.session_state.setdefault('uso_tokens', []).append(uso_tokens)
+            st.session_state['ultimo_roteamento'] = decisao
+
+            # Gerar e mostrar resposta da IA
+            with span('chat.stream', modelo=decisao['modelo']) as stream_span:
+                with st.chat_message('ai'):
+                    stream = chain.stream({
+                        'input': entrada, 
+                        'chat_history': historico
+                        }, config=config_roteamento(decisao))
+                    resposta = st.write_stream(medir_latencia_stream(acompanhar_uso_stream(stream, uso_tokens), decisao))
+                    if trechos:
+                        st.caption('Fontes: ' + '; '.join(descrever_fontes(trechos)))
+                stream_span.definir(**metricas_stream(uso_tokens, decisao))
+            turno.definir(modelo=decisao['modelo'], motivo_roteamento=decisao['motivo'])
         
         # Adicionar à memória
         memoria.chat_memory.add_user_message(input_usuario)
         memoria.chat_memory.add_ai_message(resposta)
         st.session_state['memoria'] = memoria
         
-        # Rerun para atualizar
-        st.rerun()
-
-def listar_arquivos_salvos():
-    """Lista arquivos salvos com metadados"""
+        # Persistir a conversa (gravação em lote, em segundo plano)
+        usuario, sessao = identificar_sessao()
+        registrar_mensagem(usuario, sessao, 'human', input_usuario)
+        registrar_mensagem(usuario, sessao, 'ai', resposta)
+        
+        # Rerun apenas do chat para atualizar
+        st.rerun(scope='fragment')
+
+def preparar_turno(pergunta, mensagens, system_message, indices_corpus=None, tem_documento=False):
+    """Monta a entrada do turno, ajusta o histórico ao orçamento e escolhe o modelo
+
+    Retorna a entrada enviada ao modelo, os trechos recuperados, o histórico ajustado,
+    o registro de uso de tokens e a decisão de roteamento.
+    """
+    with span('chat.preparar_prompt'):
+        # Com vários documentos, a pergunta segue acompanhada dos trechos mais relevantes
+        entrada = pergunta
+        trechos = []
+        if indices_corpus:
+            trechos = buscar_trechos(indices_corpus, pergunta)
+            entrada = montar_entrada(pergunta, trechos)
+        
+        historico, uso_tokens = ajustar_ao_orcamento(system_message, mensagens, entrada, MODELO_PESADO)
+        decisao = escolher_modelo(pergunta, uso_tokens['tokens_total'], tem_documento)
+        uso_tokens['modelo'] = decisao['modelo']
+    return entrada, trechos, historico, uso_tokens, decisao
+
+def descrever_fontes(trechos):
+    """Fontes citadas na resposta, no formato 'documento (trecho N)'"""
+    return sorted({f"{t['fonte']} (trecho {t['trecho']})" for t in trechos})
+
+def metricas_stream(uso_tokens, decisao):
+    """Métricas do stream da resposta registradas no rastreamento"""
+    tokens_resposta = uso_tokens.get('tokens_resposta', 0)
+    tempo_geracao = decisao['latencia_s'] - decisao['ttft_s']
+    return {
+        'ttft_s': decisao['ttft_s'],
+        'duracao_stream_s': decisao['latencia_s'],
+        'tokens_prompt': uso_tokens.get('tokens_prompt_api', uso_tokens['tokens_total']),
+        'tokens_resposta': tokens_resposta,
+        'tokens_por_segundo': round(tokens_resposta / tempo_geracao, 1) if tempo_geracao > 0 else 0,
+    }
+
+def identificar_sessao():
+    """Usuário e sessão da conversa; a sessão fica na URL para sobreviver a um refresh
+
+    O usuário vem do cabeçalho X-Usuario preenchido pelo proxy de autenticação, o mesmo usado pela
+    API, para que o histórico seja o mesmo nas duas. (Num servidor próprio, st.experimental_user
+    devolve o mesmo e-mail de teste para todos os visitantes.)
+    """
+    if 'sessao' not in st.query_params:
+        st.query_params['sessao'] = uuid.uuid4().hex
+    usuario = (st.context.headers.get('X-Usuario') or '').strip() or 'anonimo'
+    return usuario, st.query_params['sessao']
+
+def converter_mensagens(linhas):
+    """Converte linhas do armazenamento de conversas em mensagens do LangChain"""
+    return [HumanMessage(content=conteudo) if tipo == 'human' else AIMessage(content=conteudo)
+            for _, tipo, conteudo in linhas]
+
+def carregar_memoria():
+    """Memória da sessão; na primeira execução lê do armazenamento apenas as mensagens mais recentes"""
+    if 'memoria' not in st.session_state:
+        usuario, sessao = identificar_sessao()
+        linhas = carregar_mensagens(usuario, sessao, MENSAGENS_POR_PAGINA)
+        memoria = ConversationBufferMemory()
+        memoria.chat_memory.add_messages(converter_mensagens(linhas))
+        st.session_state['memoria'] = memoria
+        st.session_state['id_mensagem_mais_antiga'] = linhas[0][0] if linhas else None
+        st.session_state['historico_anterior'] = len(linhas) == MENSAGENS_POR_PAGINA
+    return st.session_state['memoria']
+
+def carregar_historico_anterior():
+    """Busca no armazenamento a página de mensagens anterior às que já estão na memória"""
+    usuario, sessao = identificar_sessao()
+    linhas = carregar_mensagens(usuario, sessao, MENSAGENS_POR_PAGINA, st.session_state['id_mensagem_mais_antiga'])
+    if linhas:
+        memoria = st.session_state['memoria']
+        memoria.chat_memory.messages = converter_mensagens(linhas) + memoria.chat_memory.messages
+        st.session_state['id_mensagem_mais_antiga'] = linhas[0][0]
+    st.session_state['historico_anterior'] = len(linhas) == MENSAGENS_POR_PAGINA
+
+def exibir_historico(mensagens):
+    """Exibe as mensagens mais recentes; as anteriores são carregadas sob demanda, uma página por vez"""
+    paginas = st.session_state.get('paginas_historico', 1)
+    inicio = max(0, len(mensagens) - paginas * MENSAGENS_POR_PAGINA)
+    
+    if inicio > 0 or st.session_state.get('historico_anterior'):
+        if st.button('⬆️ Carregar mensagens anteriores', key='carregar_mensagens_anteriores'):
+            # Páginas que ainda não estão na memória vêm do armazenamento
+            if inicio < MENSAGENS_POR_PAGINA and st.session_state.get('historico_anterior'):
+                carregar_historico_anterior()
+            st.session_state['paginas_historico'] = paginas + 1
+            st.rerun(scope='fragment')
+    
+    for mensagem in mensagens[inicio:]:
+        with st.chat_message(mensagem.type):
+            st.markdown(mensagem.content)
+
+def listar_arquivos_salvos(termo='', tipo=None, data_inicio=None, data_fim=None, pagina=0, por_pagina=ARQUIVOS_POR_PAGINA):
+    """Lista uma página de arquivos salvos a partir do índice, com o total encontrado"""
+    garantir_indice(METADATA_FILE, carregar_metadata, lambda: bloquear_metadata(METADATA_FILE))
+    arquivos_info, total = buscar_arquivos(termo, tipo, data_inicio, data_fim, pagina, por_pagina)
+    
+    # Verificar no disco apenas os arquivos da página
+    for info in arquivos_info:
+        info['disponivel'] = arquivo_disponivel(info['caminho'])
+    
+    return arquivos_info, total
+
+def preparar_documento_salvo(nome_arquivo):
+    """Carrega um documento salvo, retornando a mensagem de sistema e os dados do documento (ou None)"""
     metadata = carregar_metadata()
-    arquivos_info = []
-    
-    for nome_arquivo, info in metadata.items():
-        if os.path.exists(info['caminho']):
-            arquivos_info.append({
-                'nome_arquivo': nome_arquivo,
-                'nome_original': info['nome_original'],
-                'tipo': info['tipo'],
-                'data_upload': info['data_upload'],
-                'tamanho': info['tamanho']
-            })
+    if nome_arquivo not in metadata:
+        return None
+    arquivo_info = metadata[nome_arquivo]
+    tipo = arquivo_info['tipo']
+    if not arquivo_disponivel(arquivo_info['caminho']):
+        return None
+    
+    # Carregar conteúdo do arquivo (do cache de parsing, se já extraído)
+    documento = extrair_texto_salvo(nome_arquivo)
+    if documento is None:
+        return None
+    documento = limitar_documento(documento, MODELO_PESADO, montar_system_message('', tipo))
+    indexar_texto(nome_arquivo, documento)
+    
+    # Registrar o acesso (base da remoção LRU)
+    with atualizar_metadata() as metadata:
+        if nome_arquivo in metadata:
+            registrar_acesso(metadata[nome_arquivo])
     
-    return arquivos_info
+    documento_atual = {
+        'tipo': tipo, 
+        'nome': arquivo_info['nome_original'],
+        'nome_arquivo': nome_arquivo,
+        'conteudo': documento,
+        'compactacao': ler_relatorio_cache(nome_arquivo, arquivo_info)
+    }
+    return montar_system_message(documento, tipo), documento_atual
 
 def carregar_documento_salvo(nome_arquivo):
     """Carrega um documento salvo e reinicializa o ProV.ia com ele"""
     try:
-        metadata = carregar_metadata()
-        if nome_arquivo in metadata:
-            arquivo_info = metadata[nome_arquivo]
-            caminho = arquivo_info['caminho']
-            tipo = arquivo_info['tipo']
-            
-            if os.path.exists(caminho):
-                # Carregar conteúdo do arquivo
-                if tipo == 'Pdf':
-                    documento = carrega_pdf(caminho)
-                elif tipo == 'Csv':
-                    documento = carrega_csv(caminho)
-                elif tipo == 'Txt':
-                    documento = carrega_txt(caminho)
-                else:
-                    return False
-                
-                # Reinicializar ProV.ia com o documento
-                system_message = f'''Você é um assistente amigável chamado ProV.ia.
-                Você é especialista em assuntos internos, dúvidas e questionamentos sobre a Provion.
-                
-                Você possui acesso às seguintes informações vindas de um documento {tipo}: 
-
-                ####
-                {documento}
-                ####
-
-                Utilize as informações fornecidas para basear as suas respostas quando relevante.
-                Seja prestativo, profissional e cordial em suas respostas.
-
-                Sempre que houver $ na sua saída, substitua por S.'''
-
-                template = ChatPromptTemplate.from_messages([
-                    ('system', system_message),
-                    ('placeholder', '{chat_history}'),
-                    ('user', '{input}')
-                ])
-                
-                chat = ChatOpenAI(model=MODELO_FIXO, api_key=OPENAI_API_KEY)
-                chain = template | chat
-
-                st.session_state['chain'] = chain
-                st.session_state['provia_ativo'] = True
-                st.session_state['documento_atual'] = {
-                    'tipo': tipo, 
-                    'nome': arquivo_info['nome_original'],
-                    'conteudo': documento
-                }
-                
-                return True
-        return False
+        preparado = preparar_documento_salvo(nome_arquivo)
+        if preparado is None:
+            return False
+        
+        # Reinicializar ProV.ia com o documento
+        system_message, documento_atual = preparado
+        chain = construir_chain(system_message)
+
+        limpar_corpus()
+        st.session_state['chain'] = chain
+        st.session_state['provia_ativo'] = True
+        st.session_state['documento_atual'] = documento_atual
+        return True
     except Exception as e:
         st.error(f"Erro ao carregar documento: {str(e)}")
         return False
 
+def inicializar_corpus(nomes_arquivos):
+    """Inicializa o ProV.ia sobre vários documentos salvos, consultados por trechos a cada pergunta"""
+    metadata = carregar_metadata()
+    indices = []
+    indexados = []
+    for nome_arquivo in nomes_arquivos:
+        if nome_arquivo in metadata:
+            indice = obter_indice_arquivo(nome_arquivo, metadata[nome_arquivo], extrair_texto_salvo)
+            if indice is not None:
+                indices.append(indice)
+                indexados.append(nome_arquivo)
+    
+    # Registrar o acesso (recarregando: a extração pode ter descomprimido arquivos)
+    with atualizar_metadata() as metadata:
+        for nome_arquivo in indexados:
+            if nome_arquivo in metadata:
+                registrar_acesso(metadata[nome_arquivo])
+    if not indices:
+        return False
+    
+    fontes = [indice['fonte'] for indice in indices]
+    st.session_state['chain'] = construir_chain(montar_system_message_corpus(fontes))
+    st.session_state['provia_ativo'] = True
+    # Só os documentos indexados, alinhados com as fontes (um arquivo que falhou fica de fora)
+    st.session_state['corpus'] = indexados
+    st.session_state['indices_corpus'] = indices
+    st.session_state['documento_atual'] = {
+        'tipo': 'Múltiplos documentos',
+        'nome': ', '.join(fontes),
+        'fontes': fontes
+    }
+    return True
+
+def anexar_documento(nome_arquivo):
+    """Adiciona um documento salvo à sessão de múltiplos documentos
+
+    Se um único documento salvo estiver carregado, ele passa a fazer parte do corpus junto do novo.
+    """
+    if 'corpus' in st.session_state:
+        corpus = st.session_state['corpus']
+    else:
+        nome_atual = st.session_state.get('documento_atual', {}).get('nome_arquivo')
+        corpus = [nome_atual] if nome_atual else []
+    if nome_arquivo in corpus:
+        return True
+    return inicializar_corpus(corpus + [nome_arquivo]) and nome_arquivo in st.session_state['corpus']
+
+def desanexar_documento(nome_arquivo):
+    """Remove um documento da sessão de múltiplos documentos"""
+    corpus = [n for n in st.session_state.get('corpus', []) if n != nome_arquivo]
+    if not corpus or not inicializar_corpus(corpus):
+        limpar_corpus()
+        st.session_state['chain'] = inicializar_provia_padrao()
+        st.session_state.pop('documento_atual', None)
+
+def limpar_corpus():
+    """Sai do modo de múltiplos documentos"""
+    st.session_state.pop('corpus', None)
+    st.session_state.pop('indices_corpus', None)
+
 def deletar_arquivo(nome_arquivo):
     """Deleta um arquivo salvo"""
     try:
-        metadata = carregar_metadata()
-        if nome_arquivo in metadata:
+        with atualizar_metadata() as metadata:
+            if nome_arquivo not in metadata:
+                return False
             arquivo_info = metadata[nome_arquivo]
-            caminho = arquivo_info['caminho']
+            caminho = caminho_armazenado(arquivo_info)
             
             # Deletar arquivo físico
             if os.path.exists(caminho):
                 os.remove(caminho)
             
-            # Remover dos metadados
+            # Remover derivados e dos metadados
+            remover_derivados(nome_arquivo)
             del metadata[nome_arquivo]
-            salvar_metadata(metadata)
-            
-            return True
-        return False
+        
+        # Tirar da sessão de múltiplos documentos
+        if nome_arquivo in st.session_state.get('corpus', []):
+            desanexar_documento(nome_arquivo)
+        return True
     except Exception as e:
         st.error(f"Erro ao deletar arquivo: {str(e)}")
         return False
 
+@st.cache_resource
+def manutencao_armazenamento():
+    """Aplica a cota de disco e remove órfãos uma vez por processo, na inicialização"""
+    with atualizar_metadata() as metadata:
+        metadata, relatorio = aplicar_cota(metadata, UPLOAD_DIR)
+    print(f"Armazenamento: {relatorio}")
+    return relatorio
+
+@st.cache_resource
+def aquecer_em_segundo_plano():
+    """Inicia o aquecimento uma única vez por processo, se habilitado"""
+    return iniciar_aquecimento(carregar_metadata, extrair_texto_salvo)
+
 def sidebar():
-    st.sidebar.title("⚙️ Configurações do ProV.ia")
+    with st.sidebar:
+        st.title("⚙️ Configurações do ProV.ia")
+        
+        # Painel de documentos roda como fragmento: suas ações não reexecutam o chat
+        painel_documentos()
+        
+        st.markdown("---")
+    
+        # Botão para limpar histórico
+        if st.button('🗑️ Limpar Histórico', use_container_width=True):
+            # Inicia uma nova conversa; a anterior permanece no armazenamento
+            st.query_params['sessao'] = uuid.uuid4().hex
+            st.session_state['memoria'] = ConversationBufferMemory()
+            st.session_state['paginas_historico'] = 1
+            st.session_state['id_mensagem_mais_antiga'] = None
+            st.session_state['historico_anterior'] = False
+            st.success('Histórico limpo!')
+            st.rerun()
     
+        # Informações do modelo
+        st.markdown("---")
+        st.subheader("🤖 Modelo Ativo")
+        st.info(f"**Modelos:** {MODELO_PESADO} / {MODELO_RAPIDO}\n**Provider:** OpenAI\n**Status:** ✅ Configurado")
+
+@st.fragment
+def painel_documentos():
+    """Documento ativo, upload e arquivos armazenados, reexecutados de forma independente do chat"""
     # Mostrar documento atual se houver
     if 'documento_atual' in st.session_state:
         doc_info = st.session_state['documento_atual']
-        st.sidebar.success(f"📄 **Documento Ativo:**\n{doc_info.get('nome', 'Documento carregado')}\n*Tipo: {doc_info['tipo']}*")
+        if 'corpus' in st.session_state:
+            st.success(f"📚 **Documentos Ativos:** {len(st.session_state['corpus'])}")
+            for nome_arquivo, fonte in zip(st.session_state['corpus'], doc_info['fontes']):
+                col1, col2 = st.columns([4, 1])
+                with col1:
+                    st.caption(f"📄 {fonte}")
+                with col2:
+                    if st.button('✖', key=f"desanexar_{nome_arquivo}"):
+                        desanexar_documento(nome_arquivo)
+                        st.rerun(scope='fragment')
+        else:
+            st.success(f"📄 **Documento Ativo:**\n{doc_info.get('nome', 'Documento carregado')}\n*Tipo: {doc_info['tipo']}*")
+            if doc_info.get('compactacao'):
+                st.caption(f"Compactação: {descrever_compactacao(doc_info['compactacao'])}")
         
-        if st.sidebar.button('🔄 Voltar ao Modo Padrão', use_container_width=True):
+        if st.button('🔄 Voltar ao Modo Padrão', use_container_width=True):
             st.session_state['chain'] = inicializar_provia_padrao()
+            limpar_corpus()
             if 'documento_atual' in st.session_state:
                 del st.session_state['documento_atual']
-            st.sidebar.success('ProV.ia voltou ao modo padrão!')
-            st.rerun()
+            st.success('ProV.ia voltou ao modo padrão!')
+            st.rerun(scope='fragment')
     
-    st.sidebar.markdown("---")
+    st.markdown("---")
     
     # Seção de Upload de Arquivos
-    st.sidebar.subheader("📁 Upload de Documentos")
-    tipo_arquivo = st.sidebar.selectbox('Tipo de documento', TIPOS_ARQUIVOS_VALIDOS)
+    st.subheader("📁 Upload de Documentos")
+    tipo_arquivo = st.selectbox('Tipo de documento', TIPOS_ARQUIVOS_VALIDOS)
     
     arquivo = None
     if tipo_arquivo == 'Site':
-        arquivo = st.sidebar.text_input('URL do site')
+        arquivo = st.text_input('URL do site')
     elif tipo_arquivo == 'Youtube':
-        arquivo = st.sidebar.text_input('URL do vídeo YouTube')
+        arquivo = st.text_input('URL do vídeo YouTube')
     elif tipo_arquivo == 'Pdf':
-        arquivo = st.sidebar.file_uploader('Upload arquivo PDF', type=['pdf'])
+        arquivo = st.file_uploader('Upload arquivo PDF', type=['pdf'])
     elif tipo_arquivo == 'Csv':
-        arquivo = st.sidebar.file_uploader('Upload arquivo CSV', type=['csv'])
+        arquivo = st.file_uploader('Upload arquivo CSV', type=['csv'])
     elif tipo_arquivo == 'Txt':
-        arquivo = st.sidebar.file_uploader('Upload arquivo TXT', type=['txt'])
+        arquivo = st.file_uploader('Upload arquivo TXT', type=['txt'])
     
     # Botão para processar documento
-    if st.sidebar.button('🚀 Processar Documento', use_container_width=True):
+    if st.button('🚀 Processar Documento', use_container_width=True):
         if not arquivo:
-            st.sidebar.error('Por favor, selecione um documento!')
+            st.error('Por favor, selecione um documento!')
         else:
             # Usar spinner normal em vez de sidebar.spinner
             with st.spinner('Processando documento...'):
                 try:
                     inicializar_provia(tipo_arquivo, arquivo)
-                    st.sidebar.success('Documento processado! ProV.ia atualizado com as novas informações.')
-                    st.rerun()
+                    st.success('Documento processado! ProV.ia atualizado com as novas informações.')
+                    st.rerun(scope='fragment')
                 except Exception as e:
-                    st.sidebar.error(f'Erro ao processar documento: {str(e)}')
-    
-    st.sidebar.markdown("---")
-    
-    # Seção de Arquivos Salvos - CORRIGIDA
-    st.sidebar.subheader("💾 Arquivos Armazenados")
-    arquivos_salvos = listar_arquivos_salvos()
+                    st.error(f'Erro ao processar documento: {str(e)}')
+    
+    st.markdown("---")
+    
+    # Seção de Arquivos Salvos - paginada e servida pelo índice
+    st.subheader("💾 Arquivos Armazenados")
+    termo = st.text_input('Buscar', placeholder='Nome ou conteúdo do arquivo', key='busca_arquivos')
+    filtro_tipo = st.selectbox('Filtrar por tipo', ['Todos', 'Pdf', 'Csv', 'Txt'], key='filtro_tipo_arquivos')
+    periodo = st.date_input('Período de upload', value=(), key='filtro_data_arquivos')
+    data_inicio = periodo[0] if len(periodo) > 0 else None
+    data_fim = periodo[1] if len(periodo) > 1 else None
+    
+    # Voltar para a primeira página quando os filtros mudam
+    filtros = (termo, filtro_tipo, data_inicio, data_fim)
+    if st.session_state.get('filtros_arquivos') != filtros:
+        st.session_state['filtros_arquivos'] = filtros
+        st.session_state['pagina_arquivos'] = 0
+    pagina = st.session_state.get('pagina_arquivos', 0)
+    
+    arquivos_salvos, total = listar_arquivos_salvos(
+        termo, None if filtro_tipo == 'Todos' else filtro_tipo, data_inicio, data_fim, pagina
+    )
     
     if arquivos_salvos:
-        st.sidebar.write(f"**Total de arquivos: {len(arquivos_salvos)}**")
+        total_paginas = (total + ARQUIVOS_POR_PAGINA - 1) // ARQUIVOS_POR_PAGINA
+        st.write(f"**Total de arquivos: {total}**")
         
-        # Mostrar arquivos salvos com opções
-        for i, arquivo_info in enumerate(arquivos_salvos[-10:]):  # Últimos 10 arquivos
-            with st.sidebar.expander(f"📄 {arquivo_info['nome_original']}", expanded=False):
+        # Mostrar arquivos da página com opções
+        for arquivo_info in arquivos_salvos:
+            with st.expander(f"📄 {arquivo_info['nome_original']}", expanded=False):
                 st.write(f"**Tipo:** {arquivo_info['tipo']}")
                 st.write(f"**Data:** {arquivo_info['data_upload'][:16]}")
                 st.write(f"**Tamanho:** {arquivo_info['tamanho']} bytes")
+                if not arquivo_info['disponivel']:
+                    st.warning("Arquivo não encontrado no disco")
                 
-                col1, col2 = st.columns(2)
+                col1, col2, col3 = st.columns(3)
                 
                 with col1:
-                    if st.button('📖 Carregar', key=f"load_{i}_{arquivo_info['nome_arquivo']}", use_container_width=True):
+                    if st.button('📖 Carregar', key=f"load_{arquivo_info['nome_arquivo']}", use_container_width=True,
+                                 disabled=not arquivo_info['disponivel']):
                         if carregar_documento_salvo(arquivo_info['nome_arquivo']):
                             st.success(f"Documento '{arquivo_info['nome_original']}' carregado!")
-                            st.rerun()
+                            st.rerun(scope='fragment')
                         else:
                             st.error("Erro ao carregar documento!")
                 
                 with col2:
-                    if st.button('🗑️ Deletar', key=f"del_{i}_{arquivo_info['nome_arquivo']}", use_container_width=True):
+                    if st.button('➕ Anexar', key=f"add_{arquivo_info['nome_arquivo']}", use_container_width=True,
+                                 help='Consultar junto com os outros documentos anexados',
+                                 disabled=not arquivo_info['disponivel']):
+                        if anexar_documento(arquivo_info['nome_arquivo']):
+                            st.success(f"Documento '{arquivo_info['nome_original']}' anexado!")
+                            st.rerun(scope='fragment')
+                        else:
+                            st.error("Erro ao anexar documento!")
+                
+                with col3:
+                    if st.button('🗑️ Deletar', key=f"del_{arquivo_info['nome_arquivo']}", use_container_width=True):
                         if deletar_arquivo(arquivo_info['nome_arquivo']):
                             st.success("Arquivo deletado!")
-                            st.rerun()
+                            st.rerun(scope='fragment')
                         else:
                             st.error("Erro ao deletar arquivo!")
+        
+        # Navegação entre páginas
+        if total_paginas > 1:
+            col1, col2, col3 = st.columns([1, 2, 1])
+            with col1:
+                if st.button('◀', key='pagina_anterior_arquivos', disabled=pagina == 0):
+                    st.session_state['pagina_arquivos'] = pagina - 1
+                    st.rerun(scope='fragment')
+            with col2:
+                st.caption(f"Página {pagina + 1} de {total_paginas}")
+            with col3:
+                if st.button('▶', key='proxima_pagina_arquivos', disabled=pagina + 1 >= total_paginas):
+                    st.session_state['pagina_arquivos'] = pagina + 1
+                    st.rerun(scope='fragment')
+    elif pagina > 0:
+        # Página ficou vazia (ex.: após deletar o último arquivo dela)
+        st.session_state['pagina_arquivos'] = max(0, pagina - 1)
+        st.rerun(scope='fragment')
+    elif termo or filtro_tipo != 'Todos' or data_inicio:
+        st.info("🔎 Nenhum arquivo encontrado com esses filtros")
     else:
-        st.sidebar.info("📂 Nenhum arquivo salvo ainda")
-    
-    st.sidebar.markdown("---")
-    
-    # Botão para limpar histórico
-    if st.sidebar.button('🗑️ Limpar Histórico', use_container_width=True):
-        st.session_state['memoria'] = ConversationBufferMemory()
-        st.sidebar.success('Histórico limpo!')
-        st.rerun()
-    
-    # Informações do modelo
-    st.sidebar.markdown("---")
-    st.sidebar.subheader("🤖 Modelo Ativo")
-    st.sidebar.info(f"**Modelo:** {MODELO_FIXO}\n**Provider:** OpenAI\n**Status:** ✅ Configurado")
+        st.info("📂 Nenhum arquivo salvo ainda")
 
 def main():
     # Configurar página
@@ -1029,12 +838,19 @@ def main():
     # Limpar estado para evitar duplicações
     if 'app_clean' not in st.session_state:
         # Limpar tudo exceto algumas chaves essenciais
-        keys_to_keep = ['app_clean', 'chain', 'memoria', 'documento_atual']
+        keys_to_keep = ['app_clean', 'chain', 'memoria', 'documento_atual', 'system_message', 'uso_tokens',
+                        'corpus', 'indices_corpus']
         for key in list(st.session_state.keys()):
             if key not in keys_to_keep:
                 del st.session_state[key]
         st.session_state['app_clean'] = True
     
+    # Cota de disco e limpeza de órfãos (apenas na primeira execução do processo)
+    manutencao_armazenamento()
+    
+    # Aquecimento opcional em segundo plano (imports pesados, caches e índices dos arquivos recentes)
+    aquecer_em_segundo_plano()
+    
     # Sidebar
     sidebar()
     
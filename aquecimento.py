@@ -0,0 +1,48 @@
+import os
+import importlib
+import threading
+
+from loaders import REGISTRO_LOADERS, obter_loader
+from corpus import obter_indice_arquivo
+from armazenamento import ultimo_acesso
+
+# Aquecimento em segundo plano na inicialização (desligado por padrão)
+AQUECIMENTO_ATIVO = os.getenv('PROVIA_WARMUP', '0') == '1'
+ARQUIVOS_AQUECIDOS = int(os.getenv('PROVIA_WARMUP_ARQUIVOS', '5'))
+
+def aquecer_imports():
+    """Importa antecipadamente os loaders e o cliente da OpenAI"""
+    for nome in REGISTRO_LOADERS:
+        try:
+            obter_loader(nome)
+        except ImportError as e:
+            print(f'Aquecimento: não foi possível importar {nome}: {e}')
+    importlib.import_module('langchain_openai')
+
+def aquecer_arquivos(metadata, extrair_texto, quantidade=ARQUIVOS_AQUECIDOS):
+    """Prepara o cache de parsing e o índice dos arquivos usados mais recentemente"""
+    recentes = sorted(metadata, key=lambda nome: ultimo_acesso(metadata[nome]), reverse=True)
+    for nome_arquivo in recentes[:quantidade]:
+        info = metadata[nome_arquivo]
+        # Arquivos comprimidos estão frios e descomprimi-los alteraria o metadata
+        if info.get('comprimido') or not os.path.exists(info['caminho']):
+            continue
+        try:
+            extrair_texto(nome_arquivo)
+            obter_indice_arquivo(nome_arquivo, info, extrair_texto)
+        except Exception as e:
+            print(f'Aquecimento: erro ao preparar {nome_arquivo}: {e}')
+
+def iniciar_aquecimento(carregar_metadata, extrair_texto):
+    """Inicia o aquecimento em uma thread de segundo plano, se habilitado"""
+    if not AQUECIMENTO_ATIVO:
+        return None
+
+    def aquecer():
+        aquecer_imports()
+        aquecer_arquivos(carregar_metadata(), extrair_texto)
+        print('Aquecimento concluído')
+
+    thread = threading.Thread(target=aquecer, name='aquecimento', daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,271 @@
+import os
+import glob
+import gzip
+import json
+import time
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+from corpus import DIRETORIO_CACHE
+from indice import ARQUIVO_INDICE
+
+# Cota de disco para uploads + artefatos derivados (configurável por variável de ambiente)
+COTA_BYTES = int(float(os.getenv('PROVIA_COTA_MB', '1024')) * 1024 * 1024)
+
+# Arquivos sem acesso há mais tempo que isso são comprimidos
+DIAS_ARQUIVO_FRIO = int(os.getenv('PROVIA_DIAS_ARQUIVO_FRIO', '30'))
+
+# PDFs já são comprimidos; só vale a pena comprimir texto
+TIPOS_COMPRIMIVEIS = ['Csv', 'Txt']
+SUFIXO_COMPRIMIDO = '.gz'
+
+# Arquivos modificados há menos tempo que isso nunca são removidos: um upload é gravado no disco
+# antes de entrar no metadata, e outra sessão pode aplicar a cota nesse intervalo
+CARENCIA_SEGUNDOS = int(os.getenv('PROVIA_CARENCIA_S', '600'))
+
+# Artefatos derivados seguem o padrão <nome_arquivo>.<artefato>.<extensão> em DIRETORIO_CACHE
+
+def _tamanho(caminho):
+    try:
+        return os.path.getsize(caminho)
+    except OSError:
+        return 0
+
+def _tamanho_diretorio(diretorio):
+    if not os.path.isdir(diretorio):
+        return 0
+    return sum(entrada.stat().st_size for entrada in os.scandir(diretorio) if entrada.is_file())
+
+def _remover(caminho):
+    try:
+        os.remove(caminho)
+        return True
+    except OSError:
+        return False
+
+class MetadataIlegivel(dict):
+    """Metadata vazio devolvido quando o arquivo existe mas não pôde ser lido
+
+    Sem saber quais arquivos são conhecidos, limpeza e remoção pela cota não são feitas,
+    e o metadata não pode ser gravado por cima do arquivo original.
+    """
+
+_lock_metadata = threading.RLock()
+_profundidade_lock = 0
+
+def _travar(arquivo):
+    if fcntl is not None:
+        fcntl.flock(arquivo.fileno(), fcntl.LOCK_EX)
+        return
+    while True:
+        try:
+            msvcrt.locking(arquivo.fileno(), msvcrt.LK_LOCK, 1)
+            return
+        except OSError:
+            # LK_LOCK desiste após 10 tentativas; continua aguardando
+            continue
+
+def _destravar(arquivo):
+    if fcntl is not None:
+        fcntl.flock(arquivo.fileno(), fcntl.LOCK_UN)
+    else:
+        arquivo.seek(0)
+        msvcrt.locking(arquivo.fileno(), msvcrt.LK_UNLCK, 1)
+
+@contextmanager
+def bloquear_metadata(arquivo_metadata):
+    """Exclusão mútua entre threads e processos (app, API, lote) sobre o metadata
+
+    Reentrante na mesma thread; o lock do sistema de arquivos fica em <arquivo_metadata>.lock.
+    """
+    global _profundidade_lock
+    with _lock_metadata:
+        if _profundidade_lock:
+            _profundidade_lock += 1
+            try:
+                yield
+            finally:
+                _profundidade_lock -= 1
+            return
+        with open(arquivo_metadata + '.lock', 'a+b') as arquivo:
+            _travar(arquivo)
+            _profundidade_lock = 1
+            try:
+                yield
+            finally:
+                _profundidade_lock = 0
+                _destravar(arquivo)
+
+def gravar_atomico(caminho, texto):
+    """Grava o texto em um arquivo temporário no mesmo diretório e o move para o destino
+
+    Leitores concorrentes veem o arquivo antigo ou o novo, nunca um arquivo pela metade.
+    """
+    diretorio = os.path.dirname(caminho) or '.'
+    descritor, temporario = tempfile.mkstemp(dir=diretorio, prefix='.' + os.path.basename(caminho) + '.',
+                                             suffix='.tmp')
+    try:
+        with os.fdopen(descritor, 'w', encoding='utf-8') as f:
+            f.write(texto)
+        os.replace(temporario, caminho)
+    except BaseException:
+        _remover(temporario)
+        raise
+
+def ler_metadata(arquivo_metadata):
+    """Metadata do arquivo; {} se ele não existir e MetadataIlegivel se não puder ser lido"""
+    if not os.path.exists(arquivo_metadata):
+        return {}
+    try:
+        with open(arquivo_metadata, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f'Erro ao ler {arquivo_metadata}: {e!r}; limpeza e gravação suspensas')
+        return MetadataIlegivel()
+
+def gravar_metadata(arquivo_metadata, metadata):
+    """Grava o metadata de forma atômica (quem chama deve segurar bloquear_metadata)"""
+    if isinstance(metadata, MetadataIlegivel):
+        raise ValueError(f'{arquivo_metadata} não pôde ser lido; restaure-o antes de gravar o metadata')
+    gravar_atomico(arquivo_metadata, json.dumps(metadata, ensure_ascii=False, indent=2))
+
+def _recente(caminho):
+    """Indica se o arquivo foi modificado dentro do período de carência"""
+    try:
+        return time.time() - os.path.getmtime(caminho) < CARENCIA_SEGUNDOS
+    except OSError:
+        return False
+
+def caminho_armazenado(info):
+    """Caminho do arquivo como está no disco (comprimido ou não)"""
+    return info['caminho'] + SUFIXO_COMPRIMIDO if info.get('comprimido') else info['caminho']
+
+def arquivo_disponivel(caminho):
+    """Indica se o arquivo existe no disco, comprimido ou não"""
+    return os.path.exists(caminho) or os.path.exists(caminho + SUFIXO_COMPRIMIDO)
+
+def arquivos_derivados(nome_arquivo):
+    """Caches e índices derivados de um arquivo"""
+    return glob.glob(os.path.join(DIRETORIO_CACHE, glob.escape(nome_arquivo) + '.*'))
+
+def remover_derivados(nome_arquivo):
+    """Remove os caches e índices derivados de um arquivo, retornando os bytes liberados"""
+    liberados = 0
+    for caminho in arquivos_derivados(nome_arquivo):
+        tamanho = _tamanho(caminho)
+        if _remover(caminho):
+            liberados += tamanho
+    return liberados
+
+def registrar_acesso(info):
+    """Marca o arquivo como usado agora (base da remoção LRU)"""
+    info['ultimo_acesso'] = datetime.now().isoformat()
+
+def ultimo_acesso(info):
+    """Data do último carregamento do arquivo (ou do upload, se nunca foi carregado)"""
+    return info.get('ultimo_acesso') or info['data_upload']
+
+def comprimir(info):
+    """Comprime o arquivo no disco; ele é descomprimido de forma transparente no próximo acesso"""
+    caminho = info['caminho']
+    if info.get('comprimido') or not os.path.exists(caminho):
+        return False
+    with open(caminho, 'rb') as origem, gzip.open(caminho + SUFIXO_COMPRIMIDO, 'wb') as destino:
+        shutil.copyfileobj(origem, destino)
+    os.remove(caminho)
+    info['comprimido'] = True
+    return True
+
+def descomprimir(info):
+    """Restaura o arquivo original para que os loaders possam lê-lo"""
+    caminho = info['caminho']
+    if not info.get('comprimido'):
+        return
+    if os.path.exists(caminho + SUFIXO_COMPRIMIDO):
+        with gzip.open(caminho + SUFIXO_COMPRIMIDO, 'rb') as origem, open(caminho, 'wb') as destino:
+            shutil.copyfileobj(origem, destino)
+        os.remove(caminho + SUFIXO_COMPRIMIDO)
+    info['comprimido'] = False
+
+def uso_disco(diretorio_uploads):
+    """Bytes usados pelos uploads, pelos artefatos derivados e pelo índice de arquivos"""
+    uploads = _tamanho_diretorio(diretorio_uploads)
+    derivados = _tamanho_diretorio(DIRETORIO_CACHE)
+    indice = sum(_tamanho(ARQUIVO_INDICE + sufixo) for sufixo in ('', '-wal', '-journal'))
+    return {'uploads': uploads, 'derivados': derivados, 'indice': indice, 'total': uploads + derivados + indice}
+
+def limpar_orfaos(metadata, diretorio_uploads):
+    """Remove uploads e artefatos derivados que não aparecem mais no metadata
+
+    Nada é removido se o metadata não pôde ser lido, nem arquivos dentro do período de carência.
+    """
+    if isinstance(metadata, MetadataIlegivel):
+        return 0
+    removidos = 0
+    conhecidos = {os.path.basename(caminho_armazenado(info)) for info in metadata.values()}
+    if os.path.isdir(diretorio_uploads):
+        for entrada in os.scandir(diretorio_uploads):
+            if entrada.is_file() and entrada.name not in conhecidos and not _recente(entrada.path):
+                removidos += _remover(entrada.path)
+    if os.path.isdir(DIRETORIO_CACHE):
+        for entrada in os.scandir(DIRETORIO_CACHE):
+            if entrada.is_file() and entrada.name.rsplit('.', 2)[0] not in metadata and not _recente(entrada.path):
+                removidos += _remover(entrada.path)
+    return removidos
+
+def aplicar_cota(metadata, diretorio_uploads, cota=None):
+    """Limpa órfãos, comprime arquivos frios e, acima da cota, remove o que foi usado há mais tempo
+
+    Primeiro são descartados os derivados (reconstruíveis) e só depois os próprios uploads.
+    Retorna o metadata atualizado e um relatório das ações.
+    """
+    if cota is None:
+        cota = COTA_BYTES
+    if isinstance(metadata, MetadataIlegivel):
+        return metadata, {'ignorado': 'metadata ilegível'}
+    relatorio = {'orfaos_removidos': limpar_orfaos(metadata, diretorio_uploads), 'comprimidos': 0,
+                 'derivados_removidos': 0, 'arquivos_removidos': []}
+
+    limite_frio = (datetime.now() - timedelta(days=DIAS_ARQUIVO_FRIO)).isoformat()
+    for info in metadata.values():
+        if info['tipo'] in TIPOS_COMPRIMIVEIS and ultimo_acesso(info) < limite_frio:
+            relatorio['comprimidos'] += comprimir(info)
+
+    uso = uso_disco(diretorio_uploads)['total']
+    relatorio['bytes_antes'] = uso
+    menos_usados = sorted(metadata, key=lambda nome: ultimo_acesso(metadata[nome]))
+
+    for nome_arquivo in menos_usados:
+        if uso <= cota:
+            break
+        liberados = remover_derivados(nome_arquivo)
+        if liberados:
+            relatorio['derivados_removidos'] += 1
+            uso -= liberados
+
+    # O arquivo usado por último e os que estão no período de carência nunca são removidos
+    for nome_arquivo in menos_usados[:-1]:
+        if uso <= cota:
+            break
+        caminho = caminho_armazenado(metadata[nome_arquivo])
+        if _recente(caminho):
+            continue
+        tamanho = _tamanho(caminho)
+        if os.path.exists(caminho) and not _remover(caminho):
+            continue
+        uso -= tamanho + remover_derivados(nome_arquivo)
+        del metadata[nome_arquivo]
+        relatorio['arquivos_removidos'].append(nome_arquivo)
+
+    relatorio['bytes_depois'] = uso
+    return metadata, relatorio
@@ -0,0 +1,64 @@
+import os
+import re
+import base64
+import hashlib
+
+import streamlit as st
+
+# Caminhos relativos ao app, não ao diretório de onde o Streamlit foi iniciado
+DIRETORIO_APP = os.path.dirname(os.path.abspath(__file__))
+
+# Arquivos servidos pelo Streamlit em app/static (server.enableStaticServing), a partir da pasta
+# static ao lado do script principal
+DIRETORIO_STATIC = os.path.join(DIRETORIO_APP, 'static')
+URL_STATIC = 'app/static'
+ARQUIVO_CSS = os.path.join(DIRETORIO_STATIC, 'provia.css')
+IMAGEM_CEREBRO = os.path.join(DIRETORIO_APP, 'cerebro_ia.png')
+IMAGEM_LOGO = os.path.join(DIRETORIO_APP, 'logo_provion.png')
+
+def minificar_css(css):
+    """Remove comentários e espaços desnecessários do CSS"""
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.DOTALL)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};,>])\s*', r'\1', css)
+    css = re.sub(r':\s+', ':', css)
+    return css.strip()
+
+def publicar_imagem(caminho):
+    """Publica a imagem no diretório estático com o hash do conteúdo no nome e retorna sua URL
+
+    O nome muda sempre que o conteúdo muda, então o navegador pode manter a imagem em cache.
+    Se não for possível escrever no diretório estático, retorna a imagem embutida em base64.
+    """
+    if not os.path.exists(caminho):
+        print(f"❌ Arquivo {caminho} não encontrado")
+        return None
+    with open(caminho, 'rb') as f:
+        dados = f.read()
+    base, extensao = os.path.splitext(os.path.basename(caminho))
+    nome = f'{base}.{hashlib.sha256(dados).hexdigest()[:12]}{extensao}'
+    destino = os.path.join(DIRETORIO_STATIC, nome)
+    try:
+        if not os.path.exists(destino):
+            os.makedirs(DIRETORIO_STATIC, exist_ok=True)
+            with open(destino, 'wb') as f:
+                f.write(dados)
+        return f'{URL_STATIC}/{nome}'
+    except OSError as e:
+        print(f"❌ Erro ao publicar {caminho}: {e}")
+        return f'data:image/png;base64,{base64.b64encode(dados).decode()}'
+
+@st.cache_resource
+def construir_assets():
+    """Prepara CSS e imagens da página uma única vez por processo"""
+    try:
+        with open(ARQUIVO_CSS, 'r', encoding='utf-8') as f:
+            css = minificar_css(f.read())
+    except OSError as e:
+        print(f"❌ Erro ao carregar {ARQUIVO_CSS}: {e}")
+        css = ''
+    return {
+        'css': f'<style>{css}</style>',
+        'cerebro': publicar_imagem(IMAGEM_CEREBRO),
+        'logo': publicar_imagem(IMAGEM_LOGO),
+    }
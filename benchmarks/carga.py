@@ -0,0 +1,342 @@
+"""Teste de carga: várias sessões simuladas do app rodando sem navegador (streamlit.testing)
+
+Cada sessão abre o app, envia um documento, carrega-o pela lista de arquivos armazenados,
+conversa com o modelo simulado e limpa o histórico. Para cada nível de concorrência são medidos
+os percentis de latência por rerun, a memória por sessão e a vazão, e ao final é gerado um
+relatório de capacidade.
+
+Uso (a partir da raiz do repositório):
+    python benchmarks/carga.py                                  # níveis 1, 2, 4, 8 e 16
+    python benchmarks/carga.py --niveis 1,8,32 --perguntas 5
+    python benchmarks/carga.py --slo 1.5 --saida capacidade.md
+
+O upload é feito pela mesma função do app (salvar_arquivo_uploaded), pois o AppTest ainda
+não simula o st.file_uploader; o restante do fluxo passa pelos widgets da página.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+import multiprocessing
+
+DIRETORIO_BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+RAIZ_REPOSITORIO = os.path.dirname(DIRETORIO_BENCHMARKS)
+SCRIPT_APP = os.path.join(RAIZ_REPOSITORIO, 'app.py')
+
+sys.path.insert(0, RAIZ_REPOSITORIO)
+sys.path.insert(0, DIRETORIO_BENCHMARKS)
+from fixtures import obter_fixture
+from medicao import aguardar_resultado, rss_mb
+
+NIVEIS_PADRAO = [1, 2, 4, 8, 16]
+PERGUNTAS = [
+    'oi',
+    'Quais são os prazos citados no documento?',
+    'Explique as regras de elegibilidade descritas no documento',
+    'Qual o valor do benefício?',
+    'obrigado',
+]
+
+# Tempo máximo de um nível antes de o processo ser encerrado (um nível travado não trava a execução)
+TEMPO_MAXIMO_NIVEL_S = 1800
+
+# Latência máxima aceitável (p90 por rerun, em segundos) para considerar um nível sustentável
+SLO_PADRAO = 2.0
+
+# O AppTest só faz reruns completos; o st.rerun(scope='fragment') do app acusa isso como exceção
+EXCECAO_RERUN_FRAGMENTO = 'scope="fragment" can only be specified'
+
+def percentil(valores, p):
+    """Percentil p (0-100) por interpolação linear"""
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    posicao = (len(ordenados) - 1) * p / 100
+    inferior = int(posicao)
+    superior = min(inferior + 1, len(ordenados) - 1)
+    return ordenados[inferior] + (ordenados[superior] - ordenados[inferior]) * (posicao - inferior)
+
+def permitir_sessoes_concorrentes():
+    """Permite vários AppTest em paralelo no mesmo processo
+
+    O AppTest guarda um Runtime simulado em Runtime._instance e o apaga ao fim de cada run;
+    com sessões simultâneas, o fim de uma sessão derrubaria as demais. Um Runtime simulado
+    compartilhado passa a servir de reserva nesses intervalos. Pelo mesmo motivo, a opção
+    global.appTest, que o AppTest liga e desliga a cada run, fica ligada durante todo o teste.
+
+    Cada run do AppTest também recompila o app.py, e compilações simultâneas em threads falham
+    no CPython 3.11 ("AST constructor recursion depth mismatch"); como no servidor do Streamlit,
+    todas as sessões passam a usar um único ScriptCache.
+    """
+    from contextlib import nullcontext
+    from unittest.mock import MagicMock
+    from streamlit import config
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import app_test, local_script_runner
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+
+    reserva = MagicMock(spec=Runtime)
+    reserva.media_file_mgr = MediaFileManager(MemoryMediaFileStorage('/mock/media'))
+    reserva.cache_storage_manager = MemoryCacheStorageManager()
+    Runtime.instance = classmethod(lambda cls: cls._instance or reserva)
+    Runtime.exists = classmethod(lambda cls: True)
+    config.set_option('global.appTest', True)
+    app_test.patch_config_options = lambda opcoes: nullcontext()
+    cache_script = ScriptCache()
+    local_script_runner.ScriptCache = lambda: cache_script
+
+class ArquivoEnviado:
+    """Arquivo no formato esperado por salvar_arquivo_uploaded (como o UploadedFile do Streamlit)"""
+
+    def __init__(self, nome, dados):
+        self.name = nome
+        self._dados = dados
+
+    def getbuffer(self):
+        return memoryview(self._dados)
+
+def preparar_area():
+    """Diretório de trabalho isolado com os assets que a página precisa"""
+    area = tempfile.mkdtemp(prefix='provia_carga_')
+    shutil.copytree(os.path.join(RAIZ_REPOSITORIO, 'static'), os.path.join(area, 'static'),
+                    ignore=shutil.ignore_patterns('*.*.png'))
+    for imagem in ('cerebro_ia.png', 'logo_provion.png'):
+        if os.path.exists(os.path.join(RAIZ_REPOSITORIO, imagem)):
+            shutil.copy(os.path.join(RAIZ_REPOSITORIO, imagem), area)
+    return area
+
+class SessaoSimulada:
+    """Uma sessão do app conduzida pelo AppTest, registrando a latência de cada rerun"""
+
+    def __init__(self, identificador, dados_documento, perguntas, timeout):
+        from streamlit.testing.v1 import AppTest
+        self.identificador = identificador
+        self.dados_documento = dados_documento
+        self.perguntas = perguntas
+        self.app = AppTest.from_file(SCRIPT_APP, default_timeout=timeout)
+        self.latencias = []
+        self.erros = []
+        self.nome_arquivo = None
+
+    def _medir(self, etapa, acao):
+        inicio = time.perf_counter()
+        try:
+            acao()
+        except Exception as e:
+            self.erros.append(f'{etapa}: {e!r}')
+            return False
+        # O rerun de fragmento pedido pelo app vira um rerun completo (estimativa conservadora)
+        if any(EXCECAO_RERUN_FRAGMENTO in excecao.message for excecao in self.app.exception):
+            try:
+                self.app.run()
+            except Exception as e:
+                self.erros.append(f'{etapa}: {e!r}')
+                return False
+        self.latencias.append((etapa, time.perf_counter() - inicio))
+        for excecao in self.app.exception:
+            self.erros.append(f'{etapa}: {excecao.message}')
+        return not self.app.exception
+
+    def _botao(self, rotulo=None, chave=None):
+        for botao in self.app.button:
+            if (chave and botao.key == chave) or (rotulo and botao.label == rotulo):
+                return botao
+        raise LookupError(f'Botão não encontrado: {chave or rotulo}')
+
+    def executar(self, modulo_app):
+        if not self._medir('abrir', self.app.run):
+            return
+
+        # Upload pela função do app (o AppTest não simula o st.file_uploader)
+        nome_original = f'carga_{self.identificador}.pdf'
+        caminho = modulo_app.salvar_arquivo_uploaded(ArquivoEnviado(nome_original, self.dados_documento), 'Pdf')
+        nome_arquivo = self.nome_arquivo = os.path.basename(caminho)
+
+        # Localizar o arquivo na lista de armazenados e carregá-lo
+        if not self._medir('buscar', lambda: self.app.text_input(key='busca_arquivos').input(nome_original).run()):
+            return
+        if not self._medir('carregar', lambda: self._botao(chave=f'load_{nome_arquivo}').click().run()):
+            return
+
+        for pergunta in self.perguntas:
+            if not self._medir('chat', lambda: self.app.chat_input[0].set_value(pergunta).run()):
+                return
+
+        self._medir('limpar', lambda: self._botao(rotulo='🗑️ Limpar Histórico').click().run())
+
+def _executar_nivel(concorrencia, sessoes_por_usuario, perguntas, timeout, fila):
+    """Executado em um processo novo: roda 'concorrencia' usuários simultâneos e devolve as medidas"""
+    try:
+        os.environ.setdefault('PROVIA_LLM', 'simulado')
+        os.environ['PROVIA_TRACING'] = '0'
+        area = preparar_area()
+        os.chdir(area)
+        permitir_sessoes_concorrentes()
+        import app as modulo_app
+        with open(obter_fixture('pdf', 10), 'rb') as f:
+            dados_documento = f.read()
+
+        # Primeira sessão fora da medição: aquece imports, caches e o índice de arquivos
+        SessaoSimulada('aquecimento', dados_documento, perguntas[:1], timeout).executar(modulo_app)
+        memoria_inicial = rss_mb()
+
+        sessoes = []
+        lock = threading.Lock()
+
+        def usuario(numero):
+            for repeticao in range(sessoes_por_usuario):
+                sessao = SessaoSimulada(f'{concorrencia}_{numero}_{repeticao}', dados_documento, perguntas, timeout)
+                sessao.executar(modulo_app)
+                with lock:
+                    sessoes.append(sessao)
+
+        threads = [threading.Thread(target=usuario, args=(numero,)) for numero in range(concorrencia)]
+        inicio = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        duracao = time.perf_counter() - inicio
+        # As sessões continuam referenciadas, então a memória medida inclui o estado de todas elas
+        memoria_final = rss_mb()
+
+        latencias = [latencia for sessao in sessoes for _, latencia in sessao.latencias]
+        por_etapa = {}
+        for sessao in sessoes:
+            for etapa, latencia in sessao.latencias:
+                por_etapa.setdefault(etapa, []).append(latencia)
+        erros = [erro for sessao in sessoes for erro in sessao.erros]
+        # Todo upload concluído precisa continuar no metadata e no disco ao fim do nível
+        metadata = modulo_app.carregar_metadata()
+        perdidos = [sessao.nome_arquivo for sessao in sessoes if sessao.nome_arquivo and (
+            sessao.nome_arquivo not in metadata or not os.path.exists(metadata[sessao.nome_arquivo]['caminho']))]
+        erros += [f'upload perdido: {nome}' for nome in perdidos]
+
+        fila.put({
+            'concorrencia': concorrencia,
+            'sessoes': len(sessoes),
+            'reruns': len(latencias),
+            'duracao_s': round(duracao, 3),
+            'vazao_reruns_s': round(len(latencias) / duracao, 2) if duracao else 0,
+            'vazao_sessoes_min': round(len(sessoes) / duracao * 60, 2) if duracao else 0,
+            'p50_s': round(percentil(latencias, 50), 3),
+            'p90_s': round(percentil(latencias, 90), 3),
+            'p99_s': round(percentil(latencias, 99), 3),
+            'p90_por_etapa_s': {etapa: round(percentil(valores, 90), 3) for etapa, valores in por_etapa.items()},
+            'memoria_inicial_mb': round(memoria_inicial, 1),
+            'memoria_final_mb': round(memoria_final, 1),
+            'memoria_por_sessao_mb': round((memoria_final - memoria_inicial) / max(len(sessoes), 1), 2),
+            'erros': len(erros),
+            'uploads_perdidos': len(perdidos),
+            'exemplos_erros': erros[:5],
+        })
+        # Gravar as conversas pendentes antes de apagar a área de trabalho
+        from conversas import descarregar
+        descarregar()
+        shutil.rmtree(area, ignore_errors=True)
+    except Exception as e:
+        fila.put({'concorrencia': concorrencia, 'erro': repr(e)})
+
+def executar_niveis(niveis, sessoes_por_usuario, perguntas, timeout, tempo_maximo=TEMPO_MAXIMO_NIVEL_S):
+    """Roda cada nível de concorrência em um processo separado, para medir a memória isoladamente
+
+    Um processo que morre (por exemplo, sem memória) ou passa do tempo máximo vira um nível com erro.
+    """
+    contexto = multiprocessing.get_context('spawn')
+    resultados = []
+    for concorrencia in niveis:
+        fila = contexto.Queue()
+        processo = contexto.Process(target=_executar_nivel,
+                                    args=(concorrencia, sessoes_por_usuario, perguntas, timeout, fila))
+        processo.start()
+        resultado = aguardar_resultado(processo, fila, tempo_maximo)
+        resultado.setdefault('concorrencia', concorrencia)
+        resultados.append(resultado)
+        if 'erro' in resultado:
+            print(f'{concorrencia:>4} usuários  ERRO: {resultado["erro"]}')
+        else:
+            print(f"{concorrencia:>4} usuários  p50 {resultado['p50_s']:.3f}s  p90 {resultado['p90_s']:.3f}s  "
+                  f"p99 {resultado['p99_s']:.3f}s  {resultado['vazao_reruns_s']:.1f} reruns/s  "
+                  f"{resultado['memoria_por_sessao_mb']:.2f} MB/sessão  {resultado['erros']} erros")
+    return resultados
+
+def relatorio_capacidade(resultados, slo):
+    """Relatório em Markdown com a capacidade estimada de um worker"""
+    validos = [r for r in resultados if 'erro' not in r]
+    sustentaveis = [r for r in validos if r['p90_s'] <= slo and not r['erros']]
+    linhas = [
+        '# Relatório de capacidade do ProV.ia',
+        '',
+        f'Gerado em {time.strftime("%Y-%m-%d %H:%M")} com o modelo simulado '
+        f'(TTFT {os.getenv("PROVIA_SIMULADO_TTFT", "0.3")}s, {os.getenv("PROVIA_SIMULADO_TPS", "50")} tokens/s).',
+        '',
+        '| Usuários | Sessões | Reruns | p50 (s) | p90 (s) | p99 (s) | Reruns/s | Sessões/min | MB/sessão | RSS final (MB) | Erros |',
+        '|---:|---:|---:|---:|---:|---:|---:|---:|---:|---:|---:|',
+    ]
+    for r in resultados:
+        if 'erro' in r:
+            linhas.append(f"| {r['concorrencia']} | - | - | - | - | - | - | - | - | - | {r['erro']} |")
+            continue
+        linhas.append(
+            f"| {r['concorrencia']} | {r['sessoes']} | {r['reruns']} | {r['p50_s']} | {r['p90_s']} | {r['p99_s']} | "
+            f"{r['vazao_reruns_s']} | {r['vazao_sessoes_min']} | {r['memoria_por_sessao_mb']} | "
+            f"{r['memoria_final_mb']} | {r['erros']} |"
+        )
+    linhas.append('')
+    if sustentaveis:
+        melhor = max(sustentaveis, key=lambda r: r['concorrencia'])
+        linhas.append(f"**Capacidade estimada:** {melhor['concorrencia']} usuários simultâneos por worker "
+                      f"com p90 de {melhor['p90_s']}s por rerun (SLO de {slo}s).")
+        linhas.append(f"Memória: ~{melhor['memoria_por_sessao_mb']} MB por sessão sobre "
+                      f"{melhor['memoria_inicial_mb']} MB de base do processo.")
+        if melhor is validos[-1]:
+            linhas.append('O maior nível testado ainda atende ao SLO; aumente --niveis para encontrar o limite.')
+    else:
+        linhas.append(f'**Nenhum nível testado atende ao SLO de {slo}s por rerun sem erros.**')
+
+    erros = [(r['concorrencia'], erro) for r in validos for erro in r['exemplos_erros']]
+    if erros:
+        linhas += ['', '## Erros observados', '']
+        linhas += [f'- {concorrencia} usuários: `{erro}`' for concorrencia, erro in erros]
+    return '\n'.join(linhas) + '\n'
+
+def main():
+    parser = argparse.ArgumentParser(description='Teste de carga do ProV.ia com sessões simuladas')
+    parser.add_argument('--niveis', default=','.join(map(str, NIVEIS_PADRAO)),
+                        help='níveis de concorrência separados por vírgula')
+    parser.add_argument('--sessoes', type=int, default=1, help='sessões seguidas por usuário simulado')
+    parser.add_argument('--perguntas', type=int, default=len(PERGUNTAS), help='perguntas por sessão')
+    parser.add_argument('--slo', type=float, default=SLO_PADRAO, help='p90 máximo por rerun, em segundos')
+    parser.add_argument('--timeout', type=float, default=60, help='tempo máximo de cada rerun, em segundos')
+    parser.add_argument('--tempo-maximo', type=float, default=TEMPO_MAXIMO_NIVEL_S,
+                        help='segundos por nível antes de encerrá-lo como falha')
+    parser.add_argument('--saida', default='relatorio_capacidade.md', help='arquivo do relatório (Markdown)')
+    args = parser.parse_args()
+
+    # Perfil do modelo simulado mais rápido que o padrão, salvo se definido pelo usuário
+    os.environ.setdefault('PROVIA_SIMULADO_TTFT', '0.1')
+    os.environ.setdefault('PROVIA_SIMULADO_TPS', '200')
+
+    niveis = [int(n) for n in args.niveis.split(',') if n.strip()]
+    perguntas = (PERGUNTAS * (args.perguntas // len(PERGUNTAS) + 1))[:args.perguntas]
+    resultados = executar_niveis(niveis, args.sessoes, perguntas, args.timeout, args.tempo_maximo)
+
+    relatorio = relatorio_capacidade(resultados, args.slo)
+    with open(args.saida, 'w', encoding='utf-8') as f:
+        f.write(relatorio)
+    with open(os.path.splitext(args.saida)[0] + '.json', 'w', encoding='utf-8') as f:
+        json.dump(resultados, f, ensure_ascii=False, indent=2)
+    print()
+    print(relatorio)
+    # Erros de sessão (inclusive uploads perdidos) também reprovam a execução
+    return 0 if all('erro' not in r and not r['erros'] for r in resultados) else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,237 @@
+"""Benchmarks dos caminhos críticos de ingestão, metadados e montagem de prompt
+
+Uso (a partir da raiz do repositório):
+    python benchmarks/executar.py                      # escala rápida, compara com a baseline
+    python benchmarks/executar.py --escala completa    # PDFs de até 1000 páginas, CSVs de até 1M linhas
+    python benchmarks/executar.py --salvar-baseline    # grava os resultados como nova baseline
+    python benchmarks/executar.py --filtro carrega_pdf # apenas os casos cujo nome contém o filtro
+
+Cada caso roda em um processo separado, para que o pico de memória (RSS) seja medido isoladamente.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import statistics
+import tempfile
+import multiprocessing
+from functools import partial
+
+DIRETORIO_BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+RAIZ_REPOSITORIO = os.path.dirname(DIRETORIO_BENCHMARKS)
+ARQUIVO_BASELINE = os.path.join(DIRETORIO_BENCHMARKS, 'baseline.json')
+
+sys.path.insert(0, RAIZ_REPOSITORIO)
+sys.path.insert(0, DIRETORIO_BENCHMARKS)
+from fixtures import obter_fixture
+from medicao import aguardar_resultado, pico_rss_mb
+
+ESCALAS = {
+    'rapida': {'pdf': [10, 100], 'csv': [1000, 10000], 'txt': [1, 5], 'catalogo': [10000]},
+    'completa': {'pdf': [10, 100, 1000], 'csv': [1000, 10000, 100000, 1000000], 'txt': [1, 10, 50],
+                 'catalogo': [10000]},
+}
+
+# Regressão: tempo ou pico de memória acima de (1 + tolerância) vezes a baseline
+TOLERANCIA_PADRAO = 0.25
+TOLERANCIA_MEMORIA_PADRAO = 0.25
+
+# Aumentos de memória menores que isso são ruído (alocador, imports) e não contam como regressão
+FOLGA_RSS_MB = 10
+
+# Tempo máximo de um caso (preparação + repetições) antes de o processo filho ser encerrado
+TEMPO_MAXIMO_CASO_S = 1800
+
+def _importar_app():
+    """Importa o app fora do Streamlit, com o modelo simulado e sem rastreamento"""
+    os.environ.setdefault('PROVIA_LLM', 'simulado')
+    os.environ['PROVIA_TRACING'] = '0'
+    import app
+    return app
+
+# Cada preparador recebe o módulo do app e a fixture e retorna (função medida, quantidade, unidade).
+# Precisam ser funções de módulo (ou partial delas) para chegar ao processo filho.
+
+def _preparar_loader(nome_loader, app, caminho):
+    loader = getattr(app, nome_loader)
+    return (lambda: loader(caminho)), os.path.getsize(caminho), 'B'
+
+def _preparar_carregar_metadata(app, catalogo):
+    return app.carregar_metadata, len(app.carregar_metadata()), 'entradas'
+
+def _preparar_salvar_metadata(app, catalogo):
+    metadata = app.carregar_metadata()
+    return (lambda: app.salvar_metadata(metadata)), len(metadata), 'entradas'
+
+def _preparar_listar_arquivos(termo, app, catalogo):
+    # Primeira chamada constrói o índice; mede-se a listagem em regime
+    app.listar_arquivos_salvos()
+    return (lambda: app.listar_arquivos_salvos(termo)), app.ARQUIVOS_POR_PAGINA, 'arquivos'
+
+def _preparar_construir_prompt(app, caminho):
+    documento = app.carrega_txt(caminho)
+
+    def construir():
+        texto, _ = app.compactar_documento(documento, 'Txt', app.MODELO_PESADO)
+        texto = app.limitar_documento(texto, app.MODELO_PESADO)
+        system_message = app.montar_system_message(texto, 'Txt')
+        return app.montar_template(system_message) | app.criar_modelo_roteado(app.OPENAI_API_KEY)
+    return construir, len(documento), 'caracteres'
+
+def _preparar_ajustar_orcamento(app, caminho):
+    from langchain_core.messages import HumanMessage, AIMessage
+    documento = app.limitar_documento(app.carrega_txt(caminho), app.MODELO_PESADO)
+    system_message = app.montar_system_message(documento, 'Txt')
+    historico = []
+    for i in range(100):
+        historico += [HumanMessage(content=f'Pergunta {i} sobre o documento?'), AIMessage(content=documento[i * 500:i * 500 + 2000])]
+    return (lambda: app.ajustar_ao_orcamento(system_message, historico, 'Qual o prazo?', app.MODELO_PESADO)), len(historico), 'mensagens'
+
+def montar_casos(escala):
+    """Lista de casos (nome, tipo de fixture, tamanho, preparador)"""
+    tamanhos = ESCALAS[escala]
+    casos = []
+    for paginas in tamanhos['pdf']:
+        casos.append((f'carrega_pdf[{paginas} páginas]', 'pdf', paginas, partial(_preparar_loader, 'carrega_pdf')))
+    for linhas in tamanhos['csv']:
+        casos.append((f'carrega_csv[{linhas} linhas]', 'csv', linhas, partial(_preparar_loader, 'carrega_csv')))
+    for megabytes in tamanhos['txt']:
+        casos.append((f'carrega_txt[{megabytes} MB]', 'txt', megabytes, partial(_preparar_loader, 'carrega_txt')))
+    for entradas in tamanhos['catalogo']:
+        casos += [
+            (f'carregar_metadata[{entradas} entradas]', 'catalogo', entradas, _preparar_carregar_metadata),
+            (f'salvar_metadata[{entradas} entradas]', 'catalogo', entradas, _preparar_salvar_metadata),
+            (f'listar_arquivos_salvos[{entradas} entradas]', 'catalogo', entradas, partial(_preparar_listar_arquivos, '')),
+            (f'listar_arquivos_salvos[{entradas} entradas, busca]', 'catalogo', entradas, partial(_preparar_listar_arquivos, 'saude')),
+        ]
+    casos += [
+        ('construir_prompt[txt 1 MB]', 'txt', 1, _preparar_construir_prompt),
+        ('ajustar_ao_orcamento[200 mensagens]', 'txt', 1, _preparar_ajustar_orcamento),
+    ]
+    return casos
+
+def _executar_caso(tipo, tamanho, preparar, repeticoes, fila):
+    """Executado no processo filho: prepara o ambiente, mede e devolve o resultado pela fila"""
+    area = tempfile.mkdtemp(prefix='provia_bench_')
+    try:
+        fixture = obter_fixture(tipo, tamanho)
+        if tipo == 'catalogo':
+            shutil.copytree(fixture, area, dirs_exist_ok=True)
+        os.chdir(area)
+        app = _importar_app()
+        funcao, quantidade, unidade = preparar(app, fixture)
+
+        tempos = []
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            funcao()
+            tempos.append(time.perf_counter() - inicio)
+        tempo = statistics.median(tempos)
+        fila.put({
+            'tempo_s': round(tempo, 6),
+            'pico_rss_mb': round(pico_rss_mb(), 1),
+            'vazao': round(quantidade / tempo, 1) if tempo > 0 else None,
+            'unidade_vazao': f'{unidade}/s',
+        })
+    except Exception as e:
+        fila.put({'erro': repr(e)})
+    finally:
+        os.chdir(RAIZ_REPOSITORIO)
+        shutil.rmtree(area, ignore_errors=True)
+
+def executar(casos, repeticoes, tempo_maximo=TEMPO_MAXIMO_CASO_S):
+    contexto = multiprocessing.get_context('spawn')
+    resultados = {}
+    for nome, tipo, tamanho, preparar in casos:
+        # A fixture é gerada no processo principal para não contar no tempo nem na memória do caso
+        obter_fixture(tipo, tamanho)
+        fila = contexto.Queue()
+        processo = contexto.Process(target=_executar_caso, args=(tipo, tamanho, preparar, repeticoes, fila))
+        processo.start()
+        resultado = aguardar_resultado(processo, fila, tempo_maximo)
+        resultados[nome] = resultado
+        if 'erro' in resultado:
+            print(f'{nome:<50} ERRO: {resultado["erro"]}')
+        else:
+            print(f'{nome:<50} {resultado["tempo_s"]:>10.4f} s {resultado["pico_rss_mb"]:>9.1f} MB '
+                  f'{resultado["vazao"]:>14,.1f} {resultado["unidade_vazao"]}')
+    return resultados
+
+def falhas(resultados):
+    """Casos que terminaram com erro (contam como falha, com ou sem baseline)"""
+    return [(nome, resultado['erro']) for nome, resultado in resultados.items() if 'erro' in resultado]
+
+def comparar(resultados, baseline, tolerancia, tolerancia_memoria=TOLERANCIA_MEMORIA_PADRAO):
+    """Compara tempo e pico de memória com a baseline e retorna a lista de regressões
+
+    Cada regressão é (caso, métrica, valor da baseline, valor atual, razão).
+    """
+    regressoes = []
+    for nome, resultado in resultados.items():
+        referencia = baseline.get(nome)
+        if not referencia or 'erro' in resultado or 'erro' in referencia:
+            continue
+        razao = resultado['tempo_s'] / referencia['tempo_s'] if referencia['tempo_s'] else 1
+        if razao > 1 + tolerancia:
+            regressoes.append((nome, 'tempo_s', referencia['tempo_s'], resultado['tempo_s'], razao))
+        antes, depois = referencia.get('pico_rss_mb'), resultado.get('pico_rss_mb')
+        if antes and depois and depois - antes > FOLGA_RSS_MB and depois / antes > 1 + tolerancia_memoria:
+            regressoes.append((nome, 'pico_rss_mb', antes, depois, depois / antes))
+    return regressoes
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks do ProV.ia')
+    parser.add_argument('--escala', choices=list(ESCALAS), default='rapida')
+    parser.add_argument('--filtro', default='', help='executa apenas os casos cujo nome contém este texto')
+    parser.add_argument('--repeticoes', type=int, default=3)
+    parser.add_argument('--tolerancia', type=float, default=TOLERANCIA_PADRAO)
+    parser.add_argument('--tolerancia-memoria', type=float, default=TOLERANCIA_MEMORIA_PADRAO,
+                        help='aumento relativo do pico de RSS aceito em relação à baseline')
+    parser.add_argument('--tempo-maximo', type=float, default=TEMPO_MAXIMO_CASO_S,
+                        help='segundos por caso antes de encerrá-lo como falha')
+    parser.add_argument('--baseline', default=ARQUIVO_BASELINE)
+    parser.add_argument('--salvar-baseline', action='store_true')
+    parser.add_argument('--saida', help='grava os resultados em JSON neste arquivo')
+    args = parser.parse_args()
+
+    casos = [caso for caso in montar_casos(args.escala) if args.filtro in caso[0]]
+    print(f'{"caso":<50} {"tempo":>12} {"pico RSS":>12} {"vazão":>14}')
+    resultados = executar(casos, args.repeticoes, args.tempo_maximo)
+    com_erro = falhas(resultados)
+
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, ensure_ascii=False, indent=2)
+
+    if args.salvar_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, 'r', encoding='utf-8') as f:
+                baseline = json.load(f)
+        # Casos com erro não entram na baseline
+        baseline.update({nome: r for nome, r in resultados.items() if 'erro' not in r})
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, ensure_ascii=False, indent=2)
+        print(f'Baseline gravada em {args.baseline}')
+        return 1 if com_erro else 0
+
+    for nome, erro in com_erro:
+        print(f'FALHA {nome}: {erro}')
+    if not os.path.exists(args.baseline):
+        print('Nenhuma baseline encontrada; use --salvar-baseline para criar uma.')
+        return 1 if com_erro else 0
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        regressoes = comparar(resultados, json.load(f), args.tolerancia, args.tolerancia_memoria)
+    for nome, metrica, antes, depois, razao in regressoes:
+        if metrica == 'tempo_s':
+            print(f'REGRESSÃO {nome}: {antes:.4f} s -> {depois:.4f} s ({razao:.2f}x)')
+        else:
+            print(f'REGRESSÃO {nome}: pico RSS {antes:.1f} MB -> {depois:.1f} MB ({razao:.2f}x)')
+    if not regressoes:
+        print('Nenhuma regressão em relação à baseline.')
+    return 1 if regressoes or com_erro else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
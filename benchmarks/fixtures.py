@@ -0,0 +1,117 @@
+import os
+import csv
+import json
+import random
+from datetime import datetime, timedelta
+
+# Fixtures geradas sob demanda e reaproveitadas entre execuções
+DIRETORIO_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.fixtures')
+
+PALAVRAS = (
+    'benefício colaborador política férias salário reembolso plano saúde odontológico vale refeição '
+    'transporte jornada banco horas admissão desligamento treinamento avaliação desempenho provion '
+    'documento prazo valor regra elegibilidade procedimento responsável atendimento'
+).split()
+
+def _texto(gerador, palavras):
+    return ' '.join(gerador.choice(PALAVRAS) for _ in range(palavras))
+
+def _escapar_pdf(texto):
+    return texto.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+def gerar_pdf(caminho, paginas, linhas_por_pagina=40, corpo=None):
+    """PDF só com texto (Helvetica), com cabeçalho e rodapé repetidos em todas as páginas
+
+    corpo, se informado, traz as linhas de cada página no lugar do texto aleatório.
+    """
+    gerador = random.Random(paginas)
+    objetos = {1: b'<< /Type /Catalog /Pages 2 0 R >>', 3: b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>'}
+    kids = []
+    for pagina in range(paginas):
+        id_pagina, id_conteudo = 4 + pagina * 2, 5 + pagina * 2
+        linhas = ['Provion - Manual Interno do Colaborador']
+        if corpo is not None:
+            linhas += corpo[pagina]
+        else:
+            linhas += [_texto(gerador, 12) for _ in range(linhas_por_pagina)]
+        linhas.append(f'Pagina {pagina + 1} de {paginas}')
+        comandos = ['BT', '/F1 10 Tf', '14 TL', '50 800 Td']
+        comandos += [f'({_escapar_pdf(linha)}) Tj T*' for linha in linhas]
+        comandos.append('ET')
+        fluxo = '\n'.join(comandos).encode('latin-1', 'replace')
+        objetos[id_conteudo] = b'<< /Length %d >>\nstream\n%s\nendstream' % (len(fluxo), fluxo)
+        objetos[id_pagina] = (b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] '
+                              b'/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>' % id_conteudo)
+        kids.append(b'%d 0 R' % id_pagina)
+    objetos[2] = b'<< /Type /Pages /Kids [%s] /Count %d >>' % (b' '.join(kids), paginas)
+
+    saida = bytearray(b'%PDF-1.4\n')
+    posicoes = {}
+    for numero in sorted(objetos):
+        posicoes[numero] = len(saida)
+        saida += b'%d 0 obj\n%s\nendobj\n' % (numero, objetos[numero])
+    inicio_xref = len(saida)
+    total = max(objetos) + 1
+    saida += b'xref\n0 %d\n0000000000 65535 f \n' % total
+    for numero in range(1, total):
+        saida += b'%010d 00000 n \n' % posicoes[numero]
+    saida += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (total, inicio_xref)
+    with open(caminho, 'wb') as f:
+        f.write(saida)
+
+def gerar_csv(caminho, linhas):
+    gerador = random.Random(linhas)
+    with open(caminho, 'w', newline='', encoding='utf-8') as f:
+        escritor = csv.writer(f)
+        escritor.writerow(['matricula', 'nome', 'departamento', 'salario', 'beneficio'])
+        for i in range(linhas):
+            escritor.writerow([i, f'Colaborador {i}', gerador.choice(PALAVRAS), gerador.randint(2000, 30000),
+                               gerador.choice(PALAVRAS)])
+
+def gerar_txt(caminho, megabytes):
+    gerador = random.Random(megabytes)
+    alvo = megabytes * 1024 * 1024
+    with open(caminho, 'w', encoding='utf-8') as f:
+        escritos = 0
+        while escritos < alvo:
+            paragrafo = _texto(gerador, 80) + '\n\n'
+            f.write(paragrafo)
+            escritos += len(paragrafo.encode('utf-8'))
+
+def gerar_catalogo(diretorio, entradas):
+    """Diretório de uploads + file_metadata.json com a quantidade de entradas pedida"""
+    diretorio_uploads = os.path.join(diretorio, 'uploaded_files')
+    os.makedirs(diretorio_uploads, exist_ok=True)
+    gerador = random.Random(entradas)
+    inicio = datetime(2024, 1, 1)
+    metadata = {}
+    for i in range(entradas):
+        tipo = gerador.choice(['Pdf', 'Csv', 'Txt'])
+        nome_original = f'{gerador.choice(PALAVRAS)}_{i}.{tipo.lower()}'
+        nome_arquivo = f'{1700000000 + i}_{nome_original}'
+        caminho = os.path.join('uploaded_files', nome_arquivo)
+        with open(os.path.join(diretorio, caminho), 'w') as f:
+            f.write('x')
+        metadata[nome_arquivo] = {
+            'nome_original': nome_original,
+            'tipo': tipo,
+            'data_upload': (inicio + timedelta(minutes=i)).isoformat(),
+            'tamanho': 1,
+            'caminho': caminho,
+        }
+    with open(os.path.join(diretorio, 'file_metadata.json'), 'w', encoding='utf-8') as f:
+        json.dump(metadata, f, ensure_ascii=False, indent=2)
+
+def obter_fixture(tipo, tamanho):
+    """Caminho da fixture, gerando-a apenas na primeira vez"""
+    os.makedirs(DIRETORIO_FIXTURES, exist_ok=True)
+    if tipo == 'catalogo':
+        caminho = os.path.join(DIRETORIO_FIXTURES, f'catalogo_{tamanho}')
+        if not os.path.exists(os.path.join(caminho, 'file_metadata.json')):
+            gerar_catalogo(caminho, tamanho)
+        return caminho
+    extensoes = {'pdf': 'pdf', 'csv': 'csv', 'txt': 'txt'}
+    caminho = os.path.join(DIRETORIO_FIXTURES, f'{tipo}_{tamanho}.{extensoes[tipo]}')
+    if not os.path.exists(caminho):
+        {'pdf': gerar_pdf, 'csv': gerar_csv, 'txt': gerar_txt}[tipo](caminho, tamanho)
+    return caminho
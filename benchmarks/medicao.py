@@ -0,0 +1,91 @@
+"""Medição de memória e espera dos processos filhos, comum aos benchmarks e ao teste de carga
+
+Funciona no Linux, no macOS e no Windows (onde o módulo resource não existe).
+"""
+import os
+import sys
+import time
+import queue
+
+try:
+    import resource
+except ImportError:
+    # Windows: memória lida com GetProcessMemoryInfo
+    resource = None
+
+def _memoria_windows():
+    """Contadores de memória do processo atual no Windows (working set atual e pico, em bytes)"""
+    import ctypes
+    from ctypes import wintypes
+
+    class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+        _fields_ = [
+            ('cb', wintypes.DWORD),
+            ('PageFaultCount', wintypes.DWORD),
+            ('PeakWorkingSetSize', ctypes.c_size_t),
+            ('WorkingSetSize', ctypes.c_size_t),
+            ('QuotaPeakPagedPoolUsage', ctypes.c_size_t),
+            ('QuotaPagedPoolUsage', ctypes.c_size_t),
+            ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t),
+            ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+            ('PagefileUsage', ctypes.c_size_t),
+            ('PeakPagefileUsage', ctypes.c_size_t),
+        ]
+
+    kernel32 = ctypes.WinDLL('kernel32')
+    psapi = ctypes.WinDLL('psapi')
+    kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+    psapi.GetProcessMemoryInfo.argtypes = [wintypes.HANDLE, ctypes.POINTER(PROCESS_MEMORY_COUNTERS), wintypes.DWORD]
+    psapi.GetProcessMemoryInfo.restype = wintypes.BOOL
+
+    contadores = PROCESS_MEMORY_COUNTERS()
+    contadores.cb = ctypes.sizeof(contadores)
+    if not psapi.GetProcessMemoryInfo(kernel32.GetCurrentProcess(), ctypes.byref(contadores), contadores.cb):
+        raise ctypes.WinError()
+    return contadores
+
+def pico_rss_mb():
+    """Pico de memória residente do processo atual, em MB"""
+    if resource is None:
+        return _memoria_windows().PeakWorkingSetSize / 1024 / 1024
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss é em KB no Linux e em bytes no macOS
+    return pico / 1024 / 1024 if sys.platform == 'darwin' else pico / 1024
+
+def rss_mb():
+    """Memória residente atual do processo, em MB (o pico, onde o valor atual não está disponível)"""
+    if resource is None:
+        return _memoria_windows().WorkingSetSize / 1024 / 1024
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            paginas = int(f.read().split()[1])
+        return paginas * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+    except (OSError, ValueError):
+        return pico_rss_mb()
+
+def aguardar_resultado(processo, fila, tempo_maximo):
+    """Resultado posto na fila pelo processo filho, ou um erro se ele morrer ou passar do tempo máximo"""
+    limite = time.monotonic() + tempo_maximo
+    while True:
+        try:
+            resultado = fila.get(timeout=1)
+            break
+        except queue.Empty:
+            if not processo.is_alive():
+                # Pode ter terminado logo após pôr o resultado na fila
+                try:
+                    resultado = fila.get(timeout=1)
+                except queue.Empty:
+                    resultado = {'erro': f'processo encerrado sem resultado (código {processo.exitcode})'}
+                break
+            if time.monotonic() > limite:
+                processo.terminate()
+                resultado = {'erro': f'tempo máximo de {tempo_maximo}s excedido'}
+                break
+    processo.join(30)
+    if processo.is_alive():
+        processo.kill()
+        processo.join()
+    if processo.exitcode != 0 and 'erro' not in resultado:
+        resultado = {'erro': f'processo terminou com código {processo.exitcode}'}
+    return resultado
@@ -0,0 +1,175 @@
+import re
+from collections import Counter
+
+from tokens import contar_tokens, obter_tokenizador
+from rastreamento import rastrear, definir_atributos
+
+# Separador usado pelos loaders para unir parágrafos/documentos
+SEPARADOR_PAGINAS = '\n\n'
+
+# Quebra de página inserida pelo carrega_pdf entre as páginas do PDF
+QUEBRA_PAGINA = '\f'
+
+# Linhas do topo e do fim de cada página onde se procuram cabeçalhos, rodapés e numeração
+LINHAS_BORDA = 3
+
+# Linhas típicas de navegação e do aviso de cookies de sites; só removidas em documentos do tipo Site
+PADROES_SITE = [
+    re.compile(r'^(pular|ir) para o conte[úu]do', re.IGNORECASE),
+    re.compile(r'^skip to (main )?content', re.IGNORECASE),
+    re.compile(r'^(menu|home|in[íi]cio|voltar ao topo|back to top|compartilhe?|share)$', re.IGNORECASE),
+    re.compile(r'(usamos|utilizamos|we use) cookies', re.IGNORECASE),
+]
+
+# Avisos de copyright; em PDFs só removidos em linhas curtas nas bordas das páginas
+PADROES_RODAPE = [
+    re.compile(r'^(todos os direitos reservados|all rights reserved)', re.IGNORECASE),
+    re.compile(r'^©'),
+]
+
+# Numeração de páginas ("3", "- 3 -", "Página 3 de 10", "Page 3"); só removida nas bordas das páginas
+PADRAO_NUMERO_PAGINA = re.compile(r'^(-\s*)?((p[áa]g(ina)?|page)\.?\s*)?\d+(\s*(de|of|/)\s*\d+)?(\s*-)?$', re.IGNORECASE)
+
+# Palavras (inclusive compostas com hífen) usadas para decidir se uma hifenização é só quebra de linha
+PADRAO_PALAVRA = re.compile(r'\w+(?:-\w+)*')
+
+# Tamanho máximo de uma linha considerada cabeçalho/rodapé repetido
+MAX_CARACTERES_CABECALHO = 120
+
+# Tipos cujo conteúdo é tabular: linhas e registros repetidos são dados, não ruído
+TIPOS_TABULARES = ['Csv']
+
+def _juntar_hifenizacao(texto, vocabulario):
+    """Junta palavras quebradas no fim da linha só quando a forma sem hífen aparece no documento
+
+    Compostos reais ("bem-\nestar", "decreto-\nlei") mantêm o hífen e apenas perdem a quebra.
+    """
+    def juntar(m):
+        inicio, fim = m.group(1), m.group(2)
+        unida = (inicio + fim).lower()
+        if unida in vocabulario and f'{inicio}-{fim}'.lower() not in vocabulario:
+            return inicio + fim
+        return f'{inicio}-{fim}'
+    return re.sub(r'(\w+)-\n(\w+)', juntar, texto)
+
+def _normalizar_espacos(texto, vocabulario):
+    """Junta hifenizações, remove espaços redundantes e limita quebras de linha"""
+    texto = texto.replace('\r\n', '\n').replace('\r', '\n').replace('\xa0', ' ')
+    texto = re.sub(r'[ \t\v]+', ' ', texto)
+    texto = '\n'.join(linha.strip() for linha in texto.split('\n'))
+    texto = _juntar_hifenizacao(texto, vocabulario)
+    texto = re.sub(r'\n{3,}', '\n\n', texto)
+    return texto.strip()
+
+def _bordas(linhas):
+    """Índices das primeiras e últimas linhas não vazias de uma página"""
+    preenchidas = [i for i, linha in enumerate(linhas) if linha]
+    return set(preenchidas[:LINHAS_BORDA] + preenchidas[-LINHAS_BORDA:])
+
+def _numero_pagina(linha):
+    """Número da página em uma linha de numeração ("- 3 -", "Página 3 de 10"), ou None"""
+    if not PADRAO_NUMERO_PAGINA.match(linha):
+        return None
+    return int(re.search(r'\d+', linha).group())
+
+def _ruido_de_pagina(paginas):
+    """Detecta cabeçalhos, rodapés e numeração nas bordas das páginas
+
+    Uma linha de borda é cabeçalho/rodapé quando se repete na maioria das páginas, e numeração
+    quando o número acompanha a sequência das páginas na maioria delas. Linhas no meio da página
+    e números fora da sequência (células de tabela, valores) nunca são considerados.
+    Retorna as linhas repetidas e o deslocamento da numeração (número - índice da página), ou None.
+    """
+    if len(paginas) < 2:
+        return set(), None
+    contagem = Counter()
+    deslocamentos = Counter()
+    for indice, linhas in enumerate(paginas):
+        bordas = [linhas[i] for i in _bordas(linhas)]
+        contagem.update({l for l in bordas if len(l) <= MAX_CARACTERES_CABECALHO})
+        deslocamentos.update({_numero_pagina(l) - indice for l in bordas if _numero_pagina(l) is not None})
+    # Maioria das páginas; com só duas páginas, repetições de borda ainda podem ser conteúdo
+    minimo = max(2, len(paginas) // 2 + 1)
+    repetidas = {linha for linha, total in contagem.items() if total >= minimo} if len(paginas) >= 3 else set()
+    deslocamento, total = deslocamentos.most_common(1)[0] if deslocamentos else (None, 0)
+    return repetidas, deslocamento if total >= minimo else None
+
+def _eh_boilerplate(linha, tipo, na_borda):
+    """Navegação e rodapés de sites em qualquer posição; em PDFs, só avisos curtos na borda da página"""
+    if tipo == 'Site':
+        return any(p.search(linha) for p in PADROES_SITE + PADROES_RODAPE)
+    return (tipo == 'Pdf' and na_borda and len(linha) <= MAX_CARACTERES_CABECALHO
+            and any(p.search(linha) for p in PADROES_RODAPE))
+
+def _chave_paragrafo(paragrafo):
+    """Chave usada para identificar parágrafos quase idênticos"""
+    return re.sub(r'\W+', ' ', paragrafo.lower()).strip()
+
+@rastrear('documento.compactar')
+def compactar_documento(documento, tipo='', modelo='gpt-4o'):
+    """Normaliza e compacta o texto vindo dos loaders antes de montar o prompt
+
+    Retorna o documento compactado e um relatório com os tokens antes e depois, contados no texto
+    original e no compactado (estimados por caracteres quando o tokenizador não está disponível).
+    """
+    vocabulario = set(PADRAO_PALAVRA.findall(documento.lower()))
+    paginas = [_normalizar_espacos(p, vocabulario).split('\n') for p in documento.split(QUEBRA_PAGINA)]
+
+    linhas_removidas = 0
+    paragrafos_removidos = 0
+    if tipo not in TIPOS_TABULARES:
+        repetidas, deslocamento = _ruido_de_pagina(paginas)
+        limpas = []
+        for indice, linhas in enumerate(paginas):
+            bordas = _bordas(linhas)
+            mantidas = []
+            for i, linha in enumerate(linhas):
+                numero = _numero_pagina(linha) if deslocamento is not None else None
+                if linha and (_eh_boilerplate(linha, tipo, i in bordas) or (i in bordas and (
+                        linha in repetidas or (numero is not None and numero - indice == deslocamento)))):
+                    linhas_removidas += 1
+                    continue
+                mantidas.append(linha)
+            limpas.append(mantidas)
+        paginas = limpas
+
+    paragrafos = []
+    for linhas in paginas:
+        texto = re.sub(r'\n{3,}', '\n\n', '\n'.join(linhas)).strip()
+        paragrafos += [p.strip() for p in texto.split(SEPARADOR_PAGINAS) if p.strip()]
+
+    if tipo not in TIPOS_TABULARES:
+        vistos = set()
+        unicos = []
+        for paragrafo in paragrafos:
+            chave = _chave_paragrafo(paragrafo)
+            if not chave:
+                continue
+            if chave in vistos:
+                paragrafos_removidos += 1
+                continue
+            vistos.add(chave)
+            unicos.append(paragrafo)
+        paragrafos = unicos
+
+    documento_compactado = SEPARADOR_PAGINAS.join(paragrafos)
+    tokens_antes = contar_tokens(documento, modelo)
+    tokens_depois = contar_tokens(documento_compactado, modelo)
+    relatorio = {
+        'tokens_antes': tokens_antes,
+        'tokens_depois': tokens_depois,
+        'tokens_economizados': tokens_antes - tokens_depois,
+        'linhas_removidas': linhas_removidas,
+        'paragrafos_removidos': paragrafos_removidos,
+        'tokens_estimados': obter_tokenizador(modelo) is None,
+    }
+    definir_atributos(**relatorio)
+    print(f'Compactação ({tipo or "texto"}): {descrever_compactacao(relatorio)}')
+    return documento_compactado, relatorio
+
+def descrever_compactacao(relatorio):
+    """Resumo legível do relatório de compactação"""
+    estimativa = ' (estimativa)' if relatorio.get('tokens_estimados') else ''
+    return (f"{relatorio['tokens_antes']} → {relatorio['tokens_depois']} tokens{estimativa}, "
+            f"{relatorio['tokens_economizados']} economizados; {relatorio['linhas_removidas']} linhas e "
+            f"{relatorio['paragrafos_removidos']} parágrafos repetidos removidos")
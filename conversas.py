@@ -0,0 +1,105 @@
+import os
+import time
+import queue
+import atexit
+import sqlite3
+import threading
+from contextlib import closing
+from datetime import datetime
+
+# Armazenamento local e apenas de inclusão das conversas
+ARQUIVO_CONVERSAS = os.getenv('PROVIA_CONVERSAS', 'conversas.db')
+
+# Janela usada para agrupar gravações em um único lote
+INTERVALO_GRAVACAO = 0.5
+
+# Tempo máximo de espera pelas gravações pendentes ao encerrar o processo
+TEMPO_MAXIMO_DESCARGA = float(os.getenv('PROVIA_CONVERSAS_DESCARGA', '10'))
+
+_fila = queue.Queue()
+_gravador = None
+_lock_gravador = threading.Lock()
+
+def conectar():
+    """Abre o banco de conversas, criando a tabela se necessário"""
+    con = sqlite3.connect(ARQUIVO_CONVERSAS, timeout=10)
+    con.execute('PRAGMA journal_mode=WAL')
+    con.execute('''CREATE TABLE IF NOT EXISTS mensagens (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        usuario TEXT NOT NULL,
+        sessao TEXT NOT NULL,
+        tipo TEXT NOT NULL,
+        conteudo TEXT NOT NULL,
+        data TEXT NOT NULL
+    )''')
+    con.execute('CREATE INDEX IF NOT EXISTS idx_mensagens_sessao ON mensagens (usuario, sessao, id)')
+    return con
+
+def _gravar(lote):
+    with closing(conectar()) as con, con:
+        con.executemany('INSERT INTO mensagens (usuario, sessao, tipo, conteudo, data) VALUES (?, ?, ?, ?, ?)', lote)
+
+def _gravar_continuamente():
+    """Grava as mensagens da fila em lotes, fora do caminho de renderização"""
+    while True:
+        lote = [_fila.get()]
+        time.sleep(INTERVALO_GRAVACAO)
+        while True:
+            try:
+                lote.append(_fila.get_nowait())
+            except queue.Empty:
+                break
+        try:
+            _gravar(lote)
+        except Exception as e:
+            # Qualquer falha perde só este lote; o gravador continua atendendo a fila
+            print(f'Erro ao gravar conversas: {e!r}')
+        finally:
+            for _ in lote:
+                _fila.task_done()
+
+def _iniciar_gravador():
+    global _gravador
+    with _lock_gravador:
+        if _gravador is None or not _gravador.is_alive():
+            _gravador = threading.Thread(target=_gravar_continuamente, name='gravador-conversas', daemon=True)
+            _gravador.start()
+
+def registrar_mensagem(usuario, sessao, tipo, conteudo):
+    """Enfileira a mensagem para gravação em segundo plano"""
+    _iniciar_gravador()
+    _fila.put((usuario, sessao, tipo, conteudo, datetime.now().isoformat()))
+
+@atexit.register
+def descarregar(tempo_maximo=None):
+    """Aguarda a gravação das mensagens pendentes, por no máximo `tempo_maximo` segundos
+
+    Retorna False se ainda restarem mensagens na fila ao fim da espera.
+    """
+    if _gravador is None:
+        return True
+    limite = time.monotonic() + (TEMPO_MAXIMO_DESCARGA if tempo_maximo is None else tempo_maximo)
+    with _fila.all_tasks_done:
+        while _fila.unfinished_tasks:
+            restante = limite - time.monotonic()
+            if restante <= 0 or not _gravador.is_alive():
+                print(f'Conversas não gravadas ao encerrar: {_fila.unfinished_tasks} mensagens')
+                return False
+            _fila.all_tasks_done.wait(min(restante, 1))
+    return True
+
+def carregar_mensagens(usuario, sessao, limite, antes_de=None):
+    """Retorna até `limite` mensagens da sessão (da mais antiga para a mais recente) anteriores ao id informado"""
+    with closing(conectar()) as con:
+        if antes_de is None:
+            linhas = con.execute(
+                'SELECT id, tipo, conteudo FROM mensagens WHERE usuario = ? AND sessao = ? ORDER BY id DESC LIMIT ?',
+                (usuario, sessao, limite)
+            ).fetchall()
+        else:
+            linhas = con.execute(
+                'SELECT id, tipo, conteudo FROM mensagens WHERE usuario = ? AND sessao = ? AND id < ? '
+                'ORDER BY id DESC LIMIT ?',
+                (usuario, sessao, antes_de, limite)
+            ).fetchall()
+    return linhas[::-1]
@@ -0,0 +1,183 @@
+import os
+import re
+import json
+import math
+import unicodedata
+from collections import Counter
+from functools import lru_cache
+
+from tokens import contar_tokens
+from rastreamento import rastrear
+
+# Índices pré-construídos por arquivo (trechos + frequências de termos)
+DIRETORIO_CACHE = os.getenv('PROVIA_DIRETORIO_CACHE', 'cache_documentos')
+VERSAO_INDICE = 2
+
+# Versão do texto extraído no cache de parsing (muda quando a extração/compactação muda)
+VERSAO_TEXTO = 3
+
+# Tamanho aproximado de cada trecho e orçamento do contexto recuperado por pergunta
+CARACTERES_POR_TRECHO = 1600
+ORCAMENTO_CONTEXTO = int(os.getenv('PROVIA_ORCAMENTO_CONTEXTO', '6000'))
+
+# Parâmetros do BM25
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+STOPWORDS = {
+    'a', 'o', 'as', 'os', 'de', 'da', 'do', 'das', 'dos', 'e', 'em', 'no', 'na', 'nos', 'nas', 'um', 'uma',
+    'para', 'por', 'com', 'que', 'se', 'ao', 'aos', 'ou', 'qual', 'quais', 'como', 'sobre', 'the', 'of',
+    'and', 'to', 'in', 'is', 'eu', 'meu', 'minha', 'sao', 'ser', 'tem', 'ha', 'mais', 'isso', 'este', 'esta',
+}
+
+def termos(texto):
+    """Termos normalizados (minúsculos, sem acentos e sem stopwords) usados na busca"""
+    texto = unicodedata.normalize('NFKD', texto.lower())
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return [t for t in re.findall(r'\w+', texto) if len(t) > 1 and t not in STOPWORDS]
+
+def dividir_trechos(documento):
+    """Divide o documento em trechos de tamanho aproximado, respeitando os parágrafos"""
+    trechos, atual = [], ''
+    for paragrafo in documento.split('\n\n'):
+        if atual and len(atual) + len(paragrafo) > CARACTERES_POR_TRECHO:
+            trechos.append(atual)
+            atual = ''
+        atual = f'{atual}\n\n{paragrafo}' if atual else paragrafo
+        while len(atual) > CARACTERES_POR_TRECHO * 2:
+            trechos.append(atual[:CARACTERES_POR_TRECHO])
+            atual = atual[CARACTERES_POR_TRECHO:]
+    if atual:
+        trechos.append(atual)
+    return trechos
+
+def assinatura_arquivo(info):
+    """Identifica a versão do upload a que um artefato derivado corresponde"""
+    return [info['tamanho'], info['data_upload']]
+
+def _gravar_atomico(caminho, texto):
+    # Importado aqui: armazenamento depende de DIRETORIO_CACHE deste módulo
+    from armazenamento import gravar_atomico
+    gravar_atomico(caminho, texto)
+
+def _caminho_indice(nome_arquivo):
+    return os.path.join(DIRETORIO_CACHE, f'{nome_arquivo}.indice.json')
+
+@lru_cache(maxsize=64)
+def _ler_indice(caminho, mtime):
+    with open(caminho, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+@rastrear('corpus.obter_indice')
+def obter_indice_arquivo(nome_arquivo, info, carregar_texto):
+    """Retorna o índice do arquivo, construindo-o apenas na primeira vez ou quando o arquivo muda
+
+    carregar_texto(nome_arquivo) deve devolver o texto já extraído e compactado.
+    """
+    caminho = _caminho_indice(nome_arquivo)
+    assinatura = assinatura_arquivo(info)
+    if os.path.exists(caminho):
+        indice = _ler_indice(caminho, os.path.getmtime(caminho))
+        if indice.get('versao') == VERSAO_INDICE and indice.get('assinatura') == assinatura:
+            return indice
+
+    texto = carregar_texto(nome_arquivo)
+    if texto is None:
+        return None
+    trechos = dividir_trechos(texto)
+    frequencias = [Counter(termos(t)) for t in trechos]
+    indice = {
+        'versao': VERSAO_INDICE,
+        'assinatura': assinatura,
+        'fonte': info['nome_original'],
+        'trechos': trechos,
+        'frequencias': [dict(f) for f in frequencias],
+        'tamanhos': [sum(f.values()) for f in frequencias],
+        'df': dict(Counter(t for f in frequencias for t in f)),
+    }
+    os.makedirs(DIRETORIO_CACHE, exist_ok=True)
+    _gravar_atomico(caminho, json.dumps(indice, ensure_ascii=False))
+    return indice
+
+@rastrear('corpus.buscar_trechos')
+def buscar_trechos(indices, pergunta, max_tokens=None):
+    """Busca BM25 sobre a união dos índices, retornando os melhores trechos dentro do orçamento"""
+    if max_tokens is None:
+        max_tokens = ORCAMENTO_CONTEXTO
+    consulta = set(termos(pergunta))
+    total_trechos = sum(len(i['trechos']) for i in indices)
+    if not consulta or not total_trechos:
+        return []
+
+    # Estatísticas combinadas do corpus
+    media_tamanho = sum(sum(i['tamanhos']) for i in indices) / total_trechos or 1
+    df = Counter()
+    for indice in indices:
+        df.update({t: indice['df'].get(t, 0) for t in consulta})
+    idf = {t: math.log(1 + (total_trechos - df[t] + 0.5) / (df[t] + 0.5)) for t in consulta}
+
+    candidatos = []
+    for indice in indices:
+        for posicao, (frequencia, tamanho) in enumerate(zip(indice['frequencias'], indice['tamanhos'])):
+            pontuacao = 0.0
+            for termo in consulta:
+                tf = frequencia.get(termo)
+                if tf:
+                    normalizacao = BM25_K1 * (1 - BM25_B + BM25_B * tamanho / media_tamanho)
+                    pontuacao += idf[termo] * tf * (BM25_K1 + 1) / (tf + normalizacao)
+            if pontuacao > 0:
+                candidatos.append((pontuacao, indice['fonte'], posicao, indice['trechos'][posicao]))
+
+    candidatos.sort(key=lambda c: c[0], reverse=True)
+    selecionados, usados = [], 0
+    for pontuacao, fonte, posicao, texto in candidatos:
+        tokens = contar_tokens(texto)
+        if usados + tokens > max_tokens:
+            continue
+        selecionados.append({'fonte': fonte, 'trecho': posicao + 1, 'texto': texto, 'pontuacao': round(pontuacao, 3)})
+        usados += tokens
+    return selecionados
+
+def montar_entrada(pergunta, trechos):
+    """Monta a mensagem do usuário com os trechos recuperados e suas fontes"""
+    if not trechos:
+        return f'(Nenhum trecho dos documentos corresponde a esta pergunta.)\n\nPergunta: {pergunta}'
+    contexto = '\n\n'.join(f"[Fonte: {t['fonte']} - trecho {t['trecho']}]\n{t['texto']}" for t in trechos)
+    return f'Trechos relevantes dos documentos:\n\n####\n{contexto}\n####\n\nPergunta: {pergunta}'
+
+def _caminho_texto(nome_arquivo):
+    return os.path.join(DIRETORIO_CACHE, f'{nome_arquivo}.texto.txt')
+
+def _ler_texto_cache(nome_arquivo, info):
+    """Cabeçalho e texto do cache de parsing, ou (None, None) se ausente ou de outra versão do upload"""
+    caminho = _caminho_texto(nome_arquivo)
+    if not os.path.exists(caminho):
+        return None, None
+    with open(caminho, 'r', encoding='utf-8') as f:
+        try:
+            cabecalho = json.loads(f.readline())
+        except ValueError:
+            return None, None
+        if (not isinstance(cabecalho, dict) or cabecalho.get('versao') != VERSAO_TEXTO
+                or cabecalho.get('assinatura') != assinatura_arquivo(info)):
+            return None, None
+        return cabecalho, f.read()
+
+def ler_texto_cache(nome_arquivo, info):
+    """Texto já extraído e compactado do arquivo, se estiver no cache de parsing e corresponder ao upload"""
+    return _ler_texto_cache(nome_arquivo, info)[1]
+
+def ler_relatorio_cache(nome_arquivo, info):
+    """Relatório da compactação feita quando o texto entrou no cache de parsing, ou None"""
+    cabecalho, _ = _ler_texto_cache(nome_arquivo, info)
+    return cabecalho.get('compactacao') if cabecalho else None
+
+def gravar_texto_cache(nome_arquivo, info, texto, relatorio=None):
+    """Guarda o texto extraído (e o relatório da compactação) para evitar um novo parsing do arquivo
+
+    A primeira linha identifica a versão do upload; leitores veem o arquivo antigo ou o novo, inteiro.
+    """
+    os.makedirs(DIRETORIO_CACHE, exist_ok=True)
+    cabecalho = json.dumps({'versao': VERSAO_TEXTO, 'assinatura': assinatura_arquivo(info), 'compactacao': relatorio},
+                           ensure_ascii=False)
+    _gravar_atomico(_caminho_texto(nome_arquivo), cabecalho + '\n' + texto)
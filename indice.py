@@ -0,0 +1,116 @@
+import os
+import re
+import sqlite3
+from contextlib import closing, nullcontext
+
+# Índice dos arquivos armazenados, derivado do file_metadata.json
+ARQUIVO_INDICE = os.getenv('PROVIA_INDICE', 'file_index.db')
+
+def conectar():
+    """Abre o índice, criando as tabelas se necessário"""
+    # Várias sessões (e a API) gravam no índice ao mesmo tempo: espera o lock em vez de falhar
+    con = sqlite3.connect(ARQUIVO_INDICE, timeout=30)
+    con.execute('PRAGMA journal_mode=WAL')
+    con.row_factory = sqlite3.Row
+    con.execute('''CREATE TABLE IF NOT EXISTS arquivos (
+        nome_arquivo TEXT PRIMARY KEY,
+        nome_original TEXT,
+        tipo TEXT,
+        data_upload TEXT,
+        tamanho INTEGER,
+        caminho TEXT
+    )''')
+    con.execute('CREATE INDEX IF NOT EXISTS idx_arquivos_data ON arquivos (data_upload)')
+    con.execute('CREATE TABLE IF NOT EXISTS controle (chave TEXT PRIMARY KEY, valor TEXT)')
+    try:
+        con.execute('CREATE VIRTUAL TABLE IF NOT EXISTS busca USING fts5 (nome_arquivo UNINDEXED, nome_original, texto)')
+    except sqlite3.OperationalError:
+        # SQLite sem FTS5: busca por LIKE na mesma estrutura
+        con.execute('CREATE TABLE IF NOT EXISTS busca (nome_arquivo TEXT PRIMARY KEY, nome_original TEXT, texto TEXT)')
+    return con
+
+def _tem_fts(con):
+    sql = con.execute("SELECT sql FROM sqlite_master WHERE name = 'busca'").fetchone()[0]
+    return 'fts5' in sql.lower()
+
+def _mtime(caminho):
+    return str(os.path.getmtime(caminho)) if os.path.exists(caminho) else ''
+
+def sincronizar_indice(metadata, arquivo_metadata):
+    """Aplica ao índice as entradas incluídas e removidas do metadata"""
+    with closing(conectar()) as con, con:
+        # Lock de escrita desde o início: uma transação que lê e depois grava falha sem esperar
+        # se outra sessão gravou no meio
+        con.execute('BEGIN IMMEDIATE')
+        indexados = {linha[0] for linha in con.execute('SELECT nome_arquivo FROM arquivos')}
+        removidos = indexados - metadata.keys()
+        con.executemany('DELETE FROM arquivos WHERE nome_arquivo = ?', [(n,) for n in removidos])
+        con.executemany('DELETE FROM busca WHERE nome_arquivo = ?', [(n,) for n in removidos])
+        con.executemany(
+            'INSERT OR REPLACE INTO arquivos VALUES (?, ?, ?, ?, ?, ?)',
+            [(nome, info['nome_original'], info['tipo'], info['data_upload'], info['tamanho'], info['caminho'])
+             for nome, info in metadata.items()]
+        )
+        con.executemany(
+            "INSERT INTO busca (nome_arquivo, nome_original, texto) VALUES (?, ?, '')",
+            [(nome, metadata[nome]['nome_original']) for nome in metadata.keys() - indexados]
+        )
+        con.execute("INSERT OR REPLACE INTO controle VALUES ('mtime_metadata', ?)", (_mtime(arquivo_metadata),))
+
+def _indice_atualizado(arquivo_metadata):
+    with closing(conectar()) as con:
+        linha = con.execute("SELECT valor FROM controle WHERE chave = 'mtime_metadata'").fetchone()
+    return linha is not None and linha[0] == _mtime(arquivo_metadata)
+
+def garantir_indice(arquivo_metadata, carregar_metadata, bloquear=nullcontext):
+    """Ressincroniza o índice apenas se o metadata foi alterado fora do app (custo de um stat)
+
+    A ressincronização roda dentro de bloquear(), o mesmo lock de quem grava o metadata: um
+    metadata lido antes de outra gravação apagaria do índice as entradas novas.
+    """
+    if _indice_atualizado(arquivo_metadata):
+        return
+    with bloquear():
+        if not _indice_atualizado(arquivo_metadata):
+            sincronizar_indice(carregar_metadata(), arquivo_metadata)
+
+def indexar_texto(nome_arquivo, texto):
+    """Inclui o texto extraído do arquivo na busca"""
+    with closing(conectar()) as con, con:
+        con.execute('UPDATE busca SET texto = ? WHERE nome_arquivo = ?', (texto, nome_arquivo))
+
+def _expressao_fts(termo):
+    """Converte o termo digitado em busca por prefixo de cada palavra"""
+    palavras = re.findall(r'\w+', termo)
+    return ' '.join(f'"{p}"*' for p in palavras)
+
+def buscar_arquivos(termo='', tipo=None, data_inicio=None, data_fim=None, pagina=0, por_pagina=10):
+    """Retorna uma página de arquivos (mais recentes primeiro) e o total que atende aos filtros"""
+    condicoes, parametros = [], []
+    if termo and re.search(r'\w', termo):
+        with closing(conectar()) as con:
+            fts = _tem_fts(con)
+        if fts:
+            condicoes.append('a.nome_arquivo IN (SELECT nome_arquivo FROM busca WHERE busca MATCH ?)')
+            parametros.append(_expressao_fts(termo))
+        else:
+            condicoes.append('a.nome_arquivo IN (SELECT nome_arquivo FROM busca WHERE nome_original LIKE ? OR texto LIKE ?)')
+            parametros += [f'%{termo}%', f'%{termo}%']
+    if tipo:
+        condicoes.append('a.tipo = ?')
+        parametros.append(tipo)
+    if data_inicio:
+        condicoes.append('substr(a.data_upload, 1, 10) >= ?')
+        parametros.append(data_inicio.isoformat())
+    if data_fim:
+        condicoes.append('substr(a.data_upload, 1, 10) <= ?')
+        parametros.append(data_fim.isoformat())
+    where = f"WHERE {' AND '.join(condicoes)}" if condicoes else ''
+
+    with closing(conectar()) as con:
+        total = con.execute(f'SELECT COUNT(*) FROM arquivos a {where}', parametros).fetchone()[0]
+        linhas = con.execute(
+            f'SELECT a.* FROM arquivos a {where} ORDER BY a.data_upload DESC LIMIT ? OFFSET ?',
+            parametros + [por_pagina, pagina * por_pagina]
+        ).fetchall()
+    return [dict(linha) for linha in linhas], total
@@ -1,19 +1,33 @@
 import os
+import importlib
+from functools import lru_cache
 from time import sleep
-import streamlit as st
-from langchain_community.document_loaders import (WebBaseLoader,
-                                                  YoutubeLoader, 
-                                                  CSVLoader, 
-                                                  PyPDFLoader, 
-                                                  TextLoader)
-from fake_useragent import UserAgent
 
+from rastreamento import rastrear
+
+# Registro dos loaders: cada classe só é importada no primeiro uso
+REGISTRO_LOADERS = {
+    'WebBaseLoader': 'langchain_community.document_loaders.web_base',
+    'YoutubeLoader': 'langchain_community.document_loaders.youtube',
+    'CSVLoader': 'langchain_community.document_loaders.csv_loader',
+    'PyPDFLoader': 'langchain_community.document_loaders.pdf',
+    'TextLoader': 'langchain_community.document_loaders.text',
+}
+
+@lru_cache(maxsize=None)
+def obter_loader(nome):
+    """Importa sob demanda a classe do loader registrado"""
+    return getattr(importlib.import_module(REGISTRO_LOADERS[nome]), nome)
+
+@rastrear('loaders.carrega_site')
 def carrega_site(url):
+    """Texto do site; levanta RuntimeError se nenhuma das tentativas conseguir carregá-lo"""
+    from fake_useragent import UserAgent
     documento = ''
     for i in range(5):
         try:
             os.environ['USER_AGENT'] = UserAgent().random
-            loader = WebBaseLoader(url, raise_for_status=True)
+            loader = obter_loader('WebBaseLoader')(url, raise_for_status=True)
             lista_documentos = loader.load()
             documento = '\n\n'.join([doc.page_content for doc in lista_documentos])
             break
@@ -21,30 +35,34 @@ def carrega_site(url):
             print(f'Erro ao carregar o site {i+1}')
             sleep(3)
     if documento == '':
-        st.error('Não foi possível carregar o site')
-        st.stop()
+        raise RuntimeError(f'Não foi possível carregar o site {url}')
     return documento
 
+@rastrear('loaders.carrega_youtube')
 def carrega_youtube(video_id):
-    loader = YoutubeLoader(video_id, add_video_info=False, language=['pt'])
+    loader = obter_loader('YoutubeLoader')(video_id, add_video_info=False, language=['pt'])
     lista_documentos = loader.load()
     documento = '\n\n'.join([doc.page_content for doc in lista_documentos])
     return documento
 
+@rastrear('loaders.carrega_csv')
 def carrega_csv(caminho):
-    loader = CSVLoader(caminho)
+    loader = obter_loader('CSVLoader')(caminho)
     lista_documentos = loader.load()
     documento = '\n\n'.join([doc.page_content for doc in lista_documentos])
     return documento
 
+@rastrear('loaders.carrega_pdf')
 def carrega_pdf(caminho):
-    loader = PyPDFLoader(caminho)
+    loader = obter_loader('PyPDFLoader')(caminho)
     lista_documentos = loader.load()
-    documento = '\n\n'.join([doc.page_content for doc in lista_documentos])
+    # Quebra de página entre as páginas, usada pela compactação para achar cabeçalhos e rodapés
+    documento = '\n\f\n'.join([doc.page_content for doc in lista_documentos])
     return documento
 
+@rastrear('loaders.carrega_txt')
 def carrega_txt(caminho):
-    loader = TextLoader(caminho)
+    loader = obter_loader('TextLoader')(caminho)
     lista_documentos = loader.load()
     documento = '\n\n'.join([doc.page_content for doc in lista_documentos])
     return documento
@@ -0,0 +1,241 @@
+"""Execução em lote de perguntas sobre um documento armazenado (avaliações de qualidade e regressão)
+
+Uso (a partir da raiz do repositório, onde ficam os uploads):
+    python lote.py politica_ferias.pdf perguntas.csv
+    python lote.py 1718900000_politica_ferias.pdf perguntas.txt --saida respostas.jsonl --concorrencia 8
+
+O documento pode ser indicado pelo nome armazenado ou pelo nome original do upload.
+As perguntas vêm de um .txt (uma por linha), .csv, .jsonl ou .xlsx; nestes, a pergunta fica na
+coluna 'pergunta' (ou 'question') ou na única coluna além do 'id' opcional. Cada resposta é
+gravada assim que fica pronta; se a execução for interrompida, basta rodar o mesmo comando de
+novo para continuar de onde parou (perguntas com erro são refeitas).
+"""
+import os
+import sys
+import csv
+import json
+import time
+import asyncio
+import argparse
+import statistics
+from datetime import datetime
+
+from langchain_core.runnables import RunnableLambda
+
+import app as provia
+from prompts import montar_template
+from roteador import criar_modelo_roteado, config_roteamento, registrar_roteamento
+from tokens import anotar_uso, registrar_uso_tokens
+
+CONCORRENCIA_PADRAO = int(os.getenv('PROVIA_LOTE_CONCORRENCIA', '4'))
+# Nomes aceitos para a coluna da pergunta, após normalizar o cabeçalho
+COLUNAS_PERGUNTA = ['pergunta', 'perguntas', 'question', 'questions']
+
+COLUNAS_CSV = ['id', 'pergunta', 'resposta', 'modelo', 'latencia_s', 'tokens_prompt', 'tokens_resposta',
+               'tokens_cache', 'erro']
+
+def localizar_documento(nome):
+    """Nome armazenado do documento, aceitando também o nome original (o upload mais recente)"""
+    metadata = provia.carregar_metadata()
+    if nome in metadata:
+        return nome
+    candidatos = [n for n, info in metadata.items() if info['nome_original'] == nome]
+    if not candidatos:
+        return None
+    return max(candidatos, key=lambda n: metadata[n]['data_upload'])
+
+def _normalizar_coluna(nome):
+    """Cabeçalho sem BOM, espaços nas pontas e diferença de maiúsculas"""
+    return str(nome).replace('\ufeff', '').strip().lower()
+
+def coluna_pergunta(registros, caminho):
+    """Coluna com as perguntas: um nome conhecido ou a única coluna além do id
+
+    Sem como decidir, a execução é interrompida em vez de enviar outra coluna como pergunta.
+    """
+    colunas = list(dict.fromkeys(coluna for registro in registros for coluna in registro))
+    for nome in COLUNAS_PERGUNTA:
+        if nome in colunas:
+            return nome
+    candidatas = [coluna for coluna in colunas if coluna and coluna != 'id']
+    if len(candidatas) == 1:
+        return candidatas[0]
+    raise SystemExit(f"Coluna de perguntas não encontrada em {caminho}: use 'pergunta' "
+                     f"(colunas encontradas: {', '.join(colunas) or 'nenhuma'})")
+
+def ler_perguntas(caminho):
+    """Lista de (id, pergunta) a partir de .txt, .csv, .jsonl ou .xlsx"""
+    extensao = os.path.splitext(caminho)[1].lower()
+    if extensao == '.txt':
+        with open(caminho, 'r', encoding='utf-8') as f:
+            linhas = [linha.strip() for linha in f]
+        return [(str(i), linha) for i, linha in enumerate(linhas, 1) if linha]
+    if extensao == '.jsonl':
+        with open(caminho, 'r', encoding='utf-8') as f:
+            registros = [json.loads(linha) for linha in f if linha.strip()]
+    elif extensao == '.csv':
+        with open(caminho, 'r', encoding='utf-8-sig', newline='') as f:
+            registros = list(csv.DictReader(f))
+    elif extensao == '.xlsx':
+        try:
+            import pandas as pd
+            registros = pd.read_excel(caminho, dtype=str).fillna('').to_dict('records')
+        except ImportError as e:
+            raise SystemExit(f'Para ler .xlsx instale pandas e openpyxl ({e}), ou exporte a planilha para .csv')
+    else:
+        raise SystemExit(f'Formato de perguntas não suportado: {extensao}')
+
+    # Campos excedentes de uma linha do CSV chegam sem cabeçalho (chave None)
+    registros = [{_normalizar_coluna(k): v for k, v in registro.items() if k is not None} for registro in registros]
+    coluna = coluna_pergunta(registros, caminho)
+    perguntas = []
+    for i, registro in enumerate(registros, 1):
+        pergunta = str(registro.get(coluna) or '').strip()
+        if pergunta:
+            perguntas.append((str(registro.get('id') or i).strip(), pergunta))
+    return perguntas
+
+def ler_concluidas(caminho_saida):
+    """Perguntas já respondidas com sucesso em execuções anteriores"""
+    concluidas = set()
+    if os.path.exists(caminho_saida):
+        with open(caminho_saida, 'r', encoding='utf-8') as f:
+            for linha in f:
+                try:
+                    registro = json.loads(linha)
+                except json.JSONDecodeError:
+                    # Última linha incompleta de uma execução interrompida
+                    continue
+                if not registro.get('erro'):
+                    concluidas.add((registro['id'], registro['pergunta']))
+    return concluidas
+
+def exportar_csv(caminho_saida, caminho_csv):
+    """Gera o CSV a partir do JSONL, com o registro mais recente de cada pergunta"""
+    registros = {}
+    with open(caminho_saida, 'r', encoding='utf-8') as f:
+        for linha in f:
+            try:
+                registro = json.loads(linha)
+            except json.JSONDecodeError:
+                continue
+            anterior = registros.get((registro['id'], registro['pergunta']))
+            # Uma resposta válida nunca é substituída por um erro de outra execução
+            if anterior is None or registro.get('erro') is None or anterior.get('erro'):
+                registros[(registro['id'], registro['pergunta'])] = registro
+    with open(caminho_csv, 'w', encoding='utf-8-sig', newline='') as f:
+        escritor = csv.DictWriter(f, fieldnames=COLUNAS_CSV, extrasaction='ignore')
+        escritor.writeheader()
+        escritor.writerows(registros.values())
+    return list(registros.values())
+
+def completar_ultima_linha(caminho_saida):
+    """Termina com quebra de linha o registro que uma execução interrompida deixou pela metade
+
+    Sem isso, o primeiro registro da nova execução seria colado nele e descartado na retomada.
+    """
+    if not os.path.exists(caminho_saida) or not os.path.getsize(caminho_saida):
+        return
+    with open(caminho_saida, 'rb+') as f:
+        f.seek(-1, os.SEEK_END)
+        if f.read(1) != b'\n':
+            f.write(b'\n')
+
+async def executar_lote(chain, system_message, perguntas, caminho_saida, concorrencia, nome_documento):
+    """Responde as perguntas com concorrência limitada, gravando cada resultado assim que termina"""
+    completar_ultima_linha(caminho_saida)
+    saida = open(caminho_saida, 'a', encoding='utf-8')
+
+    async def responder(item):
+        id_pergunta, pergunta = item
+        registro = {'id': id_pergunta, 'pergunta': pergunta, 'documento': nome_documento,
+                    'data': datetime.now().isoformat()}
+        try:
+            _, _, historico, uso_tokens, decisao = await asyncio.to_thread(
+                provia.preparar_turno, pergunta, [], system_message, None, True
+            )
+            inicio = time.perf_counter()
+            mensagem = await chain.ainvoke({'input': pergunta, 'chat_history': historico},
+                                           config=config_roteamento(decisao))
+            decisao['latencia_s'] = round(time.perf_counter() - inicio, 3)
+            anotar_uso(mensagem, uso_tokens)
+            await asyncio.to_thread(registrar_roteamento, decisao)
+            await asyncio.to_thread(registrar_uso_tokens, uso_tokens)
+            registro.update({
+                'resposta': mensagem.content,
+                'modelo': decisao['modelo'],
+                'latencia_s': decisao['latencia_s'],
+                'tokens_prompt': uso_tokens.get('tokens_prompt_api', uso_tokens['tokens_total']),
+                'tokens_resposta': uso_tokens.get('tokens_resposta', 0),
+                'tokens_cache': uso_tokens.get('tokens_cache', 0),
+                'erro': None,
+            })
+        except Exception as e:
+            registro['erro'] = repr(e)
+        saida.write(json.dumps(registro, ensure_ascii=False) + '\n')
+        saida.flush()
+        return registro
+
+    try:
+        return await RunnableLambda(responder).abatch(perguntas, config={'max_concurrency': concorrencia})
+    finally:
+        saida.close()
+
+def resumir(registros):
+    """Resumo da execução: quantidade, erros, latência e tokens"""
+    validos = [r for r in registros if not r.get('erro')]
+    latencias = [r['latencia_s'] for r in validos]
+    linhas = [f'Perguntas: {len(registros)} | respondidas: {len(validos)} | com erro: {len(registros) - len(validos)}']
+    if len(latencias) >= 2:
+        quantis = statistics.quantiles(latencias, n=10)
+        linhas.append(f'Latência: p50 {statistics.median(latencias):.2f}s | p90 {quantis[-1]:.2f}s | máx {max(latencias):.2f}s')
+    elif latencias:
+        linhas.append(f'Latência: {latencias[0]:.2f}s')
+    if validos:
+        linhas.append(f"Tokens: prompt {sum(r['tokens_prompt'] for r in validos)} | "
+                      f"resposta {sum(r['tokens_resposta'] for r in validos)} | "
+                      f"cache {sum(r['tokens_cache'] for r in validos)}")
+    return '\n'.join(linhas)
+
+def main():
+    parser = argparse.ArgumentParser(description='Perguntas em lote sobre um documento armazenado do ProV.ia')
+    parser.add_argument('documento', help='nome armazenado ou nome original do documento')
+    parser.add_argument('perguntas', help='arquivo de perguntas (.txt, .csv, .jsonl ou .xlsx)')
+    parser.add_argument('--saida', help='arquivo JSONL de respostas (padrão: <perguntas>.respostas.jsonl)')
+    parser.add_argument('--csv', help='arquivo CSV de respostas (padrão: mesmo nome da saída, com .csv)')
+    parser.add_argument('--concorrencia', type=int, default=CONCORRENCIA_PADRAO,
+                        help='perguntas enviadas ao modelo ao mesmo tempo')
+    args = parser.parse_args()
+
+    caminho_saida = args.saida or os.path.splitext(args.perguntas)[0] + '.respostas.jsonl'
+    caminho_csv = args.csv or os.path.splitext(caminho_saida)[0] + '.csv'
+
+    nome_arquivo = localizar_documento(args.documento)
+    if nome_arquivo is None:
+        print(f'❌ Documento não encontrado: {args.documento}')
+        return 1
+    preparado = provia.preparar_documento_salvo(nome_arquivo)
+    if preparado is None:
+        print(f'❌ Não foi possível carregar o documento {nome_arquivo}')
+        return 1
+    system_message, _ = preparado
+    chain = montar_template(system_message) | criar_modelo_roteado(provia.OPENAI_API_KEY)
+
+    perguntas = ler_perguntas(args.perguntas)
+    concluidas = ler_concluidas(caminho_saida)
+    pendentes = [(id_pergunta, pergunta) for id_pergunta, pergunta in perguntas if (id_pergunta, pergunta) not in concluidas]
+    print(f'{len(perguntas)} perguntas, {len(perguntas) - len(pendentes)} já respondidas, {len(pendentes)} pendentes')
+
+    try:
+        asyncio.run(executar_lote(chain, system_message, pendentes, caminho_saida, args.concorrencia, nome_arquivo))
+    except KeyboardInterrupt:
+        print('Interrompido; rode o mesmo comando para continuar.')
+
+    registros = exportar_csv(caminho_saida, caminho_csv)
+    chaves = set(perguntas)
+    print(resumir([r for r in registros if (r['id'], r['pergunta']) in chaves]))
+    print(f'Respostas em {caminho_saida} e {caminho_csv}')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
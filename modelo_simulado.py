@@ -0,0 +1,173 @@
+import os
+import json
+import time
+import random
+import asyncio
+import hashlib
+import threading
+from typing import Any, Dict, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage, SystemMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import PrivateAttr
+
+from tokens import contar_tokens
+
+# Modelo simulado no lugar da OpenAI (PROVIA_LLM=simulado), com perfil de latência configurável
+MODELO_SIMULADO_ATIVO = os.getenv('PROVIA_LLM', 'openai') == 'simulado'
+
+VOCABULARIO = (
+    'a provion oferece benefícios aos colaboradores conforme a política interna vigente e o documento '
+    'informa prazos valores regras de elegibilidade procedimentos responsáveis e canais de atendimento '
+    'para dúvidas adicionais procure o setor de recursos humanos ou consulte a intranet'
+).split()
+
+class ErroSimulado(Exception):
+    """Erro injetado pelo modelo simulado"""
+    status_code = 500
+
+class ErroLimiteTaxa(ErroSimulado):
+    """Resposta 429 (rate limit) injetada pelo modelo simulado"""
+    status_code = 429
+
+def chave_mensagens(mensagens):
+    """Chave de replay: hash da mensagem de sistema (com o documento carregado) e da última mensagem do usuário
+
+    A mesma pergunta sobre documentos diferentes gera chaves diferentes.
+    """
+    sistema = '\n'.join(str(m.content) for m in mensagens if isinstance(m, SystemMessage))
+    ultima = next((str(m.content) for m in reversed(mensagens) if isinstance(m, HumanMessage)), '')
+    return hashlib.sha256(f'{sistema}\0{ultima}'.encode('utf-8')).hexdigest()[:16]
+
+class ChatSimulado(BaseChatModel):
+    """Modelo de chat local e determinístico que substitui o ChatOpenAI nas chains
+
+    Gera tokens a partir de uma semente (ou repete respostas gravadas), com tempo até o
+    primeiro token, tokens por segundo, taxa de erros e de 429 configuráveis.
+    """
+    ttft_s: float = 0.3
+    tokens_por_segundo: float = 50.0
+    tokens_resposta: int = 60
+    taxa_erro: float = 0.0
+    taxa_429: float = 0.0
+    semente: int = 0
+    arquivo_replay: Optional[str] = None
+    nome_modelo: str = 'simulado'
+
+    _aleatorio: random.Random = PrivateAttr()
+    _respostas: Dict[str, str] = PrivateAttr(default_factory=dict)
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._aleatorio = random.Random(self.semente)
+        if self.arquivo_replay and os.path.exists(self.arquivo_replay):
+            with open(self.arquivo_replay, 'r', encoding='utf-8') as f:
+                for linha in f:
+                    registro = json.loads(linha)
+                    self._respostas[registro['chave']] = registro['resposta']
+
+    @property
+    def _llm_type(self):
+        return 'provia-simulado'
+
+    @property
+    def _identifying_params(self):
+        return {'model_name': self.nome_modelo, 'semente': self.semente}
+
+    def _sortear_falha(self):
+        with self._lock:
+            sorteio = self._aleatorio.random()
+        if sorteio < self.taxa_429:
+            raise ErroLimiteTaxa('Rate limit simulado (429)')
+        if sorteio < self.taxa_429 + self.taxa_erro:
+            raise ErroSimulado('Erro simulado do provedor')
+
+    def _resposta(self, mensagens):
+        chave = chave_mensagens(mensagens)
+        if chave in self._respostas:
+            return self._respostas[chave]
+        # Texto determinístico: mesma pergunta e semente geram a mesma resposta
+        gerador = random.Random(f'{self.semente}:{chave}')
+        return ' '.join(gerador.choice(VOCABULARIO) for _ in range(self.tokens_resposta))
+
+    def _pedacos(self, texto):
+        palavras = texto.split(' ')
+        return [p if i == len(palavras) - 1 else p + ' ' for i, p in enumerate(palavras)]
+
+    def _uso(self, mensagens, texto):
+        entrada = sum(contar_tokens(m.content) for m in mensagens)
+        saida = contar_tokens(texto)
+        return {'input_tokens': entrada, 'output_tokens': saida, 'total_tokens': entrada + saida}
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        texto = ''.join(c.message.content for c in self._stream(messages, stop, run_manager, **kwargs))
+        mensagem = AIMessage(content=texto, usage_metadata=self._uso(messages, texto))
+        return ChatResult(generations=[ChatGeneration(message=mensagem)])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        self._sortear_falha()
+        texto = self._resposta(messages)
+        time.sleep(self.ttft_s)
+        intervalo = 1 / self.tokens_por_segundo if self.tokens_por_segundo > 0 else 0
+        for i, pedaco in enumerate(self._pedacos(texto)):
+            if i:
+                time.sleep(intervalo)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=pedaco))
+            if run_manager:
+                run_manager.on_llm_new_token(pedaco, chunk=chunk)
+            yield chunk
+        yield ChatGenerationChunk(message=AIMessageChunk(content='', usage_metadata=self._uso(messages, texto)))
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        self._sortear_falha()
+        texto = self._resposta(messages)
+        await asyncio.sleep(self.ttft_s)
+        intervalo = 1 / self.tokens_por_segundo if self.tokens_por_segundo > 0 else 0
+        for i, pedaco in enumerate(self._pedacos(texto)):
+            if i:
+                await asyncio.sleep(intervalo)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=pedaco))
+            if run_manager:
+                await run_manager.on_llm_new_token(pedaco, chunk=chunk)
+            yield chunk
+        yield ChatGenerationChunk(message=AIMessageChunk(content='', usage_metadata=self._uso(messages, texto)))
+
+def criar_modelo_simulado(nome_modelo):
+    """Modelo simulado com o perfil definido pelas variáveis de ambiente PROVIA_SIMULADO_*"""
+    return ChatSimulado(
+        nome_modelo=nome_modelo,
+        ttft_s=float(os.getenv('PROVIA_SIMULADO_TTFT', '0.3')),
+        tokens_por_segundo=float(os.getenv('PROVIA_SIMULADO_TPS', '50')),
+        tokens_resposta=int(os.getenv('PROVIA_SIMULADO_TOKENS', '60')),
+        taxa_erro=float(os.getenv('PROVIA_SIMULADO_TAXA_ERRO', '0')),
+        taxa_429=float(os.getenv('PROVIA_SIMULADO_TAXA_429', '0')),
+        semente=int(os.getenv('PROVIA_SIMULADO_SEMENTE', '0')),
+        arquivo_replay=os.getenv('PROVIA_SIMULADO_REPLAY'),
+    )
+
+class GravadorSessao(BaseCallbackHandler):
+    """Callback que grava pares pergunta/resposta do modelo real para replay no modelo simulado"""
+
+    def __init__(self, arquivo):
+        self.arquivo = arquivo
+        self._mensagens = {}
+        self._lock = threading.Lock()
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._mensagens[run_id] = messages[0]
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        mensagens = self._mensagens.pop(run_id, None)
+        if mensagens is None:
+            return
+        registro = {
+            'chave': chave_mensagens(mensagens),
+            'pergunta': next((m.content for m in reversed(mensagens) if isinstance(m, HumanMessage)), ''),
+            'resposta': response.generations[0][0].text,
+        }
+        with self._lock:
+            with open(self.arquivo, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(registro, ensure_ascii=False) + '\n')
@@ -0,0 +1,45 @@
+from langchain.prompts import ChatPromptTemplate
+
+# Instruções estáticas: sempre idênticas byte a byte e sempre no início do prompt,
+# para que o cache de prompt do provedor reaproveite o mesmo prefixo entre sessões
+INSTRUCOES = '''Você é um assistente amigável chamado ProV.ia.
+Você é especialista em assuntos internos, dúvidas e questionamentos sobre a Provion.
+Seja prestativo, profissional e cordial em suas respostas.
+Sempre que houver $ na sua saída, substitua por S.'''
+
+INSTRUCOES_PADRAO = '''Ajude com informações gerais, tire dúvidas e forneça suporte aos usuários.'''
+
+INSTRUCOES_DOCUMENTO = '''Utilize as informações fornecidas para basear as suas respostas quando relevante.
+Se a informação do documento for algo como "Just a moment...Enable JavaScript and cookies to continue" sugira ao usuário carregar novamente o documento!'''
+
+def montar_system_message(documento=None, tipo=None):
+    """Monta a mensagem de sistema canônica: instruções, depois documento, depois o restante"""
+    if documento is None:
+        return f'{INSTRUCOES}\n\n{INSTRUCOES_PADRAO}'
+    return (
+        f'{INSTRUCOES}\n\n'
+        f'Você possui acesso às seguintes informações vindas de um documento {tipo}:\n\n'
+        f'####\n{documento}\n####\n\n'
+        f'{INSTRUCOES_DOCUMENTO}'
+    )
+
+def montar_template(system_message):
+    """Template do chat com a parte variável (histórico e entrada) depois do prefixo estático"""
+    template = ChatPromptTemplate.from_messages([
+        ('system', '{system_message}'),
+        ('placeholder', '{chat_history}'),
+        ('user', '{input}')
+    ])
+    # Passar a mensagem como variável evita que chaves do documento sejam lidas como campos do template
+    return template.partial(system_message=system_message)
+
+def montar_system_message_corpus(fontes):
+    """Mensagem de sistema para sessões com vários documentos; os trechos chegam junto de cada pergunta"""
+    lista_fontes = '\n'.join(f'- {fonte}' for fonte in fontes)
+    return (
+        f'{INSTRUCOES}\n\n'
+        f'Você possui acesso aos seguintes documentos:\n{lista_fontes}\n\n'
+        f'Cada pergunta virá acompanhada dos trechos mais relevantes desses documentos, identificados por [Fonte: ...].\n'
+        f'Baseie suas respostas nesses trechos e indique de qual documento veio cada informação.\n'
+        f'Se os trechos não contiverem a resposta, diga isso ao usuário.'
+    )
@@ -0,0 +1,101 @@
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+# Rastreamento desligado por padrão: quando inativo, spans e decoradores não fazem nada
+RASTREAMENTO_ATIVO = os.getenv('PROVIA_TRACING', '0') == '1'
+ARQUIVO_RASTREAMENTO = os.getenv('PROVIA_TRACING_ARQUIVO', 'traces.jsonl')
+
+_span_atual = ContextVar('span_atual', default=None)
+_lock_exportacao = threading.Lock()
+
+class _SpanInativo:
+    """Span usado quando o rastreamento está desligado"""
+    def definir(self, **atributos):
+        pass
+
+_SPAN_INATIVO = _SpanInativo()
+
+class Span:
+    """Intervalo de execução com atributos, no formato de spans do OpenTelemetry"""
+    def __init__(self, nome, pai, atributos):
+        self.nome = nome
+        self.trace_id = pai.trace_id if pai else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_span_id = pai.span_id if pai else None
+        self.atributos = dict(atributos)
+        self.status = 'OK'
+        self.inicio = time.time_ns()
+
+    def definir(self, **atributos):
+        self.atributos.update(atributos)
+
+    def para_dict(self, fim):
+        return {
+            'name': self.nome,
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_span_id': self.parent_span_id,
+            'start_time_unix_nano': self.inicio,
+            'end_time_unix_nano': fim,
+            'duration_ms': round((fim - self.inicio) / 1e6, 3),
+            'status': self.status,
+            'attributes': self.atributos,
+        }
+
+def exportar(registro):
+    """Exporta um span finalizado como uma linha JSON"""
+    linha = json.dumps(registro, ensure_ascii=False, default=str) + '\n'
+    try:
+        with _lock_exportacao:
+            with open(ARQUIVO_RASTREAMENTO, 'a', encoding='utf-8') as f:
+                f.write(linha)
+    except OSError as e:
+        print(f'Erro ao exportar span: {e}')
+
+@contextmanager
+def span(nome, **atributos):
+    """Abre um span filho do span atual"""
+    if not RASTREAMENTO_ATIVO:
+        yield _SPAN_INATIVO
+        return
+    atual = Span(nome, _span_atual.get(), atributos)
+    token = _span_atual.set(atual)
+    try:
+        yield atual
+    except BaseException as e:
+        atual.status = 'ERROR'
+        atual.definir(erro=repr(e))
+        raise
+    finally:
+        _span_atual.reset(token)
+        exportar(atual.para_dict(time.time_ns()))
+
+def definir_atributos(**atributos):
+    """Acrescenta atributos ao span atual (nada faz fora de um span ou com o rastreamento desligado)"""
+    atual = _span_atual.get()
+    if atual is not None:
+        atual.definir(**atributos)
+
+def rastrear(nome=None):
+    """Decorador que envolve a função em um span, registrando bytes lidos e caracteres gerados"""
+    def decorador(func):
+        nome_span = nome or func.__name__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not RASTREAMENTO_ATIVO:
+                return func(*args, **kwargs)
+            with span(nome_span) as atual:
+                if args and isinstance(args[0], str) and os.path.isfile(args[0]):
+                    atual.definir(bytes_lidos=os.path.getsize(args[0]))
+                resultado = func(*args, **kwargs)
+                if isinstance(resultado, str):
+                    atual.definir(caracteres=len(resultado))
+                return resultado
+        return wrapper
+    return decorador
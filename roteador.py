@@ -0,0 +1,125 @@
+import os
+import re
+import json
+import asyncio
+import time
+from datetime import datetime
+
+from langchain_core.runnables import ConfigurableField
+
+from modelo_simulado import MODELO_SIMULADO_ATIVO, criar_modelo_simulado, GravadorSessao
+
+# Modelos disponíveis para o roteamento
+MODELO_PESADO = os.getenv('PROVIA_MODELO_PESADO', 'gpt-4o')
+MODELO_RAPIDO = os.getenv('PROVIA_MODELO_RAPIDO', 'gpt-4o-mini')
+
+# Acima deste tamanho de prompt o turno sempre vai para o modelo pesado
+LIMITE_TOKENS_RAPIDO = int(os.getenv('PROVIA_LIMITE_TOKENS_RAPIDO', '8000'))
+ARQUIVO_ROTEAMENTO = os.getenv('PROVIA_LOG_ROTEAMENTO', 'routing_log.jsonl')
+
+# Grava as respostas do modelo real para replay no modelo simulado
+ARQUIVO_GRAVACAO = os.getenv('PROVIA_GRAVAR_SESSAO')
+GRAVADOR = GravadorSessao(ARQUIVO_GRAVACAO) if ARQUIVO_GRAVACAO else None
+
+PADRAO_TRIVIAL = re.compile(
+    r'^(oi|ol[áa]|bom dia|boa tarde|boa noite|obrigad[oa]|muito obrigad[oa]|valeu|ok|okay|certo|'
+    r'entendi|tchau|at[ée] mais|perfeito|beleza|show|legal|[óo]timo)[\s!.,?]*$',
+    re.IGNORECASE
+)
+PALAVRAS_COMPLEXAS = (
+    'compare', 'comparar', 'compara', 'analise', 'analisar', 'explique', 'explicar', 'resuma',
+    'resumir', 'resumo', 'calcule', 'calcular', 'por que', 'porque', 'liste todos', 'detalhe',
+    'detalhar', 'diferença', 'passo a passo', 'elabore', 'redija', 'escreva'
+)
+# Consultas maiores que isso (em caracteres) são tratadas como complexas
+MAX_CARACTERES_SIMPLES = 200
+
+def criar_modelo_roteado(api_key):
+    """Cria o modelo de chat com alternativa configurável por turno ('pesado' ou 'rapido')"""
+    if MODELO_SIMULADO_ATIVO:
+        return criar_modelo_simulado(MODELO_PESADO).configurable_alternatives(
+            ConfigurableField(id='modelo'),
+            default_key='pesado',
+            rapido=criar_modelo_simulado(MODELO_RAPIDO)
+        )
+    
+    # Import adiado: langchain_openai é pesado e só é necessário ao montar a primeira chain
+    from langchain_openai import ChatOpenAI
+    return ChatOpenAI(model=MODELO_PESADO, api_key=api_key, stream_usage=True).configurable_alternatives(
+        ConfigurableField(id='modelo'),
+        default_key='pesado',
+        rapido=ChatOpenAI(model=MODELO_RAPIDO, api_key=api_key, stream_usage=True)
+    )
+
+def classificar_consulta(entrada):
+    """Classificador barato da consulta: 'trivial', 'simples' ou 'complexa'"""
+    texto = entrada.strip()
+    if PADRAO_TRIVIAL.match(texto):
+        return 'trivial'
+    minusculo = texto.lower()
+    if len(texto) > MAX_CARACTERES_SIMPLES or any(p in minusculo for p in PALAVRAS_COMPLEXAS):
+        return 'complexa'
+    return 'simples'
+
+def escolher_modelo(entrada, tokens_prompt, tem_documento):
+    """Decide qual modelo atende o turno a partir da consulta, do tamanho do prompt e do documento"""
+    classe = classificar_consulta(entrada)
+    if classe == 'trivial':
+        chave, motivo = 'rapido', 'consulta trivial'
+    elif tokens_prompt > LIMITE_TOKENS_RAPIDO:
+        chave, motivo = 'pesado', 'prompt grande'
+    elif classe == 'complexa':
+        chave, motivo = 'pesado', 'consulta complexa'
+    elif tem_documento:
+        chave, motivo = 'pesado', 'consulta sobre documento'
+    else:
+        chave, motivo = 'rapido', 'consulta simples'
+
+    return {
+        'data': datetime.now().isoformat(),
+        'chave': chave,
+        'modelo': MODELO_RAPIDO if chave == 'rapido' else MODELO_PESADO,
+        'motivo': motivo,
+        'classe': classe,
+        'tokens_prompt': tokens_prompt,
+        'tem_documento': tem_documento,
+    }
+
+def config_roteamento(decisao):
+    """Configuração da chain que seleciona o modelo decidido"""
+    config = {'configurable': {'modelo': decisao['chave']}}
+    if GRAVADOR is not None:
+        config['callbacks'] = [GRAVADOR]
+    return config
+
+def medir_latencia_stream(stream, decisao):
+    """Repassa os chunks e registra o tempo até o primeiro token e a latência total do modelo escolhido"""
+    inicio = time.perf_counter()
+    primeiro_token = None
+    for chunk in stream:
+        if primeiro_token is None:
+            primeiro_token = time.perf_counter() - inicio
+        yield chunk
+    decisao['ttft_s'] = round(primeiro_token or 0.0, 3)
+    decisao['latencia_s'] = round(time.perf_counter() - inicio, 3)
+    registrar_roteamento(decisao)
+
+async def medir_latencia_astream(stream, decisao):
+    """Versão assíncrona de medir_latencia_stream; a gravação do registro não bloqueia o event loop"""
+    inicio = time.perf_counter()
+    primeiro_token = None
+    async for chunk in stream:
+        if primeiro_token is None:
+            primeiro_token = time.perf_counter() - inicio
+        yield chunk
+    decisao['ttft_s'] = round(primeiro_token or 0.0, 3)
+    decisao['latencia_s'] = round(time.perf_counter() - inicio, 3)
+    await asyncio.to_thread(registrar_roteamento, decisao)
+
+def registrar_roteamento(decisao):
+    """Registra a decisão de roteamento e a latência observada"""
+    try:
+        with open(ARQUIVO_ROTEAMENTO, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(decisao, ensure_ascii=False) + '\n')
+    except OSError as e:
+        print(f'Erro ao registrar roteamento: {e}')
@@ -0,0 +1,13 @@
+import os
+import sys
+
+RAIZ_REPOSITORIO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+sys.path.insert(0, RAIZ_REPOSITORIO)
+sys.path.insert(0, os.path.join(RAIZ_REPOSITORIO, 'benchmarks'))
+
+# Modelo simulado e sem rastreamento: os testes não acessam a OpenAI
+os.environ.setdefault('PROVIA_LLM', 'simulado')
+os.environ.setdefault('PROVIA_SIMULADO_TTFT', '0')
+os.environ.setdefault('PROVIA_SIMULADO_TPS', '0')
+os.environ['PROVIA_TRACING'] = '0'
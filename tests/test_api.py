@@ -0,0 +1,88 @@
+import os
+import importlib
+
+import pytest
+from fastapi.testclient import TestClient
+
+USUARIO = {'X-Usuario': 'ana@provion.com.br'}
+
+@pytest.fixture
+def api(tmp_path, monkeypatch):
+    import conversas
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(conversas, 'ARQUIVO_CONVERSAS', str(tmp_path / 'conversas.db'))
+    import api as modulo_api
+    importlib.reload(modulo_api)
+    yield modulo_api
+    # O gravador de conversas roda em segundo plano: termina antes de o banco temporário sair de cena
+    conversas.descarregar(5)
+
+def _eventos(resposta):
+    return [linha.split(': ', 1)[1] for linha in resposta.text.splitlines() if linha.startswith('event: ')]
+
+def test_cabecalho_de_usuario_e_obrigatorio(api):
+    cliente = TestClient(api.api)
+
+    assert cliente.get('/arquivos').status_code == 401
+    assert cliente.get('/arquivos', headers=USUARIO).status_code == 200
+    assert cliente.post('/sessoes').status_code == 401
+    assert cliente.post('/sessoes', headers={'X-Usuario': '  '}).status_code == 401
+    assert cliente.post('/sessoes', headers=USUARIO).status_code == 200
+
+def test_turno_emite_tokens_e_fim(api):
+    cliente = TestClient(api.api)
+    sessao = cliente.post('/sessoes', headers=USUARIO).json()['sessao']
+
+    resposta = cliente.post(f'/sessoes/{sessao}/mensagens', json={'mensagem': 'Qual o prazo de férias?'}, headers=USUARIO)
+
+    eventos = _eventos(resposta)
+    assert eventos[0] == 'token' and eventos[-1] == 'fim'
+
+def test_falha_ao_montar_o_prompt_vira_evento_de_erro(api, monkeypatch):
+    def falhar(*args):
+        raise RuntimeError('índice indisponível')
+    monkeypatch.setattr(api.provia, 'preparar_turno', falhar)
+    cliente = TestClient(api.api)
+    sessao = cliente.post('/sessoes', headers=USUARIO).json()['sessao']
+
+    resposta = cliente.post(f'/sessoes/{sessao}/mensagens', json={'mensagem': 'Qual o prazo?'}, headers=USUARIO)
+
+    assert _eventos(resposta) == ['erro']
+    assert 'índice indisponível' in resposta.text
+
+def test_nome_do_arquivo_enviado_nao_sai_do_diretorio_de_uploads(api, tmp_path):
+    # O app cria o diretório de uploads ao ser importado, possivelmente em outro diretório de teste
+    os.makedirs(api.provia.UPLOAD_DIR, exist_ok=True)
+    cliente = TestClient(api.api)
+    sessao = cliente.post('/sessoes', headers=USUARIO).json()['sessao']
+    url = f'/sessoes/{sessao}/documento'
+
+    resposta = cliente.post(url, data={'tipo': 'Txt'}, headers=USUARIO,
+                            files={'arquivo': ('..\\..\\ferias.txt', 'Prazo de férias: 30 dias'.encode(), 'text/plain')})
+
+    assert resposta.status_code == 200
+    assert [nome.split('_', 1)[1] for nome in os.listdir(api.provia.UPLOAD_DIR)] == ['ferias.txt']
+    assert not (tmp_path.parent / 'ferias.txt').exists()
+    vazio = cliente.post(url, data={'tipo': 'Txt'}, headers=USUARIO, files={'arquivo': ('..', b'x', 'text/plain')})
+    assert vazio.status_code == 400
+
+def test_site_indisponivel_e_recusado(api, monkeypatch):
+    import loaders
+
+    class LoaderFalhando:
+        def __init__(self, *args, **kwargs):
+            pass
+
+        def load(self):
+            raise ConnectionError('sem rede')
+    monkeypatch.setattr(loaders, 'obter_loader', lambda nome: LoaderFalhando)
+    monkeypatch.setattr(loaders, 'sleep', lambda segundos: None)
+    cliente = TestClient(api.api)
+    sessao = cliente.post('/sessoes', headers=USUARIO).json()['sessao']
+
+    resposta = cliente.post(f'/sessoes/{sessao}/documento', data={'tipo': 'Site', 'url': 'https://provion.com.br'},
+                            headers=USUARIO)
+
+    assert resposta.status_code == 422
+    assert 'Não foi possível carregar o site' in resposta.json()['detail']
+    assert cliente.get(f'/sessoes/{sessao}', headers=USUARIO).json()['documento'] is None
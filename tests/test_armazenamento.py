@@ -0,0 +1,113 @@
+import os
+import time
+import multiprocessing
+
+import pytest
+
+import armazenamento
+from armazenamento import (MetadataIlegivel, aplicar_cota, bloquear_metadata, gravar_atomico, gravar_metadata,
+                           ler_metadata, limpar_orfaos, uso_disco)
+
+UPLOADS = 'uploaded_files'
+CACHE = 'cache_documentos'
+
+@pytest.fixture(autouse=True)
+def area(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs(UPLOADS)
+    os.makedirs(CACHE)
+
+def _arquivo(caminho, tamanho, idade_s=3600):
+    with open(caminho, 'wb') as f:
+        f.write(b'x' * tamanho)
+    antigo = time.time() - idade_s
+    os.utime(caminho, (antigo, antigo))
+    return caminho
+
+def _upload(metadata, nome, tamanho, ultimo_acesso, idade_s=3600):
+    caminho = _arquivo(os.path.join(UPLOADS, nome), tamanho, idade_s)
+    metadata[nome] = {'nome_original': nome, 'tipo': 'Pdf', 'data_upload': '2024-01-01T00:00:00',
+                      'tamanho': tamanho, 'caminho': caminho, 'ultimo_acesso': ultimo_acesso}
+    return caminho
+
+def test_metadata_corrompido_suspende_limpeza_e_gravacao():
+    with open('file_metadata.json', 'w', encoding='utf-8') as f:
+        f.write('{"1_manual.pdf": {"nome_orig')
+    upload = _arquivo(os.path.join(UPLOADS, '1_manual.pdf'), 100)
+
+    metadata = ler_metadata('file_metadata.json')
+
+    assert isinstance(metadata, MetadataIlegivel) and metadata == {}
+    assert limpar_orfaos(metadata, UPLOADS) == 0
+    assert aplicar_cota(metadata, UPLOADS, cota=0)[1] == {'ignorado': 'metadata ilegível'}
+    assert os.path.exists(upload)
+    metadata['2_novo.pdf'] = {}
+    with pytest.raises(ValueError):
+        gravar_metadata('file_metadata.json', metadata)
+    with open('file_metadata.json', encoding='utf-8') as f:
+        assert f.read() == '{"1_manual.pdf": {"nome_orig'
+
+def test_orfaos_recentes_sao_preservados():
+    metadata = {}
+    _upload(metadata, '1_conhecido.pdf', 10, '2024-01-01')
+    antigo = _arquivo(os.path.join(UPLOADS, '2_orfao.pdf'), 10)
+    recente = _arquivo(os.path.join(UPLOADS, '3_em_upload.pdf'), 10, idade_s=5)
+    derivado_antigo = _arquivo(os.path.join(CACHE, '2_orfao.pdf.texto.txt'), 10)
+    derivado_recente = _arquivo(os.path.join(CACHE, '3_em_upload.pdf.indice.json'), 10, idade_s=5)
+
+    assert limpar_orfaos(metadata, UPLOADS) == 2
+
+    assert not os.path.exists(antigo) and not os.path.exists(derivado_antigo)
+    assert os.path.exists(recente) and os.path.exists(derivado_recente)
+    assert os.path.exists(metadata['1_conhecido.pdf']['caminho'])
+
+def test_cota_remove_upload_com_derivados_e_respeita_carencia():
+    metadata = {}
+    velho = _upload(metadata, '1_velho.pdf', 1000, '2024-01-01')
+    recente = _upload(metadata, '2_recente.pdf', 1000, '2024-01-02', idade_s=5)
+    _upload(metadata, '3_ultimo.pdf', 1000, '2024-01-03')
+    derivados = [_arquivo(os.path.join(CACHE, '1_velho.pdf.texto.txt'), 10),
+                 _arquivo(os.path.join(CACHE, '1_velho.pdf.indice.json'), 10)]
+
+    metadata, relatorio = aplicar_cota(metadata, UPLOADS, cota=100)
+
+    assert relatorio['arquivos_removidos'] == ['1_velho.pdf']
+    assert not os.path.exists(velho)
+    assert not any(os.path.exists(d) for d in derivados)
+    assert os.path.exists(recente)
+    assert set(metadata) == {'2_recente.pdf', '3_ultimo.pdf'}
+
+def test_uso_disco_inclui_indice_de_arquivos(monkeypatch):
+    monkeypatch.setattr(armazenamento, 'ARQUIVO_INDICE', 'file_index.db')
+    _arquivo(os.path.join(UPLOADS, '1_a.pdf'), 100)
+    _arquivo('file_index.db', 50)
+
+    uso = uso_disco(UPLOADS)
+
+    assert uso['indice'] == 50
+    assert uso['total'] == 150
+
+def test_gravacao_atomica_nao_deixa_temporarios():
+    gravar_atomico('file_metadata.json', '{"a": 1}')
+    gravar_atomico('file_metadata.json', '{"a": 2}')
+
+    assert ler_metadata('file_metadata.json') == {'a': 2}
+    assert sorted(os.listdir('.')) == sorted(['file_metadata.json', UPLOADS, CACHE])
+
+def _incluir_entradas(processo, quantidade):
+    for i in range(quantidade):
+        with bloquear_metadata('file_metadata.json'):
+            metadata = ler_metadata('file_metadata.json')
+            metadata[f'{processo}_{i}'] = {}
+            gravar_metadata('file_metadata.json', metadata)
+
+def test_lock_preserva_alteracoes_de_processos_concorrentes():
+    contexto = multiprocessing.get_context('fork')
+    processos = [contexto.Process(target=_incluir_entradas, args=(p, 25)) for p in range(4)]
+    for processo in processos:
+        processo.start()
+    for processo in processos:
+        processo.join(30)
+
+    assert all(processo.exitcode == 0 for processo in processos)
+    assert len(ler_metadata('file_metadata.json')) == 100
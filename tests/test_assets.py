@@ -0,0 +1,14 @@
+import os
+
+import assets
+
+def test_assets_independem_do_diretorio_atual(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    pagina = assets.construir_assets.__wrapped__()
+
+    assert pagina['css'].startswith('<style>') and len(pagina['css']) > len('<style></style>')
+    for chave in ['cerebro', 'logo']:
+        assert pagina[chave].startswith(assets.URL_STATIC + '/')
+        assert os.path.exists(os.path.join(assets.DIRETORIO_STATIC, pagina[chave].rsplit('/', 1)[1]))
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,47 @@
+import multiprocessing
+
+from executar import comparar
+from medicao import aguardar_resultado, pico_rss_mb, rss_mb
+
+def _resultado(tempo_s, pico_rss_mb):
+    return {'tempo_s': tempo_s, 'pico_rss_mb': pico_rss_mb, 'vazao': 1.0, 'unidade_vazao': 'B/s'}
+
+def test_comparar_aponta_regressoes_de_tempo_e_memoria():
+    baseline = {'tempo': _resultado(1.0, 100), 'memoria': _resultado(1.0, 100), 'ruido': _resultado(1.0, 20),
+                'estavel': _resultado(1.0, 100)}
+    resultados = {'tempo': _resultado(1.5, 100), 'memoria': _resultado(1.0, 180), 'ruido': _resultado(1.0, 28),
+                  'estavel': _resultado(1.1, 110), 'novo': _resultado(9.0, 900), 'erro': {'erro': 'falhou'}}
+
+    regressoes = comparar(resultados, baseline, tolerancia=0.25, tolerancia_memoria=0.25)
+
+    assert [(nome, metrica) for nome, metrica, *_ in regressoes] == [('tempo', 'tempo_s'), ('memoria', 'pico_rss_mb')]
+
+def test_pico_rss():
+    assert pico_rss_mb() > 1
+
+def _morrer(fila):
+    raise SystemExit(3)
+
+def test_processo_que_morre_sem_resultado_vira_erro():
+    contexto = multiprocessing.get_context('spawn')
+    fila = contexto.Queue()
+    processo = contexto.Process(target=_morrer, args=(fila,))
+    processo.start()
+
+    assert aguardar_resultado(processo, fila, 30) == {'erro': 'processo encerrado sem resultado (código 3)'}
+
+def _travar(fila):
+    import time
+    time.sleep(60)
+
+def test_processo_travado_e_encerrado_no_tempo_maximo():
+    contexto = multiprocessing.get_context('spawn')
+    fila = contexto.Queue()
+    processo = contexto.Process(target=_travar, args=(fila,))
+    processo.start()
+
+    assert aguardar_resultado(processo, fila, 1) == {'erro': 'tempo máximo de 1s excedido'}
+    assert not processo.is_alive()
+
+def test_rss_atual():
+    assert 1 < rss_mb() <= pico_rss_mb() + 1
@@ -0,0 +1,95 @@
+from fixtures import gerar_pdf
+from loaders import carrega_pdf
+from compactacao import compactar_documento
+from tokens import contar_tokens
+
+CABECALHO = 'Provion - Manual Interno do Colaborador'
+
+def _pdf(tmp_path, corpo):
+    caminho = str(tmp_path / 'manual.pdf')
+    gerar_pdf(caminho, len(corpo), corpo=corpo)
+    return carrega_pdf(caminho)
+
+def test_remove_cabecalho_e_numeracao_do_pdf(tmp_path):
+    corpo = [[f'Capitulo {i}: regras de reembolso da unidade {i}', f'Prazo de {i * 10} dias uteis'] for i in range(1, 6)]
+    documento = _pdf(tmp_path, corpo)
+    assert CABECALHO in documento and 'Pagina 3 de 5' in documento
+
+    texto, relatorio = compactar_documento(documento, 'Pdf')
+
+    assert CABECALHO not in texto
+    assert 'Pagina' not in texto
+    for linhas in corpo:
+        for linha in linhas:
+            assert linha in texto
+    assert relatorio['linhas_removidas'] == 10
+
+def test_mantem_numeros_de_tabela_no_pdf(tmp_path):
+    corpo = [['Tabela de valores por faixa', 'Faixa', 'Valor', '1', '1500', '2', '2300', 'Fim da tabela'],
+             ['Texto corrido da segunda pagina'],
+             ['Texto corrido da terceira pagina']]
+    documento = _pdf(tmp_path, corpo)
+
+    texto, _ = compactar_documento(documento, 'Pdf')
+
+    linhas = texto.split('\n')
+    for valor in ['1', '1500', '2', '2300']:
+        assert valor in linhas
+
+def test_numeros_soltos_fora_de_pdf_nao_sao_removidos():
+    documento = 'Quantidade\n42\n\nTotal\n1500\n\nPágina 3'
+
+    texto, relatorio = compactar_documento(documento, 'Txt')
+
+    assert texto == documento
+    assert relatorio['linhas_removidas'] == 0
+
+def test_hifenizacao():
+    documento = ('A informa-\nção do colaborador fica no sistema de informação.\n'
+                 'O programa de bem-\nestar segue o decreto-\nlei vigente.')
+
+    texto, _ = compactar_documento(documento, 'Txt')
+
+    assert 'A informação do colaborador' in texto
+    assert 'bem-estar' in texto
+    assert 'decreto-lei' in texto
+
+def test_csv_nao_e_compactado():
+    documento = 'nome: Ana\nvalor: 10\n\nnome: Ana\nvalor: 10'
+
+    texto, relatorio = compactar_documento(documento, 'Csv')
+
+    assert texto == documento
+    assert relatorio['paragrafos_removidos'] == 0
+
+def test_texto_do_corpo_nao_e_tratado_como_boilerplate(tmp_path):
+    cookies = 'Utilizamos cookies estritamente necessários no portal do colaborador; o consentimento é registrado pelo RH.'
+    direitos = 'Todos os direitos reservados ao colaborador estão descritos na cláusula 4.'
+    documento = f'Política de privacidade\n{cookies}\n\nSeção 2\nTexto da seção\n{direitos}\nFim da seção'
+
+    texto, relatorio = compactar_documento(documento, 'Txt')
+    assert cookies in texto and direitos in texto
+    assert relatorio['linhas_removidas'] == 0
+
+    corpo = [[f'Capitulo {i}', 'Introducao', cookies, '© marca registrada citada no contrato', 'Detalhes', 'Conclusao']
+             for i in range(1, 4)]
+    texto, _ = compactar_documento(_pdf(tmp_path, corpo), 'Pdf')
+    assert cookies in texto
+    assert '© marca registrada citada no contrato' in texto
+
+def test_navegacao_de_site_e_removida():
+    documento = 'Pular para o conteúdo\nMenu\nPrazo de trinta dias.\nUsamos cookies para melhorar sua experiência.\n© 2024 Provion'
+
+    texto, relatorio = compactar_documento(documento, 'Site')
+
+    assert texto == 'Prazo de trinta dias.'
+    assert relatorio['linhas_removidas'] == 4
+
+def test_relatorio_conta_os_tokens_do_original():
+    documento = 'Prazo   de   trinta   dias.\n\n\n\nPrazo de trinta dias.'
+
+    texto, relatorio = compactar_documento(documento, 'Txt')
+
+    assert relatorio['tokens_antes'] == contar_tokens(documento)
+    assert relatorio['tokens_depois'] == contar_tokens(texto)
+    assert relatorio['tokens_economizados'] == relatorio['tokens_antes'] - relatorio['tokens_depois']
@@ -0,0 +1,41 @@
+import pytest
+
+import conversas
+
+@pytest.fixture(autouse=True)
+def banco(tmp_path, monkeypatch):
+    monkeypatch.setattr(conversas, 'ARQUIVO_CONVERSAS', str(tmp_path / 'conversas.db'))
+    monkeypatch.setattr(conversas, 'INTERVALO_GRAVACAO', 0)
+
+def test_grava_mensagens_em_segundo_plano():
+    conversas.registrar_mensagem('ana', 's1', 'human', 'Qual o prazo?')
+    conversas.registrar_mensagem('ana', 's1', 'ai', 'Trinta dias.')
+
+    assert conversas.descarregar(5)
+    assert [(tipo, conteudo) for _, tipo, conteudo in conversas.carregar_mensagens('ana', 's1', 10)] == [
+        ('human', 'Qual o prazo?'), ('ai', 'Trinta dias.')]
+
+def test_falha_inesperada_nao_derruba_o_gravador(monkeypatch):
+    gravar = conversas._gravar
+    falhas = [ValueError('falha inesperada')]
+
+    def gravar_falhando(lote):
+        if falhas:
+            raise falhas.pop()
+        gravar(lote)
+    monkeypatch.setattr(conversas, '_gravar', gravar_falhando)
+
+    conversas.registrar_mensagem('ana', 's1', 'human', 'perdida')
+    assert conversas.descarregar(5)
+    conversas.registrar_mensagem('ana', 's1', 'human', 'gravada')
+
+    assert conversas.descarregar(5)
+    assert conversas._gravador.is_alive()
+    assert [conteudo for _, _, conteudo in conversas.carregar_mensagens('ana', 's1', 10)] == ['gravada']
+
+def test_descarga_respeita_o_tempo_maximo(monkeypatch):
+    monkeypatch.setattr(conversas, '_gravar', lambda lote: conversas.time.sleep(2))
+    conversas.registrar_mensagem('ana', 's1', 'human', 'lenta')
+
+    assert not conversas.descarregar(0.2)
+    assert conversas.descarregar(5)
@@ -0,0 +1,76 @@
+import os
+
+import pytest
+
+from corpus import (DIRETORIO_CACHE, buscar_trechos, gravar_texto_cache, ler_relatorio_cache, ler_texto_cache,
+                    montar_entrada, obter_indice_arquivo)
+
+INFO = {'nome_original': 'manual.pdf', 'tipo': 'Pdf', 'tamanho': 1200, 'data_upload': '2024-05-01T10:00:00'}
+
+@pytest.fixture(autouse=True)
+def area(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+def test_texto_em_cache_corresponde_ao_upload():
+    gravar_texto_cache('1_manual.pdf', INFO, 'Prazo de férias:\n30 dias')
+
+    assert ler_texto_cache('1_manual.pdf', INFO) == 'Prazo de férias:\n30 dias'
+    assert ler_texto_cache('1_manual.pdf', dict(INFO, tamanho=1300)) is None
+    assert ler_texto_cache('1_manual.pdf', dict(INFO, data_upload='2024-06-01T10:00:00')) is None
+    assert os.listdir(DIRETORIO_CACHE) == ['1_manual.pdf.texto.txt']
+
+def test_relatorio_da_compactacao_fica_no_cache():
+    relatorio = {'tokens_antes': 120, 'tokens_depois': 100, 'tokens_economizados': 20}
+    gravar_texto_cache('1_manual.pdf', INFO, 'Prazo de férias:\n30 dias', relatorio)
+
+    assert ler_relatorio_cache('1_manual.pdf', INFO) == relatorio
+    assert ler_texto_cache('1_manual.pdf', INFO) == 'Prazo de férias:\n30 dias'
+    assert ler_relatorio_cache('1_manual.pdf', dict(INFO, tamanho=1300)) is None
+
+def test_cache_antigo_sem_cabecalho_e_ignorado():
+    os.makedirs(DIRETORIO_CACHE)
+    with open(os.path.join(DIRETORIO_CACHE, '1_manual.pdf.texto.txt'), 'w', encoding='utf-8') as f:
+        f.write('texto de uma versão anterior')
+
+    assert ler_texto_cache('1_manual.pdf', INFO) is None
+
+def test_indice_e_reconstruido_quando_o_upload_muda():
+    textos = iter(['primeira versão do regulamento', 'segunda versão do regulamento'])
+    carregar = lambda nome: next(textos)
+
+    primeiro = obter_indice_arquivo('1_manual.pdf', INFO, carregar)
+    repetido = obter_indice_arquivo('1_manual.pdf', INFO, carregar)
+    novo = obter_indice_arquivo('1_manual.pdf', dict(INFO, tamanho=1300), carregar)
+
+    assert repetido['trechos'] == primeiro['trechos'] == ['primeira versão do regulamento']
+    assert novo['trechos'] == ['segunda versão do regulamento']
+    assert os.listdir(DIRETORIO_CACHE) == ['1_manual.pdf.indice.json']
+
+def _indice(nome, texto):
+    info = dict(INFO, nome_original=nome)
+    return obter_indice_arquivo(nome, info, lambda _: texto)
+
+def test_busca_ordena_trechos_de_varios_documentos():
+    ferias = _indice('ferias.pdf', 'Férias: o prazo para solicitar férias é de trinta dias.\n\n'
+                                   'O abono pecuniário pode ser pedido junto das férias.')
+    reembolso = _indice('reembolso.pdf', 'Reembolso de despesas de viagem em até cinco dias.\n\n'
+                                         'Despesas sem nota fiscal não têm reembolso.')
+    geral = _indice('geral.txt', 'Horário de atendimento do RH: das 9h às 18h.')
+
+    trechos = buscar_trechos([geral, reembolso, ferias], 'Qual o prazo do reembolso de despesas?')
+
+    assert [t['fonte'] for t in trechos] == ['reembolso.pdf', 'ferias.pdf']
+    assert trechos[0]['pontuacao'] > trechos[1]['pontuacao']
+    assert buscar_trechos([geral, reembolso, ferias], 'reembolso', max_tokens=1) == []
+
+def test_entrada_cita_a_fonte_de_cada_trecho():
+    trechos = [{'fonte': 'reembolso.pdf', 'trecho': 2, 'texto': 'Despesas sem nota não têm reembolso.'},
+               {'fonte': 'ferias.pdf', 'trecho': 1, 'texto': 'Prazo de trinta dias.'}]
+
+    entrada = montar_entrada('Qual o prazo?', trechos)
+
+    assert '[Fonte: reembolso.pdf - trecho 2]\nDespesas sem nota não têm reembolso.' in entrada
+    assert '[Fonte: ferias.pdf - trecho 1]\nPrazo de trinta dias.' in entrada
+    assert entrada.index('reembolso.pdf') < entrada.index('ferias.pdf')
+    assert entrada.endswith('Pergunta: Qual o prazo?')
+    assert montar_entrada('Qual o prazo?', []).startswith('(Nenhum trecho')
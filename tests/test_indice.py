@@ -0,0 +1,63 @@
+from datetime import date
+
+import pytest
+
+import indice
+from indice import _expressao_fts, buscar_arquivos, indexar_texto, sincronizar_indice
+
+@pytest.fixture(autouse=True)
+def banco(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(indice, 'ARQUIVO_INDICE', str(tmp_path / 'file_index.db'))
+
+def _metadata(quantidade=12):
+    metadata = {}
+    for i in range(quantidade):
+        nome = f'{i}_documento_{i}.{"pdf" if i % 2 else "txt"}'
+        metadata[nome] = {'nome_original': nome.split('_', 1)[1], 'tipo': 'Pdf' if i % 2 else 'Txt',
+                          'data_upload': f'2024-05-{i + 1:02d}T10:00:00', 'tamanho': 100, 'caminho': nome}
+    metadata['20_politica_ferias.pdf'] = {'nome_original': 'politica_ferias.pdf', 'tipo': 'Pdf',
+                                          'data_upload': '2024-06-15T10:00:00', 'tamanho': 100, 'caminho': 'x'}
+    sincronizar_indice(metadata, 'file_metadata.json')
+    indexar_texto('3_documento_3.pdf', 'Regulamento de reembolso de despesas de viagem')
+    return metadata
+
+def _nomes(arquivos):
+    return [a['nome_arquivo'] for a in arquivos]
+
+def test_expressao_fts_busca_prefixo_de_cada_palavra():
+    assert _expressao_fts('reemb "viag') == '"reemb"* "viag"*'
+    assert _expressao_fts('  ') == ''
+
+def test_busca_por_nome_e_por_texto_com_prefixo():
+    metadata = _metadata()
+
+    assert _nomes(buscar_arquivos('polit fer')[0]) == ['20_politica_ferias.pdf']
+    assert buscar_arquivos('reemb viag') == ([dict(metadata['3_documento_3.pdf'], nome_arquivo='3_documento_3.pdf')], 1)
+    assert buscar_arquivos('inexistente') == ([], 0)
+
+def test_filtros_de_tipo_e_data():
+    _metadata()
+
+    arquivos, total = buscar_arquivos(tipo='Txt', data_inicio=date(2024, 5, 3), data_fim=date(2024, 5, 8))
+
+    assert total == 3
+    assert _nomes(arquivos) == ['6_documento_6.txt', '4_documento_4.txt', '2_documento_2.txt']
+
+def test_paginacao_mais_recentes_primeiro_com_total():
+    _metadata()
+
+    primeira, total = buscar_arquivos(por_pagina=5)
+    ultima, _ = buscar_arquivos(pagina=2, por_pagina=5)
+
+    assert total == 13
+    assert _nomes(primeira)[:2] == ['20_politica_ferias.pdf', '11_documento_11.pdf']
+    assert _nomes(ultima) == ['2_documento_2.txt', '1_documento_1.pdf', '0_documento_0.txt']
+
+def test_busca_por_like_sem_fts(monkeypatch):
+    _metadata()
+    monkeypatch.setattr(indice, '_tem_fts', lambda con: False)
+
+    assert _nomes(buscar_arquivos('ferias')[0]) == ['20_politica_ferias.pdf']
+    assert _nomes(buscar_arquivos('despesas de viagem')[0]) == ['3_documento_3.pdf']
+    assert _nomes(buscar_arquivos('reembolso', tipo='Txt')[0]) == []
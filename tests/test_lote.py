@@ -0,0 +1,86 @@
+import json
+import asyncio
+
+import pytest
+from langchain_core.messages import AIMessage
+
+@pytest.fixture
+def lote(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    import lote as modulo_lote
+    return modulo_lote
+
+def _csv(tmp_path, conteudo):
+    caminho = tmp_path / 'perguntas.csv'
+    caminho.write_text(conteudo, encoding='utf-8-sig')
+    return str(caminho)
+
+def test_cabecalho_normalizado(lote, tmp_path):
+    caminho = _csv(tmp_path, 'ID , Pergunta \n7,Qual o prazo?\n8,Quem aprova?\n')
+
+    assert lote.ler_perguntas(caminho) == [('7', 'Qual o prazo?'), ('8', 'Quem aprova?')]
+
+def test_unica_coluna_alem_do_id(lote, tmp_path):
+    caminho = _csv(tmp_path, 'id,texto\n1,Qual o prazo?\n')
+
+    assert lote.ler_perguntas(caminho) == [('1', 'Qual o prazo?')]
+
+def test_id_nunca_vira_pergunta(lote, tmp_path):
+    caminho = _csv(tmp_path, 'id\n1\n2\n')
+
+    with pytest.raises(SystemExit, match='Coluna de perguntas não encontrada'):
+        lote.ler_perguntas(caminho)
+
+def test_colunas_ambiguas_interrompem(lote, tmp_path):
+    caminho = _csv(tmp_path, 'id,categoria,texto\n1,férias,Qual o prazo?\n')
+
+    with pytest.raises(SystemExit, match='categoria, texto'):
+        lote.ler_perguntas(caminho)
+
+def test_jsonl(lote, tmp_path):
+    caminho = tmp_path / 'perguntas.jsonl'
+    caminho.write_text('{"id": "a", "question": "Qual o prazo?"}\n{"question": "Quem aprova?"}\n', encoding='utf-8')
+
+    assert lote.ler_perguntas(str(caminho)) == [('a', 'Qual o prazo?'), ('2', 'Quem aprova?')]
+
+class ChainSimulada:
+    """Responde cada pergunta com um texto fixo, sem modelo"""
+
+    async def ainvoke(self, entrada, config=None):
+        return AIMessage(content=f"Resposta: {entrada['input']}")
+
+def _registro(id_pergunta, pergunta, erro=None):
+    return json.dumps({'id': id_pergunta, 'pergunta': pergunta, 'resposta': None if erro else 'ok', 'erro': erro})
+
+def test_retomada_apos_linha_incompleta(lote, tmp_path):
+    saida = tmp_path / 'respostas.jsonl'
+    # Execução interrompida no meio da gravação do segundo registro
+    saida.write_text(_registro('1', 'Qual o prazo?') + '\n' + _registro('2', 'Quem aprova?')[:20], encoding='utf-8')
+    assert lote.ler_concluidas(str(saida)) == {('1', 'Qual o prazo?')}
+
+    asyncio.run(lote.executar_lote(ChainSimulada(), 'Instruções', [('2', 'Quem aprova?')], str(saida), 2, 'manual.pdf'))
+
+    assert lote.ler_concluidas(str(saida)) == {('1', 'Qual o prazo?'), ('2', 'Quem aprova?')}
+    assert len(saida.read_text(encoding='utf-8').splitlines()) == 3
+
+def test_retomada_refaz_apenas_perguntas_com_erro(lote, tmp_path):
+    saida = tmp_path / 'respostas.jsonl'
+    saida.write_text('\n'.join([_registro('1', 'Qual o prazo?'), _registro('2', 'Quem aprova?', erro='timeout')]) + '\n',
+                     encoding='utf-8')
+
+    assert lote.ler_concluidas(str(saida)) == {('1', 'Qual o prazo?')}
+
+def test_csv_prefere_a_resposta_valida_ao_erro(lote, tmp_path):
+    saida = tmp_path / 'respostas.jsonl'
+    saida.write_text('\n'.join([
+        _registro('1', 'Qual o prazo?', erro='timeout'),
+        _registro('1', 'Qual o prazo?'),
+        _registro('1', 'Qual o prazo?', erro='limite de taxa'),
+        _registro('2', 'Quem aprova?', erro='timeout'),
+    ]) + '\n', encoding='utf-8')
+
+    registros = lote.exportar_csv(str(saida), str(tmp_path / 'respostas.csv'))
+
+    assert [(r['id'], r['erro']) for r in registros] == [('1', None), ('2', 'timeout')]
+    with open(tmp_path / 'respostas.csv', encoding='utf-8-sig') as f:
+        assert f.read().splitlines()[0].startswith('id,pergunta,resposta')
@@ -0,0 +1,24 @@
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from modelo_simulado import ChatSimulado, chave_mensagens
+
+def _mensagens(documento, pergunta, historico=()):
+    return [SystemMessage(content=f'Documento:\n{documento}'), *historico, HumanMessage(content=pergunta)]
+
+def test_chave_de_replay_inclui_o_documento():
+    ferias = chave_mensagens(_mensagens('Política de férias', 'Qual o prazo?'))
+    reembolso = chave_mensagens(_mensagens('Política de reembolso', 'Qual o prazo?'))
+
+    assert ferias != reembolso
+    assert ferias == chave_mensagens(_mensagens('Política de férias', 'Qual o prazo?',
+                                                [HumanMessage(content='Oi'), AIMessage(content='Olá')]))
+
+def test_replay_responde_conforme_o_documento(tmp_path):
+    arquivo = tmp_path / 'replay.jsonl'
+    arquivo.write_text(
+        '{"chave": "%s", "resposta": "30 dias"}\n' % chave_mensagens(_mensagens('Política de férias', 'Qual o prazo?')),
+        encoding='utf-8')
+    modelo = ChatSimulado(ttft_s=0, tokens_por_segundo=0, arquivo_replay=str(arquivo))
+
+    assert modelo.invoke(_mensagens('Política de férias', 'Qual o prazo?')).content == '30 dias'
+    assert modelo.invoke(_mensagens('Política de reembolso', 'Qual o prazo?')).content != '30 dias'
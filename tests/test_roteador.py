@@ -0,0 +1,36 @@
+import pytest
+
+import roteador
+from roteador import MODELO_PESADO, MODELO_RAPIDO, classificar_consulta, escolher_modelo
+
+@pytest.mark.parametrize('entrada, classe', [
+    ('Oi', 'trivial'),
+    ('  obrigada!! ', 'trivial'),
+    ('Bom dia.', 'trivial'),
+    ('Qual o prazo das férias?', 'simples'),
+    ('Oi, qual o prazo das férias?', 'simples'),
+    ('Compare as políticas de reembolso', 'complexa'),
+    ('Por que o pedido foi negado?', 'complexa'),
+    ('Qual o prazo ' + 'x' * 200, 'complexa'),
+])
+def test_classificar_consulta(entrada, classe):
+    assert classificar_consulta(entrada) == classe
+
+@pytest.mark.parametrize('entrada, tokens_prompt, tem_documento, modelo, motivo', [
+    ('Obrigado', 50000, True, MODELO_RAPIDO, 'consulta trivial'),
+    ('Qual o prazo das férias?', 500, False, MODELO_RAPIDO, 'consulta simples'),
+    ('Qual o prazo das férias?', 500, True, MODELO_PESADO, 'consulta sobre documento'),
+    ('Qual o prazo das férias?', 9000, False, MODELO_PESADO, 'prompt grande'),
+    ('Resuma a política de férias', 500, False, MODELO_PESADO, 'consulta complexa'),
+])
+def test_escolher_modelo(entrada, tokens_prompt, tem_documento, modelo, motivo):
+    decisao = escolher_modelo(entrada, tokens_prompt, tem_documento)
+
+    assert (decisao['modelo'], decisao['motivo']) == (modelo, motivo)
+    assert decisao['chave'] == ('rapido' if modelo == MODELO_RAPIDO else 'pesado')
+
+def test_limite_de_tokens_configuravel(monkeypatch):
+    monkeypatch.setattr(roteador, 'LIMITE_TOKENS_RAPIDO', 100)
+
+    assert escolher_modelo('Qual o prazo das férias?', 101, False)['motivo'] == 'prompt grande'
+    assert escolher_modelo('Qual o prazo das férias?', 100, False)['motivo'] == 'consulta simples'
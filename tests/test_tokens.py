@@ -0,0 +1,91 @@
+import json
+
+import httpx
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_openai import ChatOpenAI
+
+import tokens
+from tokens import (AVISO_TRUNCADO, RESERVA_RESPOSTA, acompanhar_uso_stream, ajustar_ao_orcamento, anotar_uso,
+                    contar_tokens, limitar_documento, limite_documento, truncar_texto)
+
+def _resposta_stream(request):
+    """Resposta em streaming da API da OpenAI com parte do prompt atendida pelo cache"""
+    pedacos = [
+        {'choices': [{'index': 0, 'delta': {'role': 'assistant', 'content': 'Trinta'}, 'finish_reason': None}]},
+        {'choices': [{'index': 0, 'delta': {'content': ' dias.'}, 'finish_reason': 'stop'}]},
+        {'choices': [], 'usage': {'prompt_tokens': 2048, 'completion_tokens': 3, 'total_tokens': 2051,
+                                  'prompt_tokens_details': {'cached_tokens': 1536}}},
+    ]
+    corpo = ''.join(
+        'data: ' + json.dumps({'id': 'c1', 'object': 'chat.completion.chunk', 'created': 0, 'model': 'gpt-4o', **p}) + '\n\n'
+        for p in pedacos
+    ) + 'data: [DONE]\n\n'
+    return httpx.Response(200, content=corpo.encode(), headers={'content-type': 'text/event-stream'})
+
+def test_anotar_uso_separa_tokens_do_cache():
+    mensagem = AIMessage(content='ok', usage_metadata={
+        'input_tokens': 1200, 'output_tokens': 40, 'total_tokens': 1240,
+        'input_token_details': {'cache_read': 1024},
+    })
+    uso = {}
+
+    anotar_uso(mensagem, uso)
+
+    assert uso == {'tokens_prompt_api': 1200, 'tokens_resposta': 40, 'tokens_cache': 1024, 'tokens_sem_cache': 176}
+
+def test_stream_do_chat_openai_informa_tokens_do_cache(monkeypatch):
+    registrados = []
+    monkeypatch.setattr(tokens, 'registrar_uso_tokens', registrados.append)
+    modelo = ChatOpenAI(model='gpt-4o', api_key='sk-teste', stream_usage=True,
+                        http_client=httpx.Client(transport=httpx.MockTransport(_resposta_stream)))
+    uso = {}
+
+    resposta = ''.join(chunk.content for chunk in acompanhar_uso_stream(modelo.stream('Qual o prazo?'), uso))
+
+    assert resposta == 'Trinta dias.'
+    assert uso['tokens_cache'] == 1536
+    assert uso['tokens_sem_cache'] == 512
+    assert registrados == [uso]
+
+def test_truncar_texto():
+    texto = 'Política de reembolso da Provion. ' * 400
+
+    assert truncar_texto('Prazo de trinta dias.', 100) == 'Prazo de trinta dias.'
+    cortado = truncar_texto(texto, 100)
+    assert cortado.endswith(AVISO_TRUNCADO)
+    assert contar_tokens(cortado[:-len(AVISO_TRUNCADO)]) <= 100
+    assert texto.startswith(cortado[:-len(AVISO_TRUNCADO)])
+
+def test_ajustar_ao_orcamento_remove_as_mensagens_mais_antigas():
+    historico = [HumanMessage(content=f'mensagem {i} ' + 'x' * 400) for i in range(10)]
+    tokens_mensagem = contar_tokens(historico[0].content) + tokens.TOKENS_POR_MENSAGEM
+    orcamento = RESERVA_RESPOSTA + 3 * tokens_mensagem + 200
+
+    ajustado, uso = ajustar_ao_orcamento('Instruções', historico, 'Qual o prazo?', orcamento=orcamento)
+
+    assert ajustado == historico[-len(ajustado):]
+    assert uso['mensagens_removidas'] == 10 - len(ajustado) > 0
+    assert uso['tokens_total'] <= orcamento - RESERVA_RESPOSTA
+    assert uso['acima_orcamento'] is False
+
+def test_prompt_acima_do_orcamento_e_sinalizado():
+    historico = [HumanMessage(content='Oi')]
+
+    ajustado, uso = ajustar_ao_orcamento('x' * 8000, historico, 'Qual o prazo?', orcamento=RESERVA_RESPOSTA + 100)
+
+    assert ajustado == []
+    assert uso['acima_orcamento'] is True
+    assert uso['tokens_total'] > uso['orcamento'] - RESERVA_RESPOSTA
+
+def test_documento_limitado_pelo_orcamento_do_prompt(monkeypatch):
+    monkeypatch.setattr(tokens, 'ORCAMENTO_TOKENS', 8000)
+    instrucoes = 'Você é um assistente. ' * 50
+    documento = 'Cláusula do manual interno. ' * 5000
+
+    limite = limite_documento(instrucoes)
+    cortado = limitar_documento(documento, instrucoes=instrucoes)
+
+    assert 0 < limite < 8000 - RESERVA_RESPOSTA - contar_tokens(instrucoes)
+    assert contar_tokens(cortado[:-len(AVISO_TRUNCADO)]) <= limite
+    _, uso = ajustar_ao_orcamento(instrucoes + cortado, [], 'Qual o prazo de reembolso?')
+    assert uso['acima_orcamento'] is False
@@ -0,0 +1,181 @@
+import os
+import json
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from datetime import datetime
+
+# Orçamento de tokens do prompt (configurável por variável de ambiente)
+ORCAMENTO_TOKENS = int(os.getenv('PROVIA_ORCAMENTO_TOKENS', '100000'))
+ORCAMENTO_DOCUMENTO = int(os.getenv('PROVIA_ORCAMENTO_DOCUMENTO', '60000'))
+RESERVA_RESPOSTA = int(os.getenv('PROVIA_RESERVA_RESPOSTA', '4096'))
+# Espaço mínimo deixado para a pergunta e o histórico quando o documento é cortado
+RESERVA_CONVERSA = int(os.getenv('PROVIA_RESERVA_CONVERSA', '2048'))
+ARQUIVO_USO_TOKENS = os.getenv('PROVIA_LOG_TOKENS', 'token_usage.jsonl')
+
+# Overhead aproximado de cada mensagem no formato de chat da OpenAI
+TOKENS_POR_MENSAGEM = 4
+
+# Marcador inserido quando o documento precisa ser cortado
+AVISO_TRUNCADO = '\n[... conteúdo truncado para caber no limite de tokens ...]'
+
+# Textos até este tamanho ficam no cache de contagem; os maiores são guardados pelo hash
+MAX_CARACTERES_CACHE = 4096
+MAX_CONTAGENS_LONGAS = 256
+
+_contagens_longas = OrderedDict()
+_lock_contagens = threading.Lock()
+
+@lru_cache(maxsize=8)
+def obter_tokenizador(modelo='gpt-4o'):
+    """Retorna o tokenizador do modelo (carregado uma única vez) ou None se o tiktoken não estiver disponível
+
+    Sem rede, o tiktoken não consegue baixar o vocabulário; nesse caso o None também fica em cache
+    e a contagem passa a usar a estimativa por caracteres.
+    """
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(modelo)
+        except KeyError:
+            return tiktoken.get_encoding('o200k_base')
+    except Exception as e:
+        print(f'Tokenizador indisponível ({e!r}); usando estimativa de tokens por caracteres')
+        return None
+
+def _contar(texto, modelo):
+    tokenizador = obter_tokenizador(modelo)
+    if tokenizador is None:
+        # Aproximação de ~4 caracteres por token
+        return max(1, len(texto) // 4)
+    return len(tokenizador.encode(texto, disallowed_special=()))
+
+@lru_cache(maxsize=1024)
+def _contar_texto_curto(texto, modelo):
+    return _contar(texto, modelo)
+
+def contar_tokens(texto, modelo='gpt-4o'):
+    """Conta os tokens de um texto localmente
+
+    Textos longos (documentos) são lembrados pelo hash, para não manter o conteúdo em memória.
+    """
+    if not texto:
+        return 0
+    if len(texto) <= MAX_CARACTERES_CACHE:
+        return _contar_texto_curto(texto, modelo)
+
+    chave = (hashlib.sha256(texto.encode('utf-8')).hexdigest(), modelo)
+    with _lock_contagens:
+        if chave in _contagens_longas:
+            _contagens_longas.move_to_end(chave)
+            return _contagens_longas[chave]
+    total = _contar(texto, modelo)
+    with _lock_contagens:
+        _contagens_longas[chave] = total
+        while len(_contagens_longas) > MAX_CONTAGENS_LONGAS:
+            _contagens_longas.popitem(last=False)
+    return total
+
+def truncar_texto(texto, max_tokens, modelo='gpt-4o'):
+    """Corta o texto para no máximo max_tokens tokens"""
+    if contar_tokens(texto, modelo) <= max_tokens:
+        return texto
+    tokenizador = obter_tokenizador(modelo)
+    if tokenizador is None:
+        return texto[:max_tokens * 4] + AVISO_TRUNCADO
+    tokens = tokenizador.encode(texto, disallowed_special=())
+    return tokenizador.decode(tokens[:max_tokens]) + AVISO_TRUNCADO
+
+def limite_documento(instrucoes='', modelo='gpt-4o', orcamento=None):
+    """Tokens disponíveis para o documento: o que sobra do orçamento do prompt depois da resposta,
+    das instruções e da reserva da conversa, sem passar de ORCAMENTO_DOCUMENTO"""
+    if orcamento is None:
+        orcamento = ORCAMENTO_TOKENS
+    disponivel = orcamento - RESERVA_RESPOSTA - RESERVA_CONVERSA - contar_tokens(instrucoes, modelo) - TOKENS_POR_MENSAGEM
+    return max(0, min(ORCAMENTO_DOCUMENTO, disponivel))
+
+def limitar_documento(documento, modelo='gpt-4o', instrucoes=''):
+    """Corta o documento para caber no orçamento junto das instruções que o acompanham no prompt"""
+    return truncar_texto(documento, limite_documento(instrucoes, modelo), modelo)
+
+def ajustar_ao_orcamento(system_message, historico, entrada, modelo='gpt-4o', orcamento=None):
+    """Remove as mensagens mais antigas do histórico até o prompt caber no orçamento
+
+    Retorna o histórico ajustado e o detalhamento de tokens do turno. Se nem sem histórico o prompt
+    couber, o registro sai com acima_orcamento=True.
+    """
+    if orcamento is None:
+        orcamento = ORCAMENTO_TOKENS
+    tokens_sistema = contar_tokens(system_message, modelo) + TOKENS_POR_MENSAGEM
+    tokens_entrada = contar_tokens(entrada, modelo) + TOKENS_POR_MENSAGEM
+    disponivel = orcamento - RESERVA_RESPOSTA - tokens_sistema - tokens_entrada
+
+    historico = list(historico)
+    tokens_por_mensagem = [contar_tokens(m.content, modelo) + TOKENS_POR_MENSAGEM for m in historico]
+    tokens_historico = sum(tokens_por_mensagem)
+    removidas = 0
+    while historico and tokens_historico > disponivel:
+        historico.pop(0)
+        tokens_historico -= tokens_por_mensagem.pop(0)
+        removidas += 1
+
+    tokens_total = tokens_sistema + tokens_historico + tokens_entrada
+    acima_orcamento = tokens_total > orcamento - RESERVA_RESPOSTA
+    if acima_orcamento:
+        print(f'Prompt acima do orçamento mesmo sem histórico: {tokens_total} tokens '
+              f'(orçamento {orcamento}, reserva de resposta {RESERVA_RESPOSTA})')
+
+    uso = {
+        'data': datetime.now().isoformat(),
+        'modelo': modelo,
+        'tokens_sistema': tokens_sistema,
+        'tokens_historico': tokens_historico,
+        'tokens_entrada': tokens_entrada,
+        'tokens_total': tokens_total,
+        'orcamento': orcamento,
+        'mensagens_removidas': removidas,
+        'acima_orcamento': acima_orcamento,
+    }
+    return historico, uso
+
+def registrar_uso_tokens(uso):
+    """Registra o detalhamento de tokens do turno para monitoramento"""
+    try:
+        with open(ARQUIVO_USO_TOKENS, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(uso, ensure_ascii=False) + '\n')
+    except OSError as e:
+        print(f'Erro ao registrar uso de tokens: {e}')
+
+def anotar_uso(mensagem, uso):
+    """Copia para o registro do turno o uso informado pela API (em um chunk ou na mensagem completa),
+    separando os tokens atendidos pelo cache"""
+    uso_api = getattr(mensagem, 'usage_metadata', None)
+    if uso_api:
+        detalhes = uso_api.get('input_token_details') or {}
+        tokens_cache = detalhes.get('cache_read') or 0
+        uso['tokens_prompt_api'] = uso_api.get('input_tokens', 0)
+        uso['tokens_resposta'] = uso_api.get('output_tokens', 0)
+        uso['tokens_cache'] = tokens_cache
+        uso['tokens_sem_cache'] = uso['tokens_prompt_api'] - tokens_cache
+
+def acompanhar_uso_stream(stream, uso):
+    """Repassa os chunks da resposta e completa o registro do turno com o uso informado pela API
+
+    Separa os tokens do prompt atendidos pelo cache do provedor dos demais.
+    """
+    for chunk in stream:
+        anotar_uso(chunk, uso)
+        yield chunk
+    registrar_uso_tokens(uso)
+
+async def acompanhar_uso_astream(stream, uso):
+    """Versão assíncrona de acompanhar_uso_stream; a gravação do registro não bloqueia o event loop"""
+    async for chunk in stream:
+        anotar_uso(chunk, uso)
+        yield chunk
+    await asyncio.to_thread(registrar_uso_tokens, uso)